@@ -0,0 +1,5 @@
+"""Headscale API benchmarks.
+
+Benchmarks are plain scripts, which can be run as modules from the repository root,
+e.g., `python -m benchmarks.memory`.
+"""
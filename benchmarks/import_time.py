@@ -0,0 +1,70 @@
+"""Import time benchmark.
+
+Measures wall time of typical imports in fresh interpreters, since imports are cached
+within a single process.
+
+Usage:
+
+```
+python -m benchmarks.import_time [--repeat 10]
+```
+"""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+STATEMENTS: Dict[str, str] = {
+    "interpreter": "pass",
+    "package": "import headscale_api",
+    "config": "from headscale_api import HeadscaleConfig",
+    "client": "from headscale_api import Headscale",
+    "schema": "import headscale_api.schema.headscale.v1",
+    "sync client": "from headscale_api import SyncHeadscale",
+}
+"""Benchmarked import statements."""
+
+_TIMER = """
+import time
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+"""
+
+
+def measure(statement: str, repeat: int) -> List[float]:
+    """Measure import statement in `repeat` fresh interpreters (seconds)."""
+    return [
+        float(
+            subprocess.run(
+                [sys.executable, "-c", _TIMER.format(statement=statement)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+        )
+        for _ in range(repeat)
+    ]
+
+
+def main():
+    """Run the import time benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'import':<14} {'median ms':>10} {'min ms':>10}")
+    for name, statement in STATEMENTS.items():
+        timings = measure(statement, args.repeat)
+        print(
+            f"{name:<14} {statistics.median(timings) * 1000:>10.1f} "
+            f"{min(timings) * 1000:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
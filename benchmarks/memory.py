@@ -0,0 +1,198 @@
+"""Memory profile of large Headscale API responses.
+
+Reports peak and retained memory (measured with `tracemalloc`) of decoding and holding
+`ListMachinesResponse` and `GetRoutesResponse` in different representations, as well
+as per-object overhead of the generated betterproto dataclasses.
+
+Usage:
+
+```
+python -m benchmarks.memory [--sizes 1000 10000 100000]
+```
+"""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Type
+
+from betterproto import Message
+
+from headscale_api.schema.headscale import v1 as model
+from headscale_api.schema.lean.headscale import v1 as lean_model
+
+from . import payloads
+
+Decoder = Callable[[Type[Message], bytes], Any]
+"""Function decoding a response body to the benchmarked representation."""
+
+REPRESENTATIONS: Dict[str, Decoder] = {
+    "pydantic": lambda response_type, body: response_type.from_dict(  # type: ignore
+        json.loads(body)
+    ),
+    "lean": lambda response_type, body: getattr(
+        lean_model, response_type.__name__
+    ).from_dict(json.loads(body)),
+    "json-dict": lambda _, body: json.loads(body),
+    "raw-bytes": lambda _, body: bytearray(body),
+}
+"""Benchmarked response representations.
+
+`lean` uses the plain dataclasses backend (see `headscale_api.backend`). `json-dict`
+and `raw-bytes` are the lazy representations, which defer building of the message
+objects until they are needed.
+"""
+
+RESPONSES = {
+    "ListMachinesResponse": (
+        model.ListMachinesResponse,
+        payloads.list_machines_payload,
+    ),
+    "GetRoutesResponse": (model.GetRoutesResponse, payloads.get_routes_payload),
+}
+"""Benchmarked responses with their payload generators."""
+
+
+@dataclass
+class MemoryResult:
+    """Result of a single memory measurement."""
+
+    response: str
+    """Name of the response message."""
+
+    representation: str
+    """Name of the representation."""
+
+    size: int
+    """Number of elements in the response."""
+
+    body_bytes: int
+    """Size of the JSON response body."""
+
+    peak: int
+    """Peak memory allocated while decoding (bytes)."""
+
+    retained: int
+    """Memory retained by the decoded representation (bytes)."""
+
+    def __str__(self) -> str:  # noqa
+        return (
+            f"{self.response:<22} {self.representation:<12} {self.size:>7} "
+            f"{self.body_bytes / 2**20:>9.2f} {self.peak / 2**20:>9.2f} "
+            f"{self.retained / 2**20:>9.2f} {self.retained / self.size:>9.0f}"
+        )
+
+
+def measure(response: str, representation: str, size: int, body: bytes) -> MemoryResult:
+    """Measure decoding of a single response body.
+
+    The body itself is allocated before tracing starts, so it's not accounted for.
+    """
+    response_type, _ = RESPONSES[response]
+    decoder = REPRESENTATIONS[representation]
+    gc.collect()
+    tracemalloc.start()
+    try:
+        decoded = decoder(response_type, body)
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+        del decoded
+    finally:
+        tracemalloc.stop()
+    return MemoryResult(response, representation, size, len(body), peak, retained)
+
+
+def measure_all(
+    sizes: Iterable[int], representations: Iterable[str]
+) -> List[MemoryResult]:
+    """Measure all responses in all representations and sizes."""
+    results = []
+    for response, (_, make_payload) in RESPONSES.items():
+        for size in sizes:
+            body = payloads.to_body(make_payload(size))
+            for representation in representations:
+                results.append(measure(response, representation, size, body))
+    return results
+
+
+def _traced(function: Callable[[], Any]) -> int:
+    """Get memory retained by the result of a function call (bytes)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        held = function()  # pylint: disable=unused-variable # noqa: F841
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def object_overhead(  # pylint: disable=cell-var-from-loop
+    count: int = 1000,
+) -> Dict[str, Dict[str, float]]:
+    """Measure per-object overhead of the generated dataclasses.
+
+    Reports the average memory taken by a single decoded object (including nested
+    objects) next to the same data held as a JSON dictionary and the shallow size of
+    the instance with its `__dict__`.
+    """
+    samples: Dict[str, Any] = {
+        "User": (model.User, payloads.user_dict),
+        "Machine": (model.Machine, payloads.machine_dict),
+        "Route": (model.Route, payloads.route_dict),
+    }
+    results = {}
+    for name, (message_type, make_dict) in samples.items():
+        dicts = [make_dict(index) for index in range(count)]
+        objects = _traced(lambda: [message_type.from_dict(value) for value in dicts])
+        as_json = _traced(lambda: [json.loads(json.dumps(value)) for value in dicts])
+        instance = message_type.from_dict(dicts[0])
+        results[name] = {
+            "object": objects / count,
+            "json-dict": as_json / count,
+            "shallow": sys.getsizeof(instance) + sys.getsizeof(instance.__dict__),
+            "fields": len(instance.__dict__),
+        }
+    return results
+
+
+def main():
+    """Run the memory benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument(
+        "--representations",
+        nargs="+",
+        choices=list(REPRESENTATIONS),
+        default=list(REPRESENTATIONS),
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'response':<22} {'repr':<12} {'size':>7} {'body MiB':>9} "
+        f"{'peak MiB':>9} {'held MiB':>9} {'B/elem':>9}"
+    )
+    for size in args.sizes:
+        for result in measure_all([size], args.representations):
+            print(result)
+
+    print()
+    print(
+        f"{'object':<10} {'B/object':>10} {'B/json':>10} {'shallow':>10} {'fields':>7}"
+    )
+    for name, overhead in object_overhead().items():
+        print(
+            f"{name:<10} {overhead['object']:>10.0f} {overhead['json-dict']:>10.0f} "
+            f"{overhead['shallow']:>10.0f} {overhead['fields']:>7.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Synthetic Headscale API payloads for benchmarks.
+
+Payloads mimic JSON bodies returned by the Headscale REST API (camelCase keys, all
+fields present), so that they can be decoded with `Message.from_dict()`.
+"""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import json
+from typing import Any, Dict, List
+
+TIMESTAMP = "2023-04-13T20:47:48Z"
+"""Timestamp used for all time fields."""
+
+
+def user_dict(index: int) -> Dict[str, Any]:
+    """Make a user dictionary."""
+    return {"id": str(index), "name": f"user{index}", "createdAt": TIMESTAMP}
+
+
+def machine_dict(index: int, users: int = 100) -> Dict[str, Any]:
+    """Make a machine dictionary.
+
+    Arguments:
+        index -- machine index, used to derive unique fields.
+
+    Keyword Arguments:
+        users -- number of distinct users machines are spread over (default: {100})
+    """
+    return {
+        "id": str(index + 1),
+        "machineKey": f"mkey:{index:064x}",
+        "nodeKey": f"nodekey:{index:064x}",
+        "discoKey": f"discokey:{index:064x}",
+        "ipAddresses": [
+            f"100.{64 + (index >> 16) % 64}.{(index >> 8) % 256}.{index % 256}",
+            f"fd7a:115c:a1e0::{index:x}",
+        ],
+        "name": f"machine{index}",
+        "user": user_dict(index % users),
+        "lastSeen": TIMESTAMP,
+        "lastSuccessfulUpdate": TIMESTAMP,
+        "expiry": TIMESTAMP,
+        "createdAt": TIMESTAMP,
+        "registerMethod": "REGISTER_METHOD_AUTH_KEY",
+        "forcedTags": ["tag:prod"] if index % 2 else [],
+        "invalidTags": [],
+        "validTags": [f"tag:group{index % 10}"],
+        "givenName": f"machine{index}",
+        "online": bool(index % 3),
+    }
+
+
+def route_dict(index: int, machines: int = 1000) -> Dict[str, Any]:
+    """Make a route dictionary.
+
+    Arguments:
+        index -- route index, used to derive unique fields.
+
+    Keyword Arguments:
+        machines -- number of distinct machines routes are spread over
+            (default: {1000})
+    """
+    return {
+        "id": str(index + 1),
+        "machine": machine_dict(index % machines),
+        "prefix": f"10.{(index >> 8) % 256}.{index % 256}.0/24",
+        "advertised": True,
+        "enabled": bool(index % 2),
+        "isPrimary": bool(index % 2),
+        "createdAt": TIMESTAMP,
+        "updatedAt": TIMESTAMP,
+    }
+
+
+def list_machines_payload(count: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Make a `ListMachinesResponse` dictionary with `count` machines."""
+    return {"machines": [machine_dict(index) for index in range(count)]}
+
+
+def get_routes_payload(count: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Make a `GetRoutesResponse` dictionary with `count` routes."""
+    return {"routes": [route_dict(index) for index in range(count)]}
+
+
+def to_body(payload: Dict[str, Any]) -> bytes:
+    """Encode a payload as a JSON response body."""
+    return json.dumps(payload).encode()
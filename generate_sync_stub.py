@@ -0,0 +1,94 @@
+"""Generate type stub of the blocking Headscale API facade (`headscale_api/sync.pyi`).
+
+`SyncHeadscale` methods are created at runtime from the `Headscale` coroutine methods,
+so type checkers and IDEs see them only through the stub. Run after the schema is
+regenerated (see `generate_schema.sh`).
+"""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import inspect
+import re
+from pathlib import Path
+from typing import Any
+
+from headscale_api.headscale import Headscale
+from headscale_api.schema.headscale import v1 as schema
+from headscale_api.sync import wrapped_methods
+
+OUTPUT_PATH = Path("headscale_api/sync.pyi")
+
+HEADER = '''"""Blocking Headscale API facade (generated by generate_sync_stub.py)."""
+
+# pylint: skip-file
+# flake8: noqa
+
+import datetime
+from typing import Any, Coroutine, List, Optional, TypeVar
+
+import betterproto
+from betterproto.grpc.grpclib_client import MetadataLike
+from grpclib.metadata import Deadline
+
+from .headscale import Headscale, RawResponse
+from .schema.headscale import v1 as model
+
+ResultT = TypeVar("ResultT")
+
+def wrapped_methods() -> List[str]: ...
+
+class SyncHeadscale:
+    headscale: Headscale
+    call_timeout: Optional[float]
+    def __init__(
+        self, headscale: Headscale, call_timeout: Optional[float] = ...
+    ) -> None: ...
+    def __enter__(self) -> SyncHeadscale: ...
+    def __exit__(self, *err: Any) -> None: ...
+    def start(self) -> None: ...
+    def close(self) -> None: ...
+    def run(self, coroutine: Coroutine[Any, Any, ResultT]) -> ResultT: ...
+'''
+
+
+def annotation(value: Any) -> str:
+    """Format annotation with names qualified as imported in the stub."""
+    if isinstance(value, str):
+        return f"model.{value}" if hasattr(schema, value) else value
+    text = inspect.formatannotation(value)
+    text = re.sub(r"ForwardRef\('(\w+)'\)", r"\1", text)
+    return text.replace("headscale_api.schema.headscale.v1.", "model.").replace(
+        "headscale_api.headscale.", ""
+    )
+
+
+def method_stub(name: str) -> str:
+    """Make stub of a blocking method."""
+    signature = inspect.signature(getattr(Headscale, name))
+    parameters = []
+    keyword_only = False
+    for parameter in signature.parameters.values():
+        if parameter.kind == parameter.KEYWORD_ONLY and not keyword_only:
+            parameters.append("*")
+            keyword_only = True
+        text = parameter.name
+        if parameter.annotation is not parameter.empty:
+            text += f": {annotation(parameter.annotation)}"
+        if parameter.default is not parameter.empty:
+            text += " = ..."
+        parameters.append(text)
+    return (
+        f"    def {name}({', '.join(parameters)})"
+        f" -> {annotation(signature.return_annotation)}: ...\n"
+    )
+
+
+def main():
+    """Write the stub."""
+    OUTPUT_PATH.write_text(
+        HEADER + "".join(method_stub(name) for name in sorted(wrapped_methods()))
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,56 @@
-"""Headscale API module."""
+"""Headscale API module.
+
+Public classes are imported lazily on first access, so that importing the package
+doesn't pull in the configuration (pydantic_yaml, ruamel) nor the API client
+machinery (generated schema, aiohttp) unless they are used.
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .config import HeadscaleConfig  # noqa # type: ignore
+    from .headscale import Headscale  # noqa
+    from .sync import SyncHeadscale  # noqa
+
+_LAZY_ATTRIBUTES = {
+    "HeadscaleConfig": ".config",
+    "Headscale": ".headscale",
+    "SyncHeadscale": ".sync",
+}
+"""Lazily imported attributes with their source modules."""
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str) -> Any:
+    """Import public classes on first access."""
+    try:
+        module_name = _LAZY_ATTRIBUTES[name]
+    except KeyError as error:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {name!r}"
+        ) from error
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    """List module attributes including the lazy ones."""
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
-from .config import HeadscaleConfig  # noqa # type: ignore
-from .headscale import Headscale
 
 if __name__ == "__main__":
     import asyncio
     import os
 
+    # Imported under another name, since the public name is lazy.
+    from .headscale import Headscale as HeadscaleClient
     from .headscale import UnauthorizedError
     from .schema.headscale.v1 import GetUserRequest, ListApiKeysRequest
 
-    async def main(index: int, headscale: Headscale):
+    async def main(index: int, headscale: HeadscaleClient):
         """Run some basic API test."""
         try:
             async with headscale.session:
@@ -26,7 +66,7 @@ if __name__ == "__main__":
 
     async def multi_main():
         """Test concurrent connections with a single session."""
-        headscale = Headscale(
+        headscale = HeadscaleClient(
             os.getenv("HEADSCALE_APIURL", "localhost:5000"),
             api_key=os.getenv("HEADSCALE_APIKEY", None),
         )
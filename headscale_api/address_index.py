@@ -0,0 +1,201 @@
+"""Index of machine tailnet addresses for batch IP-to-machine lookups.
+
+Uses NumPy sorted arrays and vectorized binary search if NumPy is installed. Otherwise
+falls back to plain dictionaries, which give the same results.
+"""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import socket
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from .backend import v1 as model
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore
+
+if TYPE_CHECKING:
+    import numpy.typing
+
+Integers = Union[List[int], "numpy.typing.NDArray[numpy.int64]"]
+"""Batch lookup results (NumPy array if NumPy is used)."""
+
+
+def _pack(address: Any) -> Tuple[int, Any]:
+    """Convert address to its IP version and a sortable key.
+
+    IPv4 addresses are converted to integers and IPv6 addresses to 16-byte big-endian
+    strings, which sort the same way as the addresses.
+
+    Returns:
+        IP version and key, or `(0, None)` if the address is invalid.
+    """
+    try:
+        if isinstance(address, int):
+            if 0 <= address < 2**32:
+                return 4, address
+            return 6, address.to_bytes(16, "big")
+        address = str(address)
+        if ":" in address:
+            return 6, socket.inet_pton(socket.AF_INET6, address)
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, address), "big")
+    except (OSError, OverflowError):
+        return 0, None
+
+
+class MachineIPIndex:
+    """Index of machines by their tailnet IP addresses.
+
+    Built once from a machine list and queried in batches, e.g.:
+
+    ```
+    index = MachineIPIndex.from_response(
+        await headscale.list_machines(ListMachinesRequest(""))
+    )
+    machine_ids = index.machine_ids(flow_log["src"])  # 0 for unknown addresses
+    users = index.users(flow_log["src"])  # None for unknown addresses
+    ```
+    """
+
+    def __init__(self, machines: Iterable[model.Machine], use_numpy: bool = True):
+        """Build machine address index.
+
+        Arguments:
+            machines -- machines to index.
+
+        Keyword Arguments:
+            use_numpy -- use NumPy arrays if NumPy is installed (default: {True})
+        """
+        self.machines: List[model.Machine] = list(machines)
+        self.uses_numpy = use_numpy and numpy is not None
+        keys: Dict[int, Dict[Any, int]] = {4: {}, 6: {}}
+        for row, machine in enumerate(self.machines):
+            for address in machine.ip_addresses:
+                version, key = _pack(address)
+                if version:
+                    keys[version][key] = row
+        self._keys = keys
+
+        if self.uses_numpy:
+            self._ids = numpy.array(
+                [0] + [machine.id for machine in self.machines], dtype=numpy.uint64
+            )
+            self._arrays = {
+                4: self._sorted_arrays(keys[4], numpy.uint32),
+                6: self._sorted_arrays(keys[6], "S16"),
+            }
+
+    @classmethod
+    def from_response(
+        cls, response: model.ListMachinesResponse, use_numpy: bool = True
+    ) -> "MachineIPIndex":
+        """Build index from `list_machines()` response."""
+        return cls(response.machines, use_numpy)
+
+    @staticmethod
+    def _sorted_arrays(
+        keys: Dict[Any, int], dtype: Any
+    ) -> Tuple["numpy.typing.NDArray[Any]", "numpy.typing.NDArray[Any]"]:
+        """Make sorted key array and matching machine row array."""
+        key_array = numpy.array(list(keys), dtype=dtype)
+        row_array = numpy.fromiter(keys.values(), dtype=numpy.int64, count=len(keys))
+        order = numpy.argsort(key_array, kind="stable")
+        return key_array[order], row_array[order]
+
+    def lookup(self, address: Any) -> Optional[model.Machine]:
+        """Find machine with an address.
+
+        Arguments:
+            address -- IP address as a string or an integer.
+        """
+        version, key = _pack(address)
+        row = self._keys[version].get(key) if version else None
+        return None if row is None else self.machines[row]
+
+    def rows(self, addresses: Sequence[Any]) -> Integers:
+        """Find rows of `machines` with the given addresses.
+
+        Arguments:
+            addresses -- IP addresses as strings or integers. An integer NumPy array
+                is treated as IPv4 addresses and is searched without conversion
+                (values out of the IPv4 range are invalid).
+
+        Returns:
+            Rows (-1 for unknown and invalid addresses). NumPy array if NumPy is used.
+        """
+        if not self.uses_numpy:
+            row_list = []
+            for address in addresses:
+                version, key = _pack(address)
+                row = self._keys[version].get(key) if version else None
+                row_list.append(-1 if row is None else row)
+            return row_list
+
+        if isinstance(addresses, numpy.ndarray) and addresses.dtype.kind in "ui":
+            # Out of range values would wrap around on the cast.
+            valid = (addresses >= 0) & (addresses < 2**32)
+            if valid.all():
+                return self._search(4, addresses.astype(numpy.uint32))
+            rows = numpy.full(len(addresses), -1, dtype=numpy.int64)
+            rows[valid] = self._search(4, addresses[valid].astype(numpy.uint32))
+            return rows
+
+        positions: Dict[int, List[int]] = {4: [], 6: []}
+        keys: Dict[int, List[Any]] = {4: [], 6: []}
+        for position, address in enumerate(addresses):
+            version, key = _pack(address)
+            if version:
+                positions[version].append(position)
+                keys[version].append(key)
+        rows = numpy.full(len(addresses), -1, dtype=numpy.int64)
+        for version, dtype in ((4, numpy.dtype(numpy.uint32)), (6, numpy.dtype("S16"))):
+            if keys[version]:
+                rows[positions[version]] = self._search(
+                    version, numpy.array(keys[version], dtype=dtype)
+                )
+        return rows
+
+    def _search(
+        self, version: int, values: "numpy.typing.NDArray[Any]"
+    ) -> "numpy.typing.NDArray[numpy.int64]":
+        """Vectorized exact-match binary search."""
+        key_array, row_array = self._arrays[version]
+        if not len(key_array):  # pylint: disable=use-implicit-booleaness-not-len
+            return numpy.full(len(values), -1, dtype=numpy.int64)
+        indices = numpy.minimum(
+            numpy.searchsorted(key_array, values), len(key_array) - 1
+        )
+        return numpy.where(key_array[indices] == values, row_array[indices], -1)
+
+    def machine_ids(self, addresses: Sequence[Any]) -> Integers:
+        """Find IDs of machines with the given addresses.
+
+        Returns:
+            Machine IDs (0 for unknown addresses). NumPy array if NumPy is used.
+        """
+        rows = self.rows(addresses)
+        if self.uses_numpy:
+            return self._ids[numpy.asarray(rows) + 1]
+        return [0 if row < 0 else self.machines[row].id for row in rows]
+
+    def users(self, addresses: Sequence[Any]) -> List[Optional[str]]:
+        """Find names of users owning machines with the given addresses.
+
+        Returns:
+            User names (None for unknown addresses).
+        """
+        # Unknown addresses (row -1) map to the trailing None.
+        names = [machine.user.name for machine in self.machines] + [None]
+        return [names[row] for row in self.rows(addresses)]
@@ -0,0 +1,71 @@
+"""Generated schema backend selection.
+
+Headscale API messages are generated in two flavours:
+
+- `pydantic` (default) -- pydantic dataclasses validating fields on construction,
+- `lean` -- plain dataclasses, which avoid pydantic on message construction,
+  `from_dict()` and `to_dict()`.
+
+Both share the same message and service definitions, so they are interchangeable for
+the `Headscale` client. The backend is selected with the `HEADSCALE_API_BACKEND`
+environment variable, which has to be set before the client is first imported.
+
+Only the lean messages can be encoded to and decoded from the protobuf wire format
+(the pydantic ones can't be constructed empty), so the pydantic messages are converted
+with `to_lean()` and `convert()` where the wire format is used (e.g., gRPC).
+"""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import importlib
+import os
+from typing import TYPE_CHECKING, Type, TypeVar
+
+from betterproto import Message
+
+BACKENDS = {
+    "pydantic": ".schema.headscale.v1",
+    "lean": ".schema.lean.headscale.v1",
+}
+"""Available backends with their generated modules."""
+
+BACKEND = os.environ.get("HEADSCALE_API_BACKEND", "pydantic")
+"""Selected backend name."""
+
+if BACKEND not in BACKENDS:
+    raise ValueError(
+        f'Unsupported HEADSCALE_API_BACKEND "{BACKEND}". '
+        f"Choose one of: {', '.join(BACKENDS)}."
+    )
+
+if TYPE_CHECKING:
+    from .schema.headscale import v1
+else:
+    v1 = importlib.import_module(BACKENDS[BACKEND], __package__)
+
+MessageT = TypeVar("MessageT", bound=Message)
+
+
+def lean_type(message_type: Type[Message]) -> Type[Message]:
+    """Get lean backend counterpart of a message type (or the type itself)."""
+    # pylint: disable=import-outside-toplevel
+    from .schema.lean.headscale import v1 as lean
+
+    lean_message_type = getattr(lean, message_type.__name__, None)
+    if isinstance(lean_message_type, type) and issubclass(lean_message_type, Message):
+        return lean_message_type
+    return message_type
+
+
+def convert(message: Message, message_type: Type[MessageT]) -> MessageT:
+    """Convert message to the same message type of another backend."""
+    if type(message) is message_type:
+        return message  # type: ignore
+    return message_type.from_dict(  # type: ignore
+        message.to_dict(include_default_values=True)  # type: ignore
+    )
+
+
+def to_lean(message: Message) -> Message:
+    """Convert message to the lean backend (e.g., to encode it to wire format)."""
+    return convert(message, lean_type(type(message)))
@@ -0,0 +1,152 @@
+"""Circuit breaker for Headscale endpoints."""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import enum
+import time
+from collections import deque
+from typing import Callable, Deque, Optional
+
+
+class CircuitState(enum.Enum):
+    """Circuit breaker state."""
+
+    CLOSED = "closed"
+    """Requests are let through."""
+
+    OPEN = "open"
+    """Requests are rejected until the cool-down period passes."""
+
+    HALF_OPEN = "half-open"
+    """A single trial request is let through to check if the endpoint recovered."""
+
+
+class CircuitOpenError(RuntimeError):
+    """The request has been rejected by an open circuit breaker."""
+
+    def __init__(self, name: str, retry_after: float):
+        """Initialize the error.
+
+        Arguments:
+            name -- name of the rejecting circuit (e.g., endpoint URL).
+            retry_after -- time in seconds until the circuit lets a request through.
+        """
+        super().__init__(f'Circuit "{name}" is open. Retry after {retry_after:.1f}s.')
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:  # pylint: disable=too-many-instance-attributes
+    """Circuit breaker driven by consecutive failures and error rate.
+
+    The circuit opens after `failure_threshold` consecutive failures or when the
+    failure ratio of the last `window` outcomes reaches `error_rate_threshold`. After
+    `cool_down` seconds it becomes half-open and lets a single trial request through,
+    which either closes it again or re-opens it for another cool-down period.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        failure_threshold: int = 5,
+        error_rate_threshold: float = 0.5,
+        window: int = 20,
+        cool_down: float = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize circuit breaker.
+
+        Keyword Arguments:
+            failure_threshold -- number of consecutive failures opening the circuit
+                (default: {5})
+            error_rate_threshold -- failure ratio opening the circuit. Considered
+                once at least half of the window is filled (default: {0.5})
+            window -- number of recent outcomes to compute the failure ratio of
+                (default: {20})
+            cool_down -- time in seconds before an open circuit lets a trial request
+                through (default: {30})
+            clock -- monotonic time source (default: {time.monotonic})
+        """
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.cool_down = cool_down
+        self._clock = clock
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_started_at: Optional[float] = None
+
+    @property
+    def state(self) -> CircuitState:
+        """Get the current circuit state."""
+        if self._opened_at is None:
+            return CircuitState.CLOSED
+        if self._clock() - self._opened_at < self.cool_down:
+            return CircuitState.OPEN
+        return CircuitState.HALF_OPEN
+
+    @property
+    def available(self) -> bool:
+        """Check if the circuit could let a request through (doesn't start a trial)."""
+        return self.state != CircuitState.OPEN
+
+    @property
+    def retry_after(self) -> float:
+        """Get time in seconds until the circuit lets a request through."""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.cool_down - self._clock())
+
+    def allow(self) -> bool:
+        """Check if a request can be sent.
+
+        In half-open state only the first caller gets True and becomes the trial
+        request. Another trial is allowed if the outcome of the previous one isn't
+        recorded within the cool-down period.
+        """
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.OPEN:
+            return False
+        now = self._clock()
+        if (
+            self._trial_started_at is not None
+            and now - self._trial_started_at < self.cool_down
+        ):
+            return False
+        self._trial_started_at = now
+        return True
+
+    def record_success(self):
+        """Record a successful request."""
+        self._outcomes.append(True)
+        self._consecutive_failures = 0
+        if self._opened_at is not None:
+            self.reset()
+
+    def record_failure(self):
+        """Record a failed request."""
+        self._outcomes.append(False)
+        self._consecutive_failures += 1
+        if self._opened_at is not None:
+            # Failed trial request.
+            self.trip()
+            return
+        failures = self._outcomes.count(False)
+        if self._consecutive_failures >= self.failure_threshold or (
+            len(self._outcomes) * 2 >= (self._outcomes.maxlen or 0)
+            and failures / len(self._outcomes) >= self.error_rate_threshold
+        ):
+            self.trip()
+
+    def trip(self):
+        """Open the circuit (e.g., after a failed health check)."""
+        self._opened_at = self._clock()
+        self._trial_started_at = None
+
+    def reset(self):
+        """Close the circuit and forget the recorded outcomes."""
+        self._opened_at = None
+        self._trial_started_at = None
+        self._consecutive_failures = 0
+        self._outcomes.clear()
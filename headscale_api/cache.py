@@ -0,0 +1,193 @@
+"""Compact cache serialization of messages in the protobuf wire format.
+
+Snapshots (e.g., `ListMachinesResponse`) are stored with a small header:
+
+- magic bytes (`HSPB`),
+- format version,
+- compression method (none, zlib or lzma),
+- fingerprint of the message schema (field names, numbers and types, recursively),
+- payload length.
+
+The wire format is always encoded and decoded with the lean backend messages, since
+the pydantic ones can't be constructed empty. Messages of the pydantic backend are
+converted at the edges, so a snapshot saved with one backend can be loaded with the
+other.
+
+The snapshots are smaller, but slower to load than the JSON responses, since the wire
+format is parsed in pure Python. For 2000 machines the uncompressed snapshot is about
+3.5 times smaller than the JSON (about 30 times with zlib), but loading it takes about
+3 times longer than `from_dict(json.loads(...))` with the lean backend
+(`HEADSCALE_API_BACKEND=lean`) and about 4 times longer with the pydantic backend,
+which pays for the conversion too.
+"""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import hashlib
+import lzma
+import mmap
+import os
+import struct
+import zlib
+from os import PathLike
+from pathlib import Path
+from typing import Dict, Optional, Set, Type, TypeVar, Union
+
+from betterproto import Message, ProtoClassMetadata
+
+from .backend import convert, lean_type
+
+MAGIC = b"HSPB"
+"""Cache file magic bytes."""
+
+FORMAT_VERSION = 1
+"""Cache format version."""
+
+_HEADER = struct.Struct("<4sHB8sQ")
+"""Header: magic, format version, compression, schema fingerprint, payload length."""
+
+_COMPRESSIONS = {None: 0, "zlib": 1, "lzma": 2}
+
+MessageT = TypeVar("MessageT", bound=Message)
+
+
+class CacheFormatError(ValueError):
+    """Cached data is invalid or doesn't match the expected message schema."""
+
+
+_FINGERPRINTS: Dict[type, bytes] = {}
+
+
+def schema_fingerprint(message_type: Type[Message]) -> bytes:
+    """Compute 8-byte fingerprint of a message schema."""
+    fingerprint = _FINGERPRINTS.get(message_type)
+    if fingerprint is None:
+        digest = hashlib.sha256()
+        _describe(message_type, digest, set())
+        fingerprint = _FINGERPRINTS[message_type] = digest.digest()[:8]
+    return fingerprint
+
+
+def _describe(message_type: type, digest: "hashlib._Hash", visited: Set[str]):
+    """Feed message schema description to a hash."""
+    digest.update(message_type.__name__.encode())
+    if message_type.__name__ in visited:
+        # Recursive message.
+        return
+    visited.add(message_type.__name__)
+    metadata = ProtoClassMetadata(message_type)
+    for name, field in sorted(
+        metadata.meta_by_field_name.items(), key=lambda item: item[1].number
+    ):
+        digest.update(f"|{field.number}:{name}:{field.proto_type}".encode())
+        if field.map_types:
+            digest.update(f"<{field.map_types[0]},{field.map_types[1]}>".encode())
+        for key in (name, f"{name}.value"):
+            nested = metadata.cls_by_field.get(key)
+            if isinstance(nested, type) and issubclass(nested, Message):
+                _describe(nested, digest, visited)
+    digest.update(b";")
+
+
+def _wire_type(message_type: Type[Message]) -> Type[Message]:
+    """Get lean backend counterpart of a message type with the same schema."""
+    wire_type = lean_type(message_type)
+    if schema_fingerprint(wire_type) == schema_fingerprint(message_type):
+        return wire_type
+    return message_type
+
+
+def dumps(message: Message, compression: Optional[str] = None, level: int = 6) -> bytes:
+    """Serialize message to cache format.
+
+    Arguments:
+        message -- message to serialize.
+
+    Keyword Arguments:
+        compression -- `zlib`, `lzma` or None (default: {None})
+        level -- compression level (default: {6})
+    """
+    try:
+        method = _COMPRESSIONS[compression]
+    except KeyError as error:
+        raise ValueError(f"Unknown compression {compression}.") from error
+    payload = bytes(convert(message, _wire_type(type(message))))
+    if compression == "zlib":
+        payload = zlib.compress(payload, level)
+    elif compression == "lzma":
+        payload = lzma.compress(payload, preset=level)
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, method, schema_fingerprint(type(message)), len(payload)
+    )
+    return header + payload
+
+
+def loads(
+    message_type: Type[MessageT], data: Union[bytes, memoryview, mmap.mmap]
+) -> MessageT:
+    """Deserialize message from cache format.
+
+    Raises:
+        CacheFormatError: if the data is invalid or the schema doesn't match.
+    """
+    if len(data) < _HEADER.size:
+        raise CacheFormatError("Cached data is truncated.")
+    magic, version, method, fingerprint, length = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise CacheFormatError("Not a cache file.")
+    if version != FORMAT_VERSION:
+        raise CacheFormatError(f"Unsupported cache format version {version}.")
+    if fingerprint != schema_fingerprint(message_type):
+        raise CacheFormatError(
+            f"Cached message schema doesn't match {message_type.__name__}."
+        )
+    if len(data) != _HEADER.size + length:
+        raise CacheFormatError("Cached data is truncated.")
+
+    if method not in _COMPRESSIONS.values():
+        raise CacheFormatError(f"Unknown compression method {method}.")
+    wire_type = _wire_type(message_type)
+    payload = memoryview(data)[_HEADER.size :]
+    try:
+        if method == 0:
+            message = wire_type().parse(payload)  # type: ignore
+        elif method == 1:
+            message = wire_type().parse(zlib.decompress(payload))
+        else:
+            message = wire_type().parse(lzma.decompress(payload))
+    except (zlib.error, lzma.LZMAError) as error:
+        raise CacheFormatError("Cached data is corrupted.") from error
+    finally:
+        payload.release()
+    return convert(message, message_type)
+
+
+def dump(
+    message: Message,
+    path: Union[str, "PathLike[str]"],
+    compression: Optional[str] = None,
+    level: int = 6,
+):
+    """Atomically write message to a cache file.
+
+    Keyword Arguments:
+        compression -- `zlib`, `lzma` or None (default: {None})
+        level -- compression level (default: {6})
+    """
+    path = Path(path)
+    temporary = path.with_name(f".{path.name}.{os.getpid()}")
+    temporary.write_bytes(dumps(message, compression, level))
+    os.replace(temporary, path)
+
+
+def load(message_type: Type[MessageT], path: Union[str, "PathLike[str]"]) -> MessageT:
+    """Load message from a cache file (memory-mapped).
+
+    Raises:
+        CacheFormatError: if the file is invalid or the schema doesn't match.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise CacheFormatError("Cached data is truncated.")
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return loads(message_type, mapped)
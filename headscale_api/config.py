@@ -1,9 +1,36 @@
 """Headscale config abstraction."""
 
+import asyncio
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from io import BytesIO
+from os import PathLike
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+import ruamel.yaml
+from pydantic import ValidationError
 from pydantic_yaml import YamlModelMixin
+from ruamel.yaml import YAML
+from ruamel.yaml.error import YAMLError
 
 from .schema.config import Model as ConfigModel
 
+YAML_C_ACCELERATED: bool = getattr(ruamel.yaml, "__with_libyaml__", False)
+"""Whether the C-accelerated YAML parser is available."""
+
+
+def yaml_load(data: bytes) -> Any:
+    """Load YAML document with the fastest available safe loader.
+
+    Uses the C-accelerated ruamel.yaml parser (from `ruamel.yaml.clib`) if it's
+    installed (see `YAML_C_ACCELERATED`) and the pure Python one otherwise. Both keep
+    the YAML 1.2 semantics used by pydantic_yaml.
+    """
+    return YAML(typ="safe", pure=not YAML_C_ACCELERATED).load(BytesIO(data))
+
 
 class HeadscaleConfig(YamlModelMixin, ConfigModel):
     """Headscale config abstraction.
@@ -11,4 +38,235 @@ class HeadscaleConfig(YamlModelMixin, ConfigModel):
     Can be loaded, e.g., from file with `parse_file()` or from string with
     `parse_raw()`. for more details look at pydantic_yaml documentation
     (https://pydantic-yaml.readthedocs.io/en/latest/).
+
+    For repeated loading of the same file use `load()`, which is cached.
     """
+
+    @classmethod
+    def load(
+        cls, path: Union[str, "PathLike[str]"], use_cache: bool = True
+    ) -> "FrozenHeadscaleConfig":
+        """Load config file using the fast YAML loader and parsed config cache.
+
+        The file is re-parsed only if its modification time or size changed and its
+        content hash differs from the cached one.
+
+        Arguments:
+            path -- path to the config file.
+
+        Keyword Arguments:
+            use_cache -- use the parsed config cache (default: {True})
+
+        Returns:
+            Immutable config model. It may be shared with other callers.
+        """
+        if not use_cache:
+            return FrozenHeadscaleConfig.parse_obj(yaml_load(Path(path).read_bytes()))
+        return _CONFIG_CACHE.load(Path(path))
+
+
+class FrozenHeadscaleConfig(HeadscaleConfig):
+    """Immutable Headscale config returned by `HeadscaleConfig.load()`.
+
+    Top-level fields can't be reassigned. Nested models are shared between callers
+    of `load()` and shouldn't be modified either.
+    """
+
+    class Config:  # pylint: disable=too-few-public-methods
+        """Model config."""
+
+        allow_mutation = False
+
+
+@dataclass(frozen=True)
+class _CacheEntry:
+    """Parsed config cache entry."""
+
+    mtime_ns: int
+    """File modification time."""
+
+    size: int
+    """File size."""
+
+    digest: bytes
+    """File content hash."""
+
+    config: FrozenHeadscaleConfig
+    """Parsed config."""
+
+
+class _ConfigCache:
+    """Parsed config cache keyed by path, modification time and content hash."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[Path, _CacheEntry] = {}
+
+    def load(self, path: Path) -> FrozenHeadscaleConfig:
+        """Load config from cache or parse it if the file has changed."""
+        path = path.resolve()
+        stat = path.stat()
+        with self._lock:
+            entry = self._entries.get(path)
+        if (
+            entry is not None
+            and entry.mtime_ns == stat.st_mtime_ns
+            and entry.size == stat.st_size
+        ):
+            return entry.config
+
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).digest()
+        if entry is None or entry.digest != digest:
+            config = FrozenHeadscaleConfig.parse_obj(yaml_load(data))
+        else:
+            config = entry.config
+        with self._lock:
+            self._entries[path] = _CacheEntry(
+                stat.st_mtime_ns, stat.st_size, digest, config
+            )
+        return config
+
+    def clear(self):
+        """Remove all the cache entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+_CONFIG_CACHE = _ConfigCache()
+
+
+@dataclass(frozen=True)
+class ConfigChange:
+    """Single field change between two configs."""
+
+    field: str
+    """Dotted path of the changed field (e.g., `dns_config.nameservers`)."""
+
+    old: Any
+    """Previous field value (None if it was not set)."""
+
+    new: Any
+    """New field value (None if it's not set anymore)."""
+
+
+def config_diff(old: HeadscaleConfig, new: HeadscaleConfig) -> List[ConfigChange]:
+    """Compute field-level differences between two configs.
+
+    Nested models are compared field by field, while other values (including lists)
+    are compared as a whole.
+    """
+
+    def diff(prefix: str, old_value: Any, new_value: Any) -> List[ConfigChange]:
+        if isinstance(old_value, dict) and isinstance(new_value, dict):
+            changes = []
+            for key in sorted(old_value.keys() | new_value.keys()):
+                changes.extend(
+                    diff(
+                        f"{prefix}{key}.",
+                        old_value.get(key),
+                        new_value.get(key),
+                    )
+                )
+            return changes
+        if old_value == new_value:
+            return []
+        return [ConfigChange(prefix[:-1], old_value, new_value)]
+
+    return diff("", old.dict(), new.dict())
+
+
+class HeadscaleConfigWatcher:
+    """Headscale config file watcher.
+
+    Polls the file cheaply (`stat()` and, if needed, content hash) and re-parses it only
+    when the content has changed, e.g.:
+
+    ```
+    watcher = HeadscaleConfigWatcher("/etc/headscale/config.yaml")
+    async for changes in watcher.watch():
+        if any(change.field == "server_url" for change in changes):
+            headscale.base_url = watcher.config.server_url
+    ```
+    """
+
+    def __init__(
+        self,
+        path: Union[str, "PathLike[str]"],
+        logger: Optional[logging.Logger] = None,
+    ):
+        """Initialize config watcher and load the config.
+
+        Arguments:
+            path -- path to the config file.
+
+        Keyword Arguments:
+            logger -- logger for invalid config reports. Module logger if None
+                (default: {None})
+        """
+        self.path = Path(path)
+        self.logger = logger or logging.getLogger(__name__)
+        self._config = HeadscaleConfig.load(self.path)
+        self._invalid_stat: Optional[Tuple[int, int]] = None
+
+    @property
+    def config(self) -> FrozenHeadscaleConfig:
+        """Get the last loaded config."""
+        return self._config
+
+    def poll(self) -> List[ConfigChange]:
+        """Check the file for changes.
+
+        An invalid file (e.g., partially written by an editor) is reported and the last
+        valid config is kept.
+
+        Returns:
+            List of changed fields. Empty if the config hasn't changed or is invalid.
+        """
+        try:
+            config = HeadscaleConfig.load(self.path)
+        except (OSError, YAMLError, ValidationError) as error:
+            try:
+                stat = self.path.stat()
+                invalid_stat: Optional[Tuple[int, int]] = (
+                    stat.st_mtime_ns,
+                    stat.st_size,
+                )
+            except OSError:
+                invalid_stat = None
+            if invalid_stat is None or invalid_stat != self._invalid_stat:
+                # Reported once per file version.
+                self.logger.error(
+                    "Invalid config %s, keeping the last valid one: %s",
+                    self.path,
+                    error,
+                )
+            self._invalid_stat = invalid_stat
+            return []
+        self._invalid_stat = None
+        if config is self._config:
+            return []
+        changes = config_diff(self._config, config)
+        self._config = config
+        return changes
+
+    async def watch(
+        self, interval: float = 1.0, stop: Optional[asyncio.Event] = None
+    ) -> AsyncIterator[List[ConfigChange]]:
+        """Poll the file periodically and yield non-empty lists of changes.
+
+        Keyword Arguments:
+            interval -- polling interval in seconds (default: {1.0})
+            stop -- event stopping the iteration once set (default: {None})
+        """
+        while stop is None or not stop.is_set():
+            changes = await asyncio.get_running_loop().run_in_executor(None, self.poll)
+            if changes:
+                yield changes
+            if stop is None:
+                await asyncio.sleep(interval)
+            else:
+                try:
+                    await asyncio.wait_for(stop.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
@@ -8,7 +8,7 @@ from typing import Generic, Literal, Optional, Type, TypeVar
 from betterproto import Message, ProtoClassMetadata
 from betterproto.casing import camel_case
 
-from .schema.headscale import v1 as schema
+from .backend import v1 as schema
 
 RequestT = TypeVar("RequestT", bound=Message)
 ResponseT = TypeVar("ResponseT", bound=Message)
@@ -0,0 +1,190 @@
+"""Federation of independent Headscale servers.
+
+Runs reads concurrently on all the servers and merges the results tagged with their
+source, while writes are routed to a single server by an owner key.
+"""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import asyncio
+import contextlib
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Mapping,
+    Optional,
+    TypeVar,
+)
+
+from betterproto import Message
+
+from .backend import v1 as model
+from .headscale import Headscale, ResponseError
+
+ItemT = TypeVar("ItemT")
+
+
+@dataclass
+class Sourced(Generic[ItemT]):
+    """Item tagged with the name of the server it comes from."""
+
+    source: str
+    """Name of the source server."""
+
+    item: ItemT
+    """The item (e.g., `Machine`)."""
+
+
+@dataclass
+class FederatedResult(Generic[ItemT]):
+    """Merged result of a read from all the servers."""
+
+    items: List[Sourced[ItemT]] = field(default_factory=list)
+    """Merged items from all the servers which succeeded."""
+
+    responses: Dict[str, Message] = field(default_factory=dict)
+    """Raw responses by server name."""
+
+    errors: Dict[str, BaseException] = field(default_factory=dict)
+    """Errors (including timeouts) by server name."""
+
+    @property
+    def complete(self) -> bool:
+        """Check if all the servers have responded successfully."""
+        return not self.errors
+
+
+class FederatedHeadscale:
+    """Federated Headscale API over many independent servers.
+
+    Reads are sent to all the servers concurrently and writes to the owning one, e.g.:
+
+    ```
+    federation = FederatedHeadscale(
+        {"eu": Headscale(eu_url, eu_key), "us": Headscale(us_url, us_key)},
+        timeout=5,
+        owner_resolver=lambda user: user.rsplit("@", 1)[-1],
+    )
+    async with federation.session:
+        machines = await federation.list_machines()
+        await federation.for_owner("marek@eu").create_user(CreateUserRequest("marek"))
+    ```
+    """
+
+    def __init__(
+        self,
+        instances: Mapping[str, Headscale],
+        timeout: Optional[float] = None,
+        owner_resolver: Optional[Callable[[str], str]] = None,
+    ):
+        """Initialize federated Headscale API.
+
+        Arguments:
+            instances -- Headscale APIs by server name.
+
+        Keyword Arguments:
+            timeout -- per-server timeout of a read in seconds. A server which doesn't
+                respond in time is reported in `FederatedResult.errors`
+                (default: {None})
+            owner_resolver -- function resolving an owner key (e.g., user name) to
+                a server name. The owner key is the server name if None
+                (default: {None})
+        """
+        self.instances = dict(instances)
+        self.timeout = timeout
+        self.owner_resolver = owner_resolver or (lambda owner: owner)
+
+    @property
+    def session(self):
+        """Get session context (async) of all the servers."""
+        return self._session()
+
+    @contextlib.asynccontextmanager
+    async def _session(self) -> AsyncIterator[None]:
+        async with contextlib.AsyncExitStack() as stack:
+            for instance in self.instances.values():
+                await stack.enter_async_context(instance.session)
+            yield
+
+    def for_owner(self, owner: str) -> Headscale:
+        """Get the server responsible for an owner (e.g., for writes).
+
+        Raises:
+            KeyError: if the owner resolves to an unknown server.
+        """
+        name = self.owner_resolver(owner)
+        try:
+            return self.instances[name]
+        except KeyError as error:
+            raise KeyError(
+                f'Owner "{owner}" resolved to unknown server "{name}".'
+            ) from error
+
+    async def fan_out(
+        self, method: str, request: Message, items_field: str
+    ) -> FederatedResult[Any]:
+        """Call a read method on all the servers concurrently.
+
+        Arguments:
+            method -- name of the `Headscale` method (e.g., `list_machines`).
+            request -- request message sent to all the servers.
+            items_field -- name of the response field with the items to merge.
+
+        Returns:
+            Merged result. Partial failures are reported in its `errors`.
+        """
+
+        async def call(instance: Headscale) -> Any:
+            return await asyncio.wait_for(
+                getattr(instance, method)(request), self.timeout
+            )
+
+        names = list(self.instances)
+        responses = await asyncio.gather(
+            *(call(self.instances[name]) for name in names), return_exceptions=True
+        )
+
+        result: FederatedResult[Any] = FederatedResult()
+        for name, response in zip(names, responses):
+            if isinstance(response, tuple):
+                # Flask-compatible error response (raise_exception_on_error=False).
+                response = ResponseError.from_response(response)
+            if isinstance(response, BaseException):
+                if not isinstance(response, Exception):
+                    raise response
+                result.errors[name] = response
+                continue
+            result.responses[name] = response
+            result.items.extend(
+                Sourced(name, item) for item in getattr(response, items_field)
+            )
+        return result
+
+    async def list_machines(
+        self, request: Optional[model.ListMachinesRequest] = None
+    ) -> FederatedResult[model.Machine]:
+        """List machines on all the servers."""
+        return await self.fan_out(
+            "list_machines", request or model.ListMachinesRequest(""), "machines"
+        )
+
+    async def list_users(
+        self, request: Optional[model.ListUsersRequest] = None
+    ) -> FederatedResult[model.User]:
+        """List users on all the servers."""
+        return await self.fan_out(
+            "list_users", request or model.ListUsersRequest(), "users"
+        )
+
+    async def get_routes(
+        self, request: Optional[model.GetRoutesRequest] = None
+    ) -> FederatedResult[model.Route]:
+        """Get routes on all the servers."""
+        return await self.fan_out(
+            "get_routes", request or model.GetRoutesRequest(), "routes"
+        )
@@ -1,19 +1,50 @@
 """Headscale API abstraction."""
 
 __authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+import asyncio
+import contextlib
 import json
 import logging
+import os
+import socket
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
 from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta, timezone
 from json import JSONDecodeError
 from multiprocessing import Lock
-from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
-import aiohttp
 from betterproto import Message
+from betterproto.casing import pascal_case
 
+from .backend import convert, lean_type, to_lean
+from .backend import v1 as model
+from .breaker import CircuitBreaker, CircuitOpenError
 from .endpoints import ENDPOINTS, Endpoint
-from .schema.headscale import v1 as model
+from .replicas import Replica, ReplicaSet
+
+if TYPE_CHECKING:
+    import ssl
+
+    import aiohttp
+    import grpclib.client
+    from multidict import MultiMapping
+
+    from .config import HeadscaleConfig
 
 Response = Tuple[str, int]
 """Response in form acceptable by Flask.
@@ -45,6 +76,19 @@ class ResponseError(RuntimeError):
         """Make a Flask-compatible error response."""
         return json.dumps(asdict(self)), self.http_code
 
+    @classmethod
+    def from_response(cls, response: Tuple[Any, ...]) -> "ResponseError":
+        """Recreate error from a Flask-compatible error response.
+
+        Used for error responses returned when `raise_exception_on_error` is disabled.
+        """
+        body, http_code = response
+        try:
+            error = json.loads(body)
+            return cls(http_code, error["code"], error["message"], error["details"])
+        except (JSONDecodeError, KeyError, TypeError):
+            return cls(http_code, None, body, [])
+
     def raise_or_respond(
         self, raise_exception: bool, source_exception: Optional[BaseException] = None
     ) -> "Response":
@@ -65,14 +109,161 @@ class ResponseError(RuntimeError):
         return self.to_response()
 
 
+_HOP_BY_HOP_HEADERS = frozenset(
+    {
+        "connection",
+        "content-encoding",
+        "content-length",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+    }
+)
+"""Headers which don't apply to a passed through response.
+
+Content encoding and length are dropped as well, since aiohttp decompresses the body.
+"""
+
+
+Headers = List[Tuple[str, str]]
+"""Response headers as name-value pairs (a name can repeat, e.g., `Set-Cookie`)."""
+
+
+def _pass_through_headers(headers: "MultiMapping[str]") -> Headers:
+    """Filter upstream response headers, which can be passed through."""
+    return [
+        (name, value)
+        for name, value in headers.items()
+        if name.lower() not in _HOP_BY_HOP_HEADERS
+    ]
+
+
+@dataclass
+class RawResponse:
+    """Undecoded response from Headscale."""
+
+    status: int
+    """HTTP status code."""
+
+    headers: Headers
+    """Response headers (without hop-by-hop headers)."""
+
+    body: bytes
+    """Response body as received (JSON)."""
+
+    @classmethod
+    def from_error(cls, error: ResponseError) -> "RawResponse":
+        """Make raw JSON response from an error (e.g., gRPC error or open circuit)."""
+        body, status = error.to_response()
+        return cls(status, [("Content-Type", "application/json")], body.encode())
+
+    def to_response(self) -> Tuple[bytes, int, Headers]:
+        """Make a Flask-compatible response `(body, status, headers)`."""
+        return self.body, self.status, self.headers
+
+
+@dataclass
+class RawStreamResponse:
+    """Undecoded streamed response from Headscale."""
+
+    status: int
+    """HTTP status code."""
+
+    headers: Headers
+    """Response headers (without hop-by-hop headers)."""
+
+    chunks: AsyncIterator[bytes]
+    """Response body chunks."""
+
+
 class UnauthorizedError(PermissionError):
     """The request resulted in unauthorized error response."""
 
 
+_GRPC_TO_HTTP_STATUS = {
+    "INVALID_ARGUMENT": 400,
+    "FAILED_PRECONDITION": 400,
+    "OUT_OF_RANGE": 400,
+    "UNAUTHENTICATED": 401,
+    "PERMISSION_DENIED": 403,
+    "NOT_FOUND": 404,
+    "ALREADY_EXISTS": 409,
+    "ABORTED": 409,
+    "RESOURCE_EXHAUSTED": 429,
+    "CANCELLED": 499,
+    "UNIMPLEMENTED": 501,
+    "UNAVAILABLE": 503,
+    "DEADLINE_EXCEEDED": 504,
+}
+"""gRPC status to HTTP code mapping (as done by grpc-gateway)."""
+
+
+def _unix_socket_reachable(path: str) -> bool:
+    """Check if a unix socket accepts connections."""
+    if not os.path.exists(path):
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def _tcp_port_reachable(host: str, port: int, timeout: float = 1) -> bool:
+    """Check if a TCP port accepts connections."""
+    try:
+        with socket.create_connection((host, port), timeout):
+            return True
+    except OSError:
+        return False
+
+
+_API_KEY_MISS_REFRESH_INTERVAL = 1.0
+"""Minimum time in seconds between API key index refreshes caused by a missing key."""
+
 MessageT = TypeVar("MessageT", bound=Message)
 """Message type for Headscale._unary_unary() function."""
 
 
+def _method_route(method: str) -> str:
+    """Get route of a service method (e.g., `list_machines`)."""
+    return f"/headscale.v1.HeadscaleService/{pascal_case(method)}"
+
+
+async def _single_chunk(body: bytes) -> AsyncIterator[bytes]:
+    """Iterate over a body read at once."""
+    yield body
+
+
+def _decode_message(response_type: Type[MessageT], body: bytes) -> MessageT:
+    """Decode JSON response body to a message."""
+    return response_type.from_dict(json.loads(body))  # type: ignore
+
+
+class _ResponseFormatMap(Dict[str, Any]):
+    """Request fields for log message formatting.
+
+    Response fields are converted to a dictionary only if the message refers to
+    a field, which is not in the request.
+    """
+
+    def __init__(self, request_dict: Dict[str, Any], response: Message):
+        super().__init__(request_dict)
+        self._response: Optional[Message] = response
+
+    def __missing__(self, key: str) -> Any:
+        if self._response is None:
+            raise KeyError(key)
+        self.update(self._response.to_dict())  # type: ignore
+        self._response = None
+        return self[key]
+
+
 class Headscale(
     model.HeadscaleServiceStub
 ):  # pylint: disable=too-many-instance-attributes
@@ -83,7 +274,9 @@ class Headscale(
 
         def __init__(self, parent: "Headscale") -> None:
             self._session_lock = Lock()
-            self._session: Optional[aiohttp.ClientSession] = None
+            self._session: Optional["aiohttp.ClientSession"] = None
+            self._session_base_urls: Tuple[str, ...] = ()
+            self._retired_sessions: List["aiohttp.ClientSession"] = []
             self._session_users = 0
             self._parent = parent
 
@@ -92,12 +285,53 @@ class Headscale(
 
             If needed creates an `aiohttp.ClientSession`.
             """
+            # Imported here, since aiohttp is costly to import and not needed
+            # until the first request.
+            import aiohttp  # pylint: disable=import-outside-toplevel
+
             with self._session_lock:
+                if (
+                    self._session is not None
+                    and self._session_base_urls != self._parent.base_urls
+                ):
+                    # Base URL has changed. The old session might be still in use by
+                    # other contexts, so it's closed once it can't be in use anymore.
+                    self._retire_session(self._session)
+                    self._session = None
                 if self._session_users == 0 or self._session is None:
-                    self._session = aiohttp.ClientSession(self._parent.base_url)
+                    # With several base URLs the requests use absolute URLs.
+                    self._session = aiohttp.ClientSession(
+                        self._parent.base_url
+                        if self._parent.replicas is None
+                        else None,
+                        connector=aiohttp.TCPConnector(
+                            limit=self._parent.connection_limit,
+                            ttl_dns_cache=self._parent.dns_cache_ttl,
+                            ssl=self._parent.ssl_context or True,
+                        ),
+                    )
+                    self._session_base_urls = self._parent.base_urls
                 self._session_users += 1
             return self._session
 
+        @property
+        def users(self) -> int:
+            """Get number of contexts using the session."""
+            return self._session_users
+
+        def _retire_session(self, session: "aiohttp.ClientSession"):
+            """Close session after all the requests using it have timed out."""
+            self._retired_sessions.append(session)
+
+            def close():
+                if session in self._retired_sessions:
+                    self._retired_sessions.remove(session)
+                    asyncio.ensure_future(session.close())
+
+            asyncio.get_running_loop().call_later(
+                (self._parent.timeout or 0) + 1, close
+            )
+
         async def __aexit__(self, *err: Any):
             """Exit Headscale API session context.
 
@@ -105,23 +339,41 @@ class Headscale(
             """
             with self._session_lock:
                 self._session_users -= 1
-                if self._session_users == 0 and self._session is not None:
-                    await self._session.close()
-                    self._session = None
+                if self._session_users == 0:
+                    for session in self._retired_sessions:
+                        await session.close()
+                    self._retired_sessions.clear()
+                    if self._session is not None:
+                        await self._session.close()
+                        self._session = None
 
     def __init__(  # pylint: disable=super-init-not-called,too-many-arguments
         self,
-        base_url: str,
+        base_url: Union[str, Sequence[str]],
         api_key: Optional[str] = None,
         requests_timeout: float = 10,
         raise_exception_on_error: bool = True,
         raise_unauthorized_error: bool = True,
         logger: Union[logging.Logger, int] = logging.INFO,
+        decode_executor: Optional[Executor] = None,
+        decode_offload_threshold: int = 256 * 1024,
+        connection_limit: int = 100,
+        api_key_cache_ttl: float = 60,
+        channel: Union[
+            "grpclib.client.Channel", Callable[[], "grpclib.client.Channel"], None
+        ] = None,
+        failover_timeout: float = 2,
+        circuit_breaker_factory: Callable[[], CircuitBreaker] = CircuitBreaker,
+        route_circuit_breaker_factory: Optional[Callable[[], CircuitBreaker]] = None,
+        slow_call_threshold: Optional[float] = None,
+        dns_cache_ttl: Optional[float] = 300,
+        ssl_context: Optional["ssl.SSLContext"] = None,
     ):
         """Initialize Headscale API.
 
         Arguments:
-            base_url -- base API URL (without `/api/v1`).
+            base_url -- base API URL (without `/api/v1`) or several base URLs of the
+                same server (e.g., behind different proxies) in order of preference.
 
         Keyword Arguments:
             api_key -- API key, which can be overridden later (default: {None})
@@ -134,14 +386,153 @@ class Headscale(
                 behaviour (default: {True})
             logger -- logger to use or default logging level
                 (default: {logging.INFO})
+            decode_executor -- thread pool to decode large responses in, so that
+                they don't block the event loop. Decoded on the event loop if None
+                (default: {None})
+            decode_offload_threshold -- minimum response body size in bytes to be
+                decoded in `decode_executor` (default: {256 * 1024})
+            connection_limit -- maximum number of simultaneous HTTP connections. Set
+                to 0 for no limit (default: {100})
+            api_key_cache_ttl -- maximum age in seconds of the API key index used
+                by `get_api_key_info()`. Set to 0 to disable caching (default: {60})
+            channel -- gRPC channel (or a function creating it on first use within
+                the event loop) to send the service calls over instead of the REST
+                API. `health_check()` and `test_api_key()` still use the REST API at
+                `base_url` (default: {None})
+            failover_timeout -- connection timeout in seconds of a single base URL
+                when several base URLs are given, after which the request fails over
+                to the next one (default: {2})
+            circuit_breaker_factory -- function creating circuit breaker of each base
+                URL when several base URLs are given (default: {CircuitBreaker})
+            route_circuit_breaker_factory -- function creating circuit breaker of each
+                route (e.g., `CircuitBreaker`). Calls to a route with an open circuit
+                fail immediately with `CircuitOpenError`. Route circuits are not used
+                if None (default: {None})
+            slow_call_threshold -- call duration in seconds, above which the call
+                counts as a failure for the route circuit breaker (default: {None})
+            dns_cache_ttl -- time in seconds for which resolved host addresses are
+                cached. Cached forever if None (default: {300})
+            ssl_context -- TLS context shared by all the HTTPS connections. Default
+                context is created on first use if None (default: {None})
+
+        Raises:
+            ValueError: if `decode_executor` is a process pool.
         """
-        self._base_url = base_url
+        if isinstance(decode_executor, ProcessPoolExecutor):
+            # The messages would have to be built or unpickled (parsed from the wire
+            # format) on the event loop, which is slower than decoding them there.
+            raise ValueError(
+                "Responses can't be decoded in a process pool. Use a thread pool."
+            )
+        self.failover_timeout = failover_timeout
+        self.circuit_breaker_factory = circuit_breaker_factory
+        self.route_circuit_breaker_factory = route_circuit_breaker_factory
+        self.slow_call_threshold = slow_call_threshold
+        self._route_breakers: Dict[str, CircuitBreaker] = {}
+        self.base_url = base_url  # type: ignore  # Setter accepts several URLs.
         self._api_key = api_key
         self.timeout = requests_timeout
         self.raise_exception_on_error = raise_exception_on_error
         self.raise_unauthorized_error = raise_unauthorized_error
         self.logger = logger
+        self.decode_executor = decode_executor
+        self.decode_offload_threshold = decode_offload_threshold
+        self.connection_limit = connection_limit
+        self.dns_cache_ttl = dns_cache_ttl
+        self._ssl_context = ssl_context
+        self._channel = channel
         self._session = self._SessionContext(self)
+        self.api_key_cache_ttl = api_key_cache_ttl
+        self._api_key_index: Optional[Dict[str, model.ApiKey]] = None
+        self._api_key_index_time = 0.0
+        self._api_key_index_expiry = 0.0
+        self._api_key_refresh: Optional["asyncio.Future[None]"] = None
+        self._reauthentication_lock = asyncio.Lock()
+
+    @classmethod
+    def from_config(
+        cls,
+        config: "HeadscaleConfig",
+        api_key: Optional[str] = None,
+        transports: Tuple[str, ...] = ("unix", "grpc", "rest"),
+        **kwargs: Any,
+    ) -> "Headscale":
+        """Create Headscale API using the cheapest transport available in config.
+
+        Transports are tried in the given order:
+
+        - `unix` -- gRPC over `unix_socket` if it's reachable locally (no TLS nor
+          API key needed),
+        - `grpc` -- gRPC to `grpc_listen_addr` port on `server_url` host if it's
+          reachable (TLS unless `grpc_allow_insecure` is set). A loopback listen
+          address is reachable only on the server host,
+        - `rest` -- REST API at `server_url`.
+
+        Arguments:
+            config -- Headscale server config.
+
+        Keyword Arguments:
+            api_key -- API key (default: {None})
+            transports -- allowed transports in order of preference
+                (default: {("unix", "grpc", "rest")})
+            kwargs -- other `Headscale` constructor arguments.
+
+        Raises:
+            ValueError: if no transport is available in the config.
+        """
+        # pylint: disable=import-outside-toplevel
+        from functools import partial
+        from urllib.parse import urlsplit
+
+        from grpclib.client import Channel
+
+        server_url = urlsplit(config.server_url or "")
+        for transport in transports:
+            if transport == "unix" and config.unix_socket is not None:
+                if _unix_socket_reachable(config.unix_socket):
+                    return cls(
+                        config.server_url or "http://localhost",
+                        api_key,
+                        channel=partial(Channel, path=config.unix_socket),
+                        **kwargs,
+                    )
+            elif transport == "grpc" and config.grpc_listen_addr:
+                host, _, port = config.grpc_listen_addr.rpartition(":")
+                if host in ("", "0.0.0.0", "[::]", "::"):
+                    host = server_url.hostname or "localhost"
+                host = host.strip("[]")
+                if _tcp_port_reachable(host, int(port)):
+                    return cls(
+                        config.server_url or f"http://{host}",
+                        api_key,
+                        channel=partial(
+                            Channel,
+                            host,
+                            int(port),
+                            ssl=None if config.grpc_allow_insecure else True,
+                        ),
+                        **kwargs,
+                    )
+            elif transport == "rest" and config.server_url:
+                return cls(config.server_url, api_key, **kwargs)
+        raise ValueError(f"None of the transports {transports} available in config.")
+
+    @property  # type: ignore  # Read-only view of the stub channel.
+    def channel(self) -> Optional["grpclib.client.Channel"]:
+        """Get gRPC channel if used as transport."""
+        if callable(self._channel):
+            self._channel = self._channel()
+        return self._channel
+
+    @property
+    def uses_grpc(self) -> bool:
+        """Check if gRPC channel is used as transport."""
+        return self._channel is not None
+
+    def close(self):
+        """Close the gRPC channel (if used and opened)."""
+        if self._channel is not None and not callable(self._channel):
+            self._channel.close()
 
     @property
     def logger(self):
@@ -171,6 +562,21 @@ class Headscale(
         """
         return self._session
 
+    @property
+    def ssl_context(self) -> Optional["ssl.SSLContext"]:
+        """Get TLS context shared by all the connections (None for plain HTTP).
+
+        It's kept for the lifetime of the API object, so that certificate stores are
+        loaded once and not on every new session.
+        """
+        if self._ssl_context is None and any(
+            url.startswith("https://") for url in self.base_urls
+        ):
+            import ssl  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
     @property
     def api_key(self) -> Optional[str]:
         """Get API key if saved.
@@ -183,6 +589,40 @@ class Headscale(
     def api_key(self, new_api_key: str):
         self._api_key = new_api_key
 
+    async def refresh_api_key(self) -> Optional[str]:
+        """Provide a new API key after the current one has been rejected.
+
+        Called by at most one request at a time, when a request fails with
+        `UnauthorizedError`. The other failed requests wait for the refresh and are
+        retried with the new key. Can be overridden in child class, e.g., to re-read
+        the key from a secret store.
+
+        Returns:
+            New API key or None if it can't be refreshed (the default).
+        """
+        return None
+
+    async def _reauthenticate(self, failed_api_key: Optional[str]) -> bool:
+        """Refresh API key after unauthorized response (once for all requests).
+
+        Arguments:
+            failed_api_key -- API key rejected by the server.
+
+        Returns:
+            True if the request should be retried with the current API key.
+        """
+        async with self._reauthentication_lock:
+            if self.api_key != failed_api_key:
+                # Refreshed meanwhile by another request.
+                return True
+            self.logger.warning("API key has been rejected. Refreshing...")
+            new_api_key = await self.refresh_api_key()
+            if new_api_key is None or new_api_key == failed_api_key:
+                self.logger.error("Failed to refresh the API key.")
+                return False
+            self.api_key = new_api_key
+            return True
+
     async def test_api_key(self, new_api_key: Optional[str] = None) -> bool:
         """Test a (new) API key.
 
@@ -195,7 +635,9 @@ class Headscale(
         if new_api_key is None:
             new_api_key = self.api_key
 
-        async with self.session as session, session.get(
+        async with self.session as session, self._request(
+            session,
+            "GET",
             "/api/v1/apikey",
             headers={
                 "Accept": "application/json",
@@ -224,14 +666,66 @@ class Headscale(
 
         api_key = api_key[:10]
         self.logger.debug("Looking for an API Key with prefix %s...", api_key)
-        for key in (await self.list_api_keys(model.ListApiKeysRequest())).api_keys:
-            if api_key == key.prefix:
-                self.logger.debug("Key with prefix %s found.", api_key)
-                return key
+        index = self._api_key_index
+        now = time.monotonic()
+        if (
+            index is None
+            or now >= self._api_key_index_expiry
+            or (
+                api_key not in index
+                and now - self._api_key_index_time >= _API_KEY_MISS_REFRESH_INTERVAL
+            )
+        ):
+            await self._refresh_api_key_index()
+            index = self._api_key_index or {}
+
+        key = index.get(api_key)
+        if key is not None:
+            self.logger.debug("Key with prefix %s found.", api_key)
+            return key
 
         self.logger.debug("Key with prefix %s not found.", api_key)
         return None
 
+    async def _refresh_api_key_index(self):
+        """Refresh API key index (concurrent refreshes share a single request)."""
+        if self._api_key_refresh is None:
+            self._api_key_refresh = asyncio.ensure_future(
+                self.list_api_keys(model.ListApiKeysRequest())
+            )
+            self._api_key_refresh.add_done_callback(self._api_key_refresh_done)
+        await asyncio.shield(self._api_key_refresh)
+
+    def _api_key_refresh_done(self, _: "asyncio.Future[Any]"):
+        self._api_key_refresh = None
+
+    def _update_api_key_index(self, api_keys: List[model.ApiKey]):
+        """Rebuild API key index from a full API key list.
+
+        The index expires after `api_key_cache_ttl` or on the nearest key expiration,
+        whichever is sooner.
+        """
+        now = time.monotonic()
+        ttl = self.api_key_cache_ttl
+        utc_now = datetime.now(timezone.utc)
+        for key in api_keys:
+            until_expiration = (key.expiration - utc_now).total_seconds()
+            if 0 < until_expiration < ttl:
+                ttl = until_expiration
+        self._api_key_index = {key.prefix: key for key in api_keys}
+        self._api_key_index_time = now
+        self._api_key_index_expiry = now + ttl
+
+    def _observe_response(self, route: str, response: Message):
+        """Update client-side caches with a successful response."""
+        if route == "/headscale.v1.HeadscaleService/ListApiKeys":
+            self._update_api_key_index(response.api_keys)  # type: ignore
+        elif route in (
+            "/headscale.v1.HeadscaleService/CreateApiKey",
+            "/headscale.v1.HeadscaleService/ExpireApiKey",
+        ):
+            self._api_key_index = None
+
     async def renew_api_key(
         self,
         key_to_renew: str | None = None,
@@ -298,19 +792,274 @@ class Headscale(
         return new_key.api_key
 
     @property
-    def base_url(self):
-        """Get base URL of the Headscale server."""
-        return self._base_url
+    def base_url(self) -> str:
+        """Get base URL of the Headscale server (the preferred one if several).
+
+        Can be changed at runtime (e.g., on config change) to a single or several
+        base URLs. Subsequent requests use a new session, while the requests in
+        flight finish on the old one.
+        """
+        return self._base_urls[0]
+
+    @base_url.setter
+    def base_url(self, new_base_url: Union[str, Sequence[str]]):
+        if isinstance(new_base_url, str):
+            new_base_url = [new_base_url]
+        if not new_base_url:
+            raise ValueError("At least one base URL is required.")
+        self._base_urls = tuple(new_base_url)
+        self._replicas = (
+            ReplicaSet(self._base_urls, self.circuit_breaker_factory)
+            if len(self._base_urls) > 1
+            else None
+        )
+
+    @property
+    def base_urls(self) -> Tuple[str, ...]:
+        """Get all base URLs of the Headscale server."""
+        return self._base_urls
+
+    @property
+    def replicas(self) -> Optional[ReplicaSet]:
+        """Get base URL replicas with their state if several base URLs are used."""
+        return self._replicas
 
     async def health_check(self) -> bool:
         """Perform a health check.
 
-        Returns True if check passed.
+        With several base URLs all of them are checked concurrently. Circuit breakers
+        of the failed ones are opened and of the healthy ones closed, so that the
+        check can be run periodically to drive failover.
+
+        Returns True if check passed (on any of the base URLs).
         """
-        async with self.session as session, session.get(
-            "/health", timeout=self.timeout
-        ) as response:
-            return response.status == 200
+        if self._replicas is None:
+            async with self.session as session, session.get(
+                "/health", timeout=self.timeout
+            ) as response:
+                return response.status == 200
+
+        # pylint: disable=import-outside-toplevel
+        import aiohttp
+
+        async def check(session: "aiohttp.ClientSession", replica: Replica) -> bool:
+            try:
+                async with session.get(
+                    replica.url + "/health",
+                    timeout=aiohttp.ClientTimeout(
+                        total=self.timeout, sock_connect=self.failover_timeout
+                    ),
+                ) as response:
+                    healthy = response.status == 200
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                self.logger.warning("Health check of %s failed: %r", replica.url, error)
+                healthy = False
+            if healthy:
+                replica.breaker.reset()
+            else:
+                replica.breaker.trip()
+            return healthy
+
+        async with self.session as session:
+            results = await asyncio.gather(
+                *(check(session, replica) for replica in self._replicas.replicas)
+            )
+        return any(results)
+
+    async def warmup(self, connections: int = 4) -> bool:
+        """Prepare the connection pool for the first requests.
+
+        Performs a health check, which resolves the host names (cached for
+        `dns_cache_ttl`) and opens the first connection, and then opens the rest of
+        the connections to each healthy base URL concurrently. The connections are
+        kept in the pool only while the session is open, so it should be called within
+        a long-lived `session` context (e.g., on application start-up).
+
+        Keyword Arguments:
+            connections -- number of connections to open to each base URL (limited
+                by `connection_limit`, if set) (default: {4})
+
+        Returns:
+            True if health check passed (on any of the base URLs).
+        """
+        # pylint: disable=import-outside-toplevel
+        import aiohttp
+
+        async with self.session as session:
+            if self._session.users == 1:
+                self.logger.warning(
+                    "Warming up outside of a session. The connections won't be kept."
+                )
+            try:
+                healthy = await self.health_check()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                self.logger.warning("Health check failed: %r", error)
+                return False
+            if not healthy:
+                return False
+
+            if self._replicas is None:
+                urls = [""]
+            else:
+                urls = [
+                    replica.url
+                    for replica in self._replicas.replicas
+                    if replica.breaker.available
+                ]
+
+            async def connect(url: str):
+                try:
+                    async with session.get(url + "/health", timeout=self.timeout):
+                        pass
+                except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                    self.logger.warning(
+                        "Opening connection to %s failed: %r",
+                        url or self.base_url,
+                        error,
+                    )
+
+            # One of the requests reuses the connection of the health check.
+            count = (
+                min(connections, self.connection_limit // len(urls))
+                if self.connection_limit > 0
+                else connections
+            )
+            await asyncio.gather(*(connect(url) for url in urls for _ in range(count)))
+        return True
+
+    @contextlib.asynccontextmanager
+    async def _request(
+        self, session: "aiohttp.ClientSession", method: str, path: str, **kwargs: Any
+    ) -> AsyncIterator["aiohttp.ClientResponse"]:
+        """Send HTTP request to the base URL or fail over between several ones.
+
+        Reads (GET) are balanced by observed latency and fail over on any connection
+        error, timeout or server error (5xx) response. The last server error response
+        is passed through if no base URL succeeds. Other requests go to the preferred
+        available base URL and fail over only if the connection couldn't be
+        established, so that they're never applied twice.
+
+        Raises:
+            CircuitOpenError: if circuits of all the base URLs are open.
+        """
+        if self._replicas is None:
+            async with session.request(method, path, **kwargs) as response:
+                yield response
+            return
+
+        # pylint: disable=import-outside-toplevel
+        import aiohttp
+
+        kwargs["timeout"] = aiohttp.ClientTimeout(
+            total=kwargs.get("timeout", self.timeout),
+            sock_connect=self.failover_timeout,
+        )
+        idempotent = method == "GET"
+        # Errors raised before the request has been sent (connection timeout can be
+        # told apart from other timeouts since aiohttp 3.10).
+        connection_errors = (
+            aiohttp.ClientConnectorError,
+            getattr(aiohttp, "ConnectionTimeoutError", aiohttp.ClientConnectorError),
+        )
+        last_error: Optional[BaseException] = None
+        # Server error response of a read kept in case all the base URLs fail.
+        failed: Optional["aiohttp.ClientResponse"] = None
+        try:
+            for replica in self._replicas.candidates(balance=idempotent):
+                if not replica.breaker.allow():
+                    continue
+                start = time.monotonic()
+                try:
+                    response = await session.request(
+                        method, replica.url + path, **kwargs
+                    )
+                except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                    replica.record_failure()
+                    if not idempotent and not isinstance(error, connection_errors):
+                        raise
+                    last_error = error
+                else:
+                    if response.status < 500:
+                        replica.record_success(time.monotonic() - start)
+                    else:
+                        replica.record_failure()
+                        if idempotent:
+                            if failed is not None:
+                                failed.release()
+                            failed = response
+                            self.logger.warning(
+                                "Request to %s failed (HTTP %d). Failing over.",
+                                replica.url,
+                                response.status,
+                            )
+                            continue
+                    async with response:
+                        yield response
+                    return
+                self.logger.warning(
+                    "Request to %s failed (%r). Failing over.", replica.url, last_error
+                )
+            if failed is not None:
+                response, failed = failed, None
+                async with response:
+                    yield response
+                return
+        finally:
+            if failed is not None:
+                failed.release()
+        if last_error is not None:
+            raise last_error
+        raise CircuitOpenError(", ".join(self._base_urls), self._replicas.retry_after())
+
+    async def _grpc_unary_unary(
+        self,
+        route: str,
+        request: Message,
+        response_type: Type[MessageT],
+        timeout: Optional[float],
+        api_key: Optional[str],
+    ) -> Union[MessageT, Response]:
+        """Execute an unary operation over gRPC channel.
+
+        The messages are encoded and decoded with the lean backend and converted to
+        the selected backend.
+        """
+        # pylint: disable=import-outside-toplevel
+        import grpclib.const
+        from grpclib.exceptions import GRPCError
+
+        assert self.channel is not None
+        request = to_lean(request)
+        try:
+            async with self.channel.request(
+                route,
+                grpclib.const.Cardinality.UNARY_UNARY,
+                type(request),
+                lean_type(response_type),
+                timeout=self.timeout if timeout is None else timeout,
+                metadata=(
+                    {"authorization": f"Bearer {api_key}"}
+                    if api_key is not None
+                    else None
+                ),
+            ) as stream:
+                await stream.send_message(request, end=True)
+                response = await stream.recv_message()
+        except GRPCError as error:
+            self.logger.error('Request to "%s" failed. (%s)', route, error.status.name)
+            if (
+                self.raise_unauthorized_error
+                and error.status == grpclib.const.Status.UNAUTHENTICATED
+            ):
+                raise UnauthorizedError() from error
+            return ResponseError(
+                _GRPC_TO_HTTP_STATUS.get(error.status.name, 500),
+                error.status.value,
+                error.message or error.status.name,
+                [],
+            ).raise_or_respond(self.raise_exception_on_error, error)
+        assert response is not None
+        return convert(response, response_type)
 
     async def _unary_unary(  # type: ignore
         self,
@@ -321,10 +1070,16 @@ class Headscale(
         timeout: Optional[Any] = None,
         deadline: Optional[Any] = None,  # pylint: disable=unused-argument
         metadata: Optional[Any] = None,  # pylint: disable=unused-argument
-    ) -> Union[MessageT, Response]:
+        raw: bool = False,
+    ) -> Union[MessageT, Response, RawResponse]:
         """Execute an unary operation on the API.
 
         Used by HeadscaleServiceStub functions.
+
+        Keyword Arguments:
+            raw -- return the response undecoded as `RawResponse` (including error
+                responses, which are passed through as well). Over gRPC the response
+                message is encoded to JSON (default: {False})
         """
         try:
             endpoint = ENDPOINTS[route]
@@ -339,17 +1094,154 @@ class Headscale(
         )
         self.logger.info(endpoint.logger_start_message.format_map(request_dict))
 
+        breaker = self.route_breaker(route)
+        if breaker is None:
+            return await self._call(
+                route, endpoint, request, request_dict, response_type, timeout, raw
+            )
+
+        if not breaker.allow():
+            open_error = CircuitOpenError(route, breaker.retry_after)
+            self.logger.error(str(open_error))
+            if self.raise_exception_on_error:
+                raise open_error
+            response_error = ResponseError(503, None, str(open_error), [])
+            if raw:
+                return RawResponse.from_error(response_error)
+            return response_error.to_response()
+
+        start = time.monotonic()
+        try:
+            response = await self._call(
+                route, endpoint, request, request_dict, response_type, timeout, raw
+            )
+        except UnauthorizedError:
+            breaker.record_success()
+            raise
+        except ResponseError as error:
+            self._record_route_outcome(breaker, error.http_code < 500)
+            raise
+        except CircuitOpenError:
+            # All the base URLs are down, which says nothing about the route.
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        if isinstance(response, tuple):
+            self._record_route_outcome(breaker, response[1] < 500)
+        elif isinstance(response, RawResponse) and response.status != 200:
+            self._record_route_outcome(breaker, response.status < 500)
+        else:
+            self._record_route_outcome(
+                breaker,
+                self.slow_call_threshold is None
+                or time.monotonic() - start <= self.slow_call_threshold,
+            )
+        return response
+
+    def route_breaker(self, route: str) -> Optional[CircuitBreaker]:
+        """Get circuit breaker of a route (e.g., to inspect or reset it).
+
+        Returns:
+            Circuit breaker or None if route circuits are not used.
+        """
+        if self.route_circuit_breaker_factory is None:
+            return None
+        breaker = self._route_breakers.get(route)
+        if breaker is None:
+            breaker = self._route_breakers[route] = self.route_circuit_breaker_factory()
+        return breaker
+
+    @staticmethod
+    def _record_route_outcome(breaker: CircuitBreaker, success: bool):
+        """Record call outcome in route circuit breaker."""
+        if success:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+
+    async def _call(  # pylint: disable=too-many-arguments
+        self,
+        route: str,
+        endpoint: Endpoint,
+        request: Message,
+        request_dict: Dict[str, Any],
+        response_type: Type[MessageT],
+        timeout: Optional[Any],
+        raw: bool = False,
+    ) -> Union[MessageT, Response, RawResponse]:
+        """Send request and retry it once if the API key has been refreshed."""
+        api_key = self.api_key
+        try:
+            return await self._send(
+                route,
+                endpoint,
+                request,
+                request_dict,
+                response_type,
+                timeout,
+                api_key,
+                raw,
+            )
+        except UnauthorizedError:
+            if not await self._reauthenticate(api_key):
+                raise
+        self.logger.info("Retrying the request with a refreshed API key.")
+        return await self._send(
+            route,
+            endpoint,
+            request,
+            request_dict,
+            response_type,
+            timeout,
+            self.api_key,
+            raw,
+        )
+
+    async def _send(  # pylint: disable=too-many-arguments
+        self,
+        route: str,
+        endpoint: Endpoint,
+        request: Message,
+        request_dict: Dict[str, Any],
+        response_type: Type[MessageT],
+        timeout: Optional[Any],
+        api_key: Optional[str],
+        raw: bool = False,
+    ) -> Union[MessageT, Response, RawResponse]:
+        """Send a single request to the API with a given API key."""
+        if self.uses_grpc:
+            try:
+                grpc_response = await self._grpc_unary_unary(
+                    route, request, response_type, timeout, api_key
+                )
+            except ResponseError as error:
+                # Raw error responses are passed through as on the REST API.
+                if raw:
+                    return RawResponse.from_error(error)
+                raise
+            if isinstance(grpc_response, tuple):
+                if raw:
+                    error_body, status = grpc_response
+                    return RawResponse(
+                        status,
+                        [("Content-Type", "application/json")],
+                        error_body.encode(),
+                    )
+                return grpc_response
+            self._log_success(endpoint, request_dict, grpc_response)
+            self._observe_response(route, grpc_response)
+            if raw:
+                return RawResponse(
+                    200,
+                    [("Content-Type", "application/json")],
+                    grpc_response.to_json().encode(),
+                )
+            return grpc_response
+
         api_url = endpoint.api_url.format_map(request_dict)
-        async with self.session as session, session.request(
-            endpoint.request_type,
-            api_url,
-            params=request_dict if endpoint.request_type == "GET" else None,
-            json=request_dict if endpoint.request_type != "GET" else None,
-            headers={
-                "Accept": "application/json",
-                "Authorization": f"Bearer {self.api_key}",
-            },
-            timeout=self.timeout if timeout is None else timeout,
+        async with self._rest_request(
+            endpoint, api_url, request_dict, api_key, timeout
         ) as response:
 
             def error_message():
@@ -361,6 +1253,18 @@ class Headscale(
                 self.logger.error(message)
                 return message
 
+            if raw:
+                body = await response.read()
+                if response.status != 200:
+                    error_message()
+                    if self.raise_unauthorized_error and body == b"Unauthorized":
+                        raise UnauthorizedError()
+                else:
+                    self.logger.debug('Request to "%s" succeeded.', api_url)
+                return RawResponse(
+                    response.status, _pass_through_headers(response.headers), body
+                )
+
             if response.status != 200:
                 error_message()
                 # Unauthorized error special handling.
@@ -382,21 +1286,165 @@ class Headscale(
                     ).raise_or_respond(self.raise_exception_on_error, error)
 
             try:
-                response_parsed: MessageT = response_type.from_dict(  # type: ignore
-                    await response.json()
+                response_parsed = await self._decode(
+                    response_type, await response.read()
                 )
             except (JSONDecodeError, AssertionError, ValueError) as error:
                 return ResponseError(500, 0, error_message(), []).raise_or_respond(
                     self.raise_exception_on_error, error
                 )
 
-            if endpoint.logger_success_message is not None:
-                self.logger.info(
-                    endpoint.logger_success_message.format_map(
-                        dict(request_dict, **response_parsed.to_dict())  # type: ignore
-                    )
+            self._log_success(endpoint, request_dict, response_parsed)
+            self._observe_response(route, response_parsed)
+            return response_parsed
+
+    @contextlib.asynccontextmanager
+    async def _rest_request(
+        self,
+        endpoint: Endpoint,
+        api_url: str,
+        request_dict: Dict[str, Any],
+        api_key: Optional[str],
+        timeout: Optional[Any],
+    ) -> AsyncIterator["aiohttp.ClientResponse"]:
+        """Send request of an endpoint to the REST API."""
+        async with self.session as session, self._request(
+            session,
+            endpoint.request_type,
+            api_url,
+            params=request_dict if endpoint.request_type == "GET" else None,
+            json=request_dict if endpoint.request_type != "GET" else None,
+            headers={
+                "Accept": "application/json",
+                "Authorization": f"Bearer {api_key}",
+            },
+            timeout=self.timeout if timeout is None else timeout,
+        ) as response:
+            yield response
+
+    async def raw(
+        self, method: str, request: Message, timeout: Optional[float] = None
+    ) -> RawResponse:
+        """Call API method and return its response undecoded.
+
+        Meant for passing the responses through (e.g., to a browser) without the cost
+        of decoding them. Error responses are passed through as well, e.g.:
+
+        ```
+        @app.route("/machines")
+        async def machines():
+            response = await headscale.raw("list_machines", ListMachinesRequest(""))
+            return response.to_response()
+        ```
+
+        Arguments:
+            method -- name of the service method (e.g., `list_machines`).
+            request -- request message.
+
+        Keyword Arguments:
+            timeout -- request timeout in seconds. Uses `requests_timeout` if None
+                (default: {None})
+        """
+        route = _method_route(method)
+        endpoint = ENDPOINTS.get(route)
+        response_type: Type[Message] = Message
+        if isinstance(endpoint, Endpoint):
+            response_type = endpoint.response_schema
+        # Otherwise, the route fails as not supported in `_unary_unary()`.
+        response = await self._unary_unary(
+            route,
+            request,
+            response_type,
+            timeout=timeout,
+            raw=True,
+        )
+        assert isinstance(response, RawResponse)
+        return response
+
+    @contextlib.asynccontextmanager
+    async def raw_stream(
+        self,
+        method: str,
+        request: Message,
+        chunk_size: int = 64 * 1024,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[RawStreamResponse]:
+        """Call API method and stream its response body undecoded.
+
+        Always uses the REST API. The request is not retried after reauthentication
+        and doesn't go through the route circuit breaker, e.g.:
+
+        ```
+        async with headscale.raw_stream("list_machines", request) as response:
+            async for chunk in response.chunks:
+                await client.write(chunk)
+        ```
+
+        Arguments:
+            method -- name of the service method (e.g., `list_machines`).
+            request -- request message.
+
+        Keyword Arguments:
+            chunk_size -- maximum body chunk size in bytes (default: {64 * 1024})
+            timeout -- request timeout in seconds. Uses `requests_timeout` if None
+                (default: {None})
+
+        Raises:
+            UnauthorizedError: on unauthorized response if `raise_unauthorized_error`
+                is set.
+        """
+        route = _method_route(method)
+        try:
+            endpoint = ENDPOINTS[route]
+            assert isinstance(endpoint, Endpoint)
+        except KeyError as error:
+            raise NotImplementedError(
+                f'Route "{route}" not supported. Contact the module maintainer.'
+            ) from error
+
+        request_dict: Dict[str, Any] = request.to_dict(  # type: ignore
+            include_default_values=True
+        )
+        self.logger.info(endpoint.logger_start_message.format_map(request_dict))
+        api_url = endpoint.api_url.format_map(request_dict)
+        async with self._rest_request(
+            endpoint, api_url, request_dict, self.api_key, timeout
+        ) as response:
+            headers = _pass_through_headers(response.headers)
+            if response.status != 200:
+                self.logger.error(
+                    'Request to "%s" failed. (%d)', api_url, response.status
+                )
+                # Error bodies are small, so they're read at once.
+                body = await response.read()
+                if self.raise_unauthorized_error and body == b"Unauthorized":
+                    raise UnauthorizedError()
+                yield RawStreamResponse(response.status, headers, _single_chunk(body))
+            else:
+                yield RawStreamResponse(
+                    response.status, headers, response.content.iter_chunked(chunk_size)
                 )
-            return response_parsed  # type: ignore
+
+    def _log_success(
+        self, endpoint: Endpoint, request_dict: Dict[str, Any], response: Message
+    ):
+        """Log endpoint success message."""
+        if endpoint.logger_success_message is not None and self.logger.isEnabledFor(
+            logging.INFO
+        ):
+            self.logger.info(
+                endpoint.logger_success_message.format_map(
+                    _ResponseFormatMap(request_dict, response)
+                )
+            )
+
+    async def _decode(self, response_type: Type[MessageT], body: bytes) -> MessageT:
+        """Decode response body, offloading large bodies to `decode_executor`."""
+        if self.decode_executor is None or len(body) < self.decode_offload_threshold:
+            return _decode_message(response_type, body)
+        return await asyncio.get_running_loop().run_in_executor(
+            self.decode_executor, _decode_message, response_type, body
+        )
 
     async def _unary_stream(  # type: ignore
         self,
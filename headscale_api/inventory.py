@@ -0,0 +1,424 @@
+"""Persistent inventory snapshot store.
+
+Keeps the last known users, machines, routes and pre-auth keys in an SQLite database
+with indexes, so that they can be queried (e.g., by user, tag, IP address or last
+seen time) without contacting the server, e.g.:
+
+```
+store = InventoryStore("/var/cache/myapp/inventory.db")
+store.save_machines((await headscale.list_machines(ListMachinesRequest(""))).machines)
+...
+machines = store.machines(tag="tag:prod", seen_since=datetime.now() - timedelta(1))
+```
+
+The store is synchronous. Use it from an executor if the database is slow to access.
+"""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from os import PathLike
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+from betterproto import Message
+
+from .backend import v1 as model
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    kind TEXT PRIMARY KEY,
+    captured_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_name ON users (name);
+CREATE TABLE IF NOT EXISTS machines (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    user TEXT NOT NULL,
+    last_seen REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS machines_user ON machines (user);
+CREATE INDEX IF NOT EXISTS machines_last_seen ON machines (last_seen);
+CREATE TABLE IF NOT EXISTS machine_addresses (
+    address TEXT NOT NULL,
+    machine_id INTEGER NOT NULL REFERENCES machines (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS machine_addresses_address ON machine_addresses (address);
+CREATE INDEX IF NOT EXISTS machine_addresses_machine
+    ON machine_addresses (machine_id);
+CREATE TABLE IF NOT EXISTS machine_tags (
+    tag TEXT NOT NULL,
+    machine_id INTEGER NOT NULL REFERENCES machines (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS machine_tags_tag ON machine_tags (tag);
+CREATE INDEX IF NOT EXISTS machine_tags_machine ON machine_tags (machine_id);
+CREATE TABLE IF NOT EXISTS routes (
+    id INTEGER PRIMARY KEY,
+    machine_id INTEGER NOT NULL,
+    prefix TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS routes_machine ON routes (machine_id);
+CREATE INDEX IF NOT EXISTS routes_prefix ON routes (prefix);
+CREATE TABLE IF NOT EXISTS pre_auth_keys (
+    id TEXT PRIMARY KEY,
+    user TEXT NOT NULL,
+    expiration REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pre_auth_keys_user ON pre_auth_keys (user);
+"""
+
+
+def _serialize(message: Message) -> str:
+    # Default values are included, so that the message can be parsed back by the
+    # pydantic models, which require all the fields.
+    return json.dumps(message.to_dict(include_default_values=True), sort_keys=True)
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    return None if value is None else value.timestamp()
+
+
+class InventoryStore:
+    """SQLite store of the last known server inventory."""
+
+    def __init__(self, path: Union[str, "PathLike[str]"] = ":memory:"):
+        """Open (and if needed create) inventory database.
+
+        Keyword Arguments:
+            path -- database file (default: {":memory:"})
+        """
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.executescript(_SCHEMA)
+
+    def close(self):
+        """Close the database."""
+        self._connection.close()
+
+    def captured_at(self, kind: str) -> Optional[datetime]:
+        """Get time of the last capture of a kind.
+
+        Arguments:
+            kind -- `users`, `machines`, `routes` or `pre_auth_keys:<user>`.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT captured_at FROM captures WHERE kind = ?", (kind,)
+            ).fetchone()
+        return None if row is None else datetime.fromtimestamp(row[0], timezone.utc)
+
+    def _sync(  # pylint: disable=too-many-arguments
+        self,
+        kind: str,
+        rows: Dict[Any, Tuple[Any, ...]],
+        insert: str,
+        scope: str = "",
+        scope_arguments: Sequence[Any] = (),
+        captured_at: Optional[datetime] = None,
+        replace: bool = True,
+        on_insert: Optional[Callable[[sqlite3.Connection, Any], None]] = None,
+        capture: Optional[str] = None,
+    ) -> int:
+        """Write rows changed since the last capture in a single transaction.
+
+        Arguments:
+            kind -- table name.
+            rows -- new rows by primary key. The last column is the serialized
+                message, which is compared to the stored one.
+            insert -- insert statement of a row.
+
+        Keyword Arguments:
+            scope -- condition limiting the replaced rows (e.g., to one user)
+                (default: {""})
+            scope_arguments -- arguments of the scope condition (default: {()})
+            captured_at -- capture time (default: {None} - now)
+            replace -- `rows` are a full capture, so stored rows, which are not in
+                it are deleted. Otherwise, the rows are only upserted (default: {True})
+            on_insert -- function called with the connection and key of each written
+                row (default: {None})
+            capture -- name of the capture to record time of (default: {None} - table
+                name)
+
+        Returns:
+            Number of written and deleted rows.
+        """
+        captured_at = captured_at or datetime.now(timezone.utc)
+        with self._lock, self._connection as connection:
+            stored = dict(
+                connection.execute(
+                    f"SELECT id, data FROM {kind} {scope}", scope_arguments
+                ).fetchall()
+            )
+            changes = 0
+            if replace:
+                removed = [(key,) for key in stored.keys() - rows.keys()]
+                connection.executemany(f"DELETE FROM {kind} WHERE id = ?", removed)
+                changes += len(removed)
+            for key, row in rows.items():
+                if stored.get(key) == row[-1]:
+                    continue
+                connection.execute(insert, row)
+                if on_insert is not None:
+                    on_insert(connection, key)
+                changes += 1
+            if replace:
+                connection.execute(
+                    "INSERT OR REPLACE INTO captures (kind, captured_at) VALUES (?, ?)",
+                    (capture or kind, captured_at.timestamp()),
+                )
+        return changes
+
+    def save_users(
+        self,
+        users: Iterable[model.User],
+        captured_at: Optional[datetime] = None,
+        replace: bool = True,
+    ) -> int:
+        """Store users (only the changed users are written).
+
+        Keyword Arguments:
+            captured_at -- capture time (default: {None} - now)
+            replace -- the users are the full list, so other stored users are
+                deleted. Otherwise, only upsert the given users (default: {True})
+
+        Returns:
+            Number of written and deleted users.
+        """
+        return self._sync(
+            "users",
+            {user.id: (user.id, user.name, _serialize(user)) for user in users},
+            "INSERT OR REPLACE INTO users (id, name, data) VALUES (?, ?, ?)",
+            captured_at=captured_at,
+            replace=replace,
+        )
+
+    def save_machines(
+        self,
+        machines: Iterable[model.Machine],
+        captured_at: Optional[datetime] = None,
+        replace: bool = True,
+    ) -> int:
+        """Store machines (only the changed machines are written).
+
+        Keyword Arguments:
+            captured_at -- capture time (default: {None} - now)
+            replace -- the machines are the full list, so other stored machines are
+                deleted. Otherwise, only upsert the given (e.g., changed) machines
+                (default: {True})
+
+        Returns:
+            Number of written and deleted machines.
+        """
+        machines_by_id = {machine.id: machine for machine in machines}
+
+        def index(connection: sqlite3.Connection, machine_id: int):
+            machine = machines_by_id[machine_id]
+            for table in ("machine_addresses", "machine_tags"):
+                connection.execute(
+                    f"DELETE FROM {table} WHERE machine_id = ?", (machine_id,)
+                )
+            connection.executemany(
+                "INSERT INTO machine_addresses (address, machine_id) VALUES (?, ?)",
+                [(address, machine_id) for address in machine.ip_addresses],
+            )
+            connection.executemany(
+                "INSERT INTO machine_tags (tag, machine_id) VALUES (?, ?)",
+                [
+                    (tag, machine_id)
+                    for tag in set(machine.forced_tags) | set(machine.valid_tags)
+                ],
+            )
+
+        return self._sync(
+            "machines",
+            {
+                machine.id: (
+                    machine.id,
+                    machine.name,
+                    machine.user.name,
+                    _timestamp(machine.last_seen),
+                    _serialize(machine),
+                )
+                for machine in machines_by_id.values()
+            },
+            "INSERT OR REPLACE INTO machines (id, name, user, last_seen, data) "
+            "VALUES (?, ?, ?, ?, ?)",
+            captured_at=captured_at,
+            replace=replace,
+            on_insert=index,
+        )
+
+    def delete_machines(self, machine_ids: Iterable[int]):
+        """Delete machines (e.g., after they have been removed on the server)."""
+        with self._lock, self._connection as connection:
+            connection.executemany(
+                "DELETE FROM machines WHERE id = ?",
+                [(machine_id,) for machine_id in machine_ids],
+            )
+
+    def save_routes(
+        self,
+        routes: Iterable[model.Route],
+        captured_at: Optional[datetime] = None,
+        replace: bool = True,
+    ) -> int:
+        """Store routes (only the changed routes are written).
+
+        Keyword Arguments:
+            captured_at -- capture time (default: {None} - now)
+            replace -- the routes are the full list, so other stored routes are
+                deleted. Otherwise, only upsert the given routes (default: {True})
+
+        Returns:
+            Number of written and deleted routes.
+        """
+        return self._sync(
+            "routes",
+            {
+                route.id: (route.id, route.machine.id, route.prefix, _serialize(route))
+                for route in routes
+            },
+            "INSERT OR REPLACE INTO routes (id, machine_id, prefix, data) "
+            "VALUES (?, ?, ?, ?)",
+            captured_at=captured_at,
+            replace=replace,
+        )
+
+    def save_pre_auth_keys(
+        self,
+        user: str,
+        keys: Iterable[model.PreAuthKey],
+        captured_at: Optional[datetime] = None,
+        replace: bool = True,
+    ) -> int:
+        """Store pre-auth keys of a user (only the changed keys are written).
+
+        Keyword Arguments:
+            captured_at -- capture time (default: {None} - now)
+            replace -- the keys are the full list of the user, so other stored keys
+                of the user are deleted. Otherwise, only upsert the given keys
+                (default: {True})
+
+        Returns:
+            Number of written and deleted keys.
+        """
+        return self._sync(
+            "pre_auth_keys",
+            {
+                key.id: (key.id, user, _timestamp(key.expiration), _serialize(key))
+                for key in keys
+            },
+            "INSERT OR REPLACE INTO pre_auth_keys (id, user, expiration, data) "
+            "VALUES (?, ?, ?, ?)",
+            "WHERE user = ?",
+            (user,),
+            captured_at=captured_at,
+            replace=replace,
+            capture=f"pre_auth_keys:{user}",
+        )
+
+    def _query(
+        self, message_type: Type[Message], query: str, arguments: Sequence[Any] = ()
+    ) -> List[Any]:
+        with self._lock:
+            rows = self._connection.execute(query, arguments).fetchall()
+        # Decoded outside of the lock, so that it doesn't block the writers.
+        return [
+            message_type.from_dict(json.loads(data)) for (data,) in rows  # type: ignore
+        ]
+
+    def users(self, name: Optional[str] = None) -> List[model.User]:
+        """Get stored users, optionally only the ones with a given name."""
+        if name is None:
+            return self._query(model.User, "SELECT data FROM users ORDER BY name")
+        return self._query(model.User, "SELECT data FROM users WHERE name = ?", (name,))
+
+    def machines(
+        self,
+        user: Optional[str] = None,
+        tag: Optional[str] = None,
+        address: Optional[str] = None,
+        seen_since: Optional[datetime] = None,
+    ) -> List[model.Machine]:
+        """Get stored machines matching all the given criteria.
+
+        Keyword Arguments:
+            user -- owner name (default: {None})
+            tag -- effective (forced or valid) ACL tag (default: {None})
+            address -- tailnet IP address (default: {None})
+            seen_since -- minimum last seen time (default: {None})
+        """
+        conditions = []
+        arguments: List[Any] = []
+        if user is not None:
+            conditions.append("user = ?")
+            arguments.append(user)
+        if tag is not None:
+            conditions.append(
+                "id IN (SELECT machine_id FROM machine_tags WHERE tag = ?)"
+            )
+            arguments.append(tag)
+        if address is not None:
+            conditions.append(
+                "id IN (SELECT machine_id FROM machine_addresses WHERE address = ?)"
+            )
+            arguments.append(address)
+        if seen_since is not None:
+            conditions.append("last_seen >= ?")
+            arguments.append(seen_since.timestamp())
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._query(
+            model.Machine, f"SELECT data FROM machines {where} ORDER BY id", arguments
+        )
+
+    def routes(
+        self, machine_id: Optional[int] = None, prefix: Optional[str] = None
+    ) -> List[model.Route]:
+        """Get stored routes, optionally filtered by machine and prefix."""
+        conditions = []
+        arguments: List[Any] = []
+        if machine_id is not None:
+            conditions.append("machine_id = ?")
+            arguments.append(machine_id)
+        if prefix is not None:
+            conditions.append("prefix = ?")
+            arguments.append(prefix)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._query(
+            model.Route, f"SELECT data FROM routes {where} ORDER BY id", arguments
+        )
+
+    def pre_auth_keys(self, user: Optional[str] = None) -> List[model.PreAuthKey]:
+        """Get stored pre-auth keys (optionally of a user)."""
+        if user is None:
+            return self._query(
+                model.PreAuthKey, "SELECT data FROM pre_auth_keys ORDER BY id"
+            )
+        return self._query(
+            model.PreAuthKey,
+            "SELECT data FROM pre_auth_keys WHERE user = ? ORDER BY id",
+            (user,),
+        )
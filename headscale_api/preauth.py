@@ -0,0 +1,240 @@
+"""Pool of pre-created pre-auth keys for low-latency machine onboarding."""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import asyncio
+import contextlib
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from .backend import v1 as model
+from .headscale import Headscale, ResponseError
+
+
+@dataclass(frozen=True)
+class PreAuthKeySpec:
+    """Kind of pre-auth keys kept in the pool."""
+
+    user: str
+    """User the keys belong to."""
+
+    acl_tags: Tuple[str, ...] = ()
+    """ACL tags of the keys (e.g., `("tag:ci",)`)."""
+
+    reusable: bool = False
+    """Create reusable keys."""
+
+    ephemeral: bool = True
+    """Create ephemeral keys."""
+
+    def request(self, expiration: datetime) -> model.CreatePreAuthKeyRequest:
+        """Make key creation request."""
+        return model.CreatePreAuthKeyRequest(
+            user=self.user,
+            reusable=self.reusable,
+            ephemeral=self.ephemeral,
+            expiration=expiration,
+            acl_tags=list(self.acl_tags),
+        )
+
+
+class PreAuthKeyPool:  # pylint: disable=too-many-instance-attributes
+    """Pool of pre-created pre-auth keys.
+
+    Keeps `size` unused keys of each registered kind, hands them out without
+    a server round trip and refills the pool in the background. Keys close to their
+    expiration are expired on the server and replaced.
+
+    Registered key kinds are filled in the background once started, e.g.:
+
+    ```
+    pool = PreAuthKeyPool(headscale, [PreAuthKeySpec("ci", ("tag:ci",))])
+    pool.start()
+    ...
+    key = await pool.acquire(PreAuthKeySpec("ci", ("tag:ci",)))
+    ...
+    await pool.close()
+    ```
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        headscale: Headscale,
+        specs: Iterable[PreAuthKeySpec] = (),
+        size: int = 10,
+        key_lifetime: timedelta = timedelta(hours=1),
+        min_remaining: timedelta = timedelta(minutes=10),
+        concurrency: int = 4,
+        refill_interval: timedelta = timedelta(seconds=30),
+    ):
+        """Initialize pre-auth key pool.
+
+        Arguments:
+            headscale -- Headscale API to create keys with.
+
+        Keyword Arguments:
+            specs -- kinds of keys to keep in the pool. Other kinds are added on first
+                `acquire()` (default: {()})
+            size -- number of unused keys kept of each kind (default: {10})
+            key_lifetime -- expiration of the created keys
+                (default: {timedelta(hours=1)})
+            min_remaining -- minimum remaining validity of a handed out key. Pooled
+                keys closer to their expiration are expired and replaced
+                (default: {timedelta(minutes=10)})
+            concurrency -- maximum number of concurrent key creation requests
+                (default: {4})
+            refill_interval -- how often the background task checks the pool
+                (default: {timedelta(seconds=30)})
+        """
+        if key_lifetime <= min_remaining:
+            raise ValueError("Key lifetime must be longer than minimum remaining time.")
+        self.headscale = headscale
+        self.size = size
+        self.key_lifetime = key_lifetime
+        self.min_remaining = min_remaining
+        self.refill_interval = refill_interval
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._keys: Dict[PreAuthKeySpec, Deque[model.PreAuthKey]] = {
+            spec: deque() for spec in specs
+        }
+        self._refills: Dict[PreAuthKeySpec, "asyncio.Task[None]"] = {}
+        self._expirations: Set["asyncio.Task[None]"] = set()
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def available(self, spec: PreAuthKeySpec) -> int:
+        """Get number of pooled keys of a kind."""
+        return len(self._keys.get(spec, ()))
+
+    async def acquire(self, spec: PreAuthKeySpec) -> model.PreAuthKey:
+        """Take a key from the pool.
+
+        Creates the key directly if the pool of its kind is empty. Either way the
+        pool is refilled in the background.
+
+        Raises:
+            ResponseError: if the key had to be created and the creation failed (also
+                if `raise_exception_on_error` of the client is disabled).
+        """
+        keys = self._keys.setdefault(spec, deque())
+        key = None
+        while keys:
+            candidate = keys.popleft()
+            if self._is_fresh(candidate):
+                key = candidate
+                break
+            self._expire_in_background(candidate)
+        self.refill_in_background(spec)
+        if key is not None:
+            return key
+
+        self.headscale.logger.debug('Pre-auth key pool of "%s" is empty.', spec.user)
+        return await self._create(spec)
+
+    def refill_in_background(self, spec: PreAuthKeySpec) -> "asyncio.Task[None]":
+        """Start refilling the pool of a kind unless it's being refilled already."""
+        task = self._refills.get(spec)
+        if task is None or task.done():
+            task = self._refills[spec] = asyncio.ensure_future(self._refill(spec))
+        return task
+
+    async def refill(self, spec: Optional[PreAuthKeySpec] = None):
+        """Top up the pool of a kind (or of all kinds if None) to `size`.
+
+        Stale keys are expired first.
+        """
+        specs = list(self._keys) if spec is None else [spec]
+        await asyncio.gather(
+            *(asyncio.shield(self.refill_in_background(spec)) for spec in specs)
+        )
+
+    async def _refill(self, spec: PreAuthKeySpec):
+        keys = self._keys.setdefault(spec, deque())
+        fresh = [key for key in keys if self._is_fresh(key)]
+        for stale in (key for key in keys if not self._is_fresh(key)):
+            self._expire_in_background(stale)
+        keys.clear()
+        keys.extend(fresh)
+
+        async def create() -> bool:
+            try:
+                keys.append(await self._create(spec))
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                self.headscale.logger.error(
+                    'Failed to create pre-auth key for "%s": %s', spec.user, error
+                )
+                return False
+            return True
+
+        # Keys taken while refilling are replaced in the next round. A failure stops
+        # the refill until it's triggered again.
+        while (missing := self.size - len(keys)) > 0:
+            if not all(await asyncio.gather(*(create() for _ in range(missing)))):
+                break
+
+    async def _create(self, spec: PreAuthKeySpec) -> model.PreAuthKey:
+        async with self._semaphore:
+            response = await self.headscale.create_pre_auth_key(
+                spec.request(datetime.now(timezone.utc) + self.key_lifetime)
+            )
+        if isinstance(response, tuple):
+            # Error response (raise_exception_on_error is disabled).
+            raise ResponseError.from_response(response)
+        return response.pre_auth_key
+
+    def _is_fresh(self, key: model.PreAuthKey) -> bool:
+        return key.expiration - datetime.now(timezone.utc) > self.min_remaining
+
+    def _expire_in_background(self, key: model.PreAuthKey):
+        task = asyncio.ensure_future(self._expire(key))
+        self._expirations.add(task)
+        task.add_done_callback(self._expirations.discard)
+
+    async def _expire(self, key: model.PreAuthKey):
+        try:
+            async with self._semaphore:
+                response = await self.headscale.expire_pre_auth_key(
+                    model.ExpirePreAuthKeyRequest(user=key.user, key=key.key)
+                )
+            if isinstance(response, tuple):
+                raise ResponseError.from_response(response)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self.headscale.logger.warning("Failed to expire pre-auth key: %s", error)
+
+    def start(self) -> "asyncio.Task[None]":
+        """Start the background refill task in the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def run(self):
+        """Refill the pools periodically (runs until cancelled)."""
+        while True:
+            await self.refill()
+            await asyncio.sleep(self.refill_interval.total_seconds())
+
+    async def close(self, expire_unused: bool = True):
+        """Stop the background tasks.
+
+        Keyword Arguments:
+            expire_unused -- expire the pooled keys on the server (default: {True})
+        """
+        tasks: List["asyncio.Task[None]"] = list(self._refills.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._refills.clear()
+
+        if expire_unused:
+            for keys in self._keys.values():
+                for key in keys:
+                    self._expire_in_background(key)
+                keys.clear()
+        if self._expirations:
+            await asyncio.gather(*self._expirations)
@@ -0,0 +1,334 @@
+"""Streaming mass-provisioning pipeline with checkpoint and resume.
+
+Provisioning specs are read from a CSV or JSON-lines file one record at a time. Each
+record has a `kind` and the fields of the corresponding request:
+
+- `user` -- `name`,
+- `pre_auth_key` -- `user`, `reusable`, `ephemeral`, `expiration`, `acl_tags`,
+- `register_machine` -- `user`, `key`,
+- `set_tags` -- `machine_id`, `tags`.
+
+In CSV files lists are space-separated and booleans are `true`/`false`, e.g.:
+
+```
+kind,name,user,key,machine_id,tags,acl_tags,reusable,ephemeral,expiration
+user,marek,,,,,,,,
+pre_auth_key,,marek,,,,tag:ci,false,true,2030-01-01T00:00:00Z
+set_tags,,,,12,tag:ci tag:eu,,,,
+```
+"""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import asyncio
+import csv
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from os import PathLike
+from pathlib import Path
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Union,
+)
+
+from betterproto import Message
+
+from .backend import v1 as model
+from .headscale import Headscale, ResponseError
+
+Spec = Dict[str, Any]
+"""Single provisioning record."""
+
+
+def read_specs(path: Union[str, "PathLike[str]"]) -> Iterator[Spec]:
+    """Read provisioning records lazily from a CSV or JSON-lines file.
+
+    The format is chosen by file extension (`.csv` or anything else for JSON-lines).
+    Empty CSV cells and blank lines are skipped.
+    """
+    path = Path(path)
+    with path.open(newline="") as file:
+        if path.suffix.lower() == ".csv":
+            for row in csv.DictReader(file):
+                yield {key: value for key, value in row.items() if value}
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _to_list(value: Union[str, List[str], None]) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return value.split()
+    return list(value)
+
+
+def _to_bool(value: Union[str, bool, None]) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def _to_datetime(value: Optional[str], default: timedelta) -> datetime:
+    if not value:
+        return datetime.now(timezone.utc) + default
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class Checkpoint:
+    """Progress of a provisioning run.
+
+    Stores a watermark (all the records before it are finished), the finished records
+    after the watermark and the failed records, which are retried on resume. The
+    number of stored records after the watermark is bounded by the pipeline window.
+    """
+
+    def __init__(self, path: Optional[Union[str, "PathLike[str]"]] = None):
+        """Initialize checkpoint and load it from the file if it exists.
+
+        Keyword Arguments:
+            path -- checkpoint file. Progress is not persisted if None
+                (default: {None})
+        """
+        self.path = None if path is None else Path(path)
+        self.watermark = 0
+        self.done: Set[int] = set()
+        self.failed: Dict[int, str] = {}
+        if self.path is not None and self.path.exists():
+            data = json.loads(self.path.read_text())
+            self.watermark = data["watermark"]
+            self.done = set(data["done"])
+            self.failed = {int(index): error for index, error in data["failed"].items()}
+
+    def is_finished(self, index: int) -> bool:
+        """Check if a record has been provisioned successfully."""
+        if index in self.failed:
+            return False
+        return index < self.watermark or index in self.done
+
+    def finish(self, index: int, error: Optional[str] = None):
+        """Mark a record as finished (successfully or with an error)."""
+        if error is None:
+            self.failed.pop(index, None)
+        else:
+            self.failed[index] = error
+        if index < self.watermark:
+            # Retried failure.
+            return
+        self.done.add(index)
+        while self.watermark in self.done:
+            self.done.remove(self.watermark)
+            self.watermark += 1
+
+    def save(self):
+        """Atomically write the checkpoint file."""
+        if self.path is None:
+            return
+        temporary = self.path.with_name(f".{self.path.name}.tmp")
+        temporary.write_text(
+            json.dumps(
+                {
+                    "watermark": self.watermark,
+                    "done": sorted(self.done),
+                    "failed": self.failed,
+                }
+            )
+        )
+        os.replace(temporary, self.path)
+
+
+@dataclass
+class ProvisioningResult:
+    """Summary of a provisioning run."""
+
+    provisioned: int = 0
+    """Number of records provisioned in this run."""
+
+    skipped: int = 0
+    """Number of records skipped, because they were finished in a previous run."""
+
+    failed: Dict[int, str] = field(default_factory=dict)
+    """Errors of failed records by record index (including failures of previous
+    runs which haven't been retried)."""
+
+
+class Provisioner:  # pylint: disable=too-many-instance-attributes
+    """Streaming provisioning pipeline.
+
+    Specs are read lazily, so that large inputs are never loaded at once, e.g.:
+
+    ```
+    provisioner = Provisioner(headscale, "onboarding.checkpoint", concurrency=16)
+    async with headscale.session:
+        result = await provisioner.run(read_specs("employees.csv"))
+    ```
+
+    Records are processed concurrently, but a record referring to a user (e.g.,
+    `pre_auth_key`) waits for an earlier `user` record of the same name. Running
+    again with the same checkpoint file skips the finished records and retries the
+    failed ones.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        headscale: Headscale,
+        checkpoint: Union[str, "PathLike[str]", Checkpoint, None] = None,
+        concurrency: int = 8,
+        window: int = 1000,
+        checkpoint_interval: int = 100,
+        default_key_expiration: timedelta = timedelta(days=1),
+    ):
+        """Initialize provisioning pipeline.
+
+        Arguments:
+            headscale -- Headscale API to provision with.
+
+        Keyword Arguments:
+            checkpoint -- checkpoint or its file (default: {None})
+            concurrency -- maximum number of concurrent requests (default: {8})
+            window -- maximum distance between the first unfinished record and the
+                last read one. Bounds memory use if some records are slow
+                (default: {1000})
+            checkpoint_interval -- number of finished records between checkpoint
+                saves (default: {100})
+            default_key_expiration -- expiration of pre-auth keys without
+                `expiration` field (default: {timedelta(days=1)})
+        """
+        self.headscale = headscale
+        self.checkpoint = (
+            checkpoint if isinstance(checkpoint, Checkpoint) else Checkpoint(checkpoint)
+        )
+        self.concurrency = concurrency
+        self.window = window
+        self.checkpoint_interval = checkpoint_interval
+        self.default_key_expiration = default_key_expiration
+        self._users: Dict[str, "asyncio.Future[None]"] = {}
+
+    def _request(self, spec: Spec) -> Callable[[], Awaitable[Message]]:
+        """Make request of a record.
+
+        Raises:
+            ValueError: on unknown record kind.
+            KeyError: on missing required field.
+        """
+        kind = spec["kind"]
+        headscale = self.headscale
+        if kind == "user":
+            request = model.CreateUserRequest(name=spec["name"])
+            return lambda: headscale.create_user(request)
+        if kind == "pre_auth_key":
+            pre_auth_key_request = model.CreatePreAuthKeyRequest(
+                user=spec["user"],
+                reusable=_to_bool(spec.get("reusable")),
+                ephemeral=_to_bool(spec.get("ephemeral")),
+                expiration=_to_datetime(
+                    spec.get("expiration"), self.default_key_expiration
+                ),
+                acl_tags=_to_list(spec.get("acl_tags")),
+            )
+            return lambda: headscale.create_pre_auth_key(pre_auth_key_request)
+        if kind == "register_machine":
+            register_request = model.RegisterMachineRequest(
+                user=spec["user"], key=spec["key"]
+            )
+            return lambda: headscale.register_machine(register_request)
+        if kind == "set_tags":
+            tags_request = model.SetTagsRequest(
+                machine_id=int(spec["machine_id"]), tags=_to_list(spec.get("tags"))
+            )
+            return lambda: headscale.set_tags(tags_request)
+        raise ValueError(f'Unknown record kind "{kind}".')
+
+    async def _provision(self, spec: Spec):
+        """Provision a single record."""
+        send = self._request(spec)
+        user = spec.get("user")
+        if user is not None and user in self._users:
+            await asyncio.shield(self._users[user])
+        try:
+            response = await send()
+            if isinstance(response, tuple):
+                # Error response (raise_exception_on_error is disabled).
+                raise ResponseError.from_response(response)
+        except ResponseError as error:
+            # The user might have been created by an interrupted run.
+            if spec["kind"] != "user" or "already exists" not in error.message:
+                raise
+
+    async def run(self, specs: Iterable[Spec]) -> ProvisioningResult:
+        """Provision records from a (lazy) iterable.
+
+        Returns:
+            Summary of the run.
+        """
+        result = ProvisioningResult()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        window_changed = asyncio.Condition()
+        tasks: Set["asyncio.Task[None]"] = set()
+        since_save = 0
+
+        async def process(index: int, spec: Spec):
+            nonlocal since_save
+            try:
+                async with semaphore:
+                    await self._provision(spec)
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                self.headscale.logger.error("Record %d failed: %s", index, error)
+                self.checkpoint.finish(index, f"{type(error).__name__}: {error}")
+            else:
+                result.provisioned += 1
+                self.checkpoint.finish(index)
+            finally:
+                if spec.get("kind") == "user" and "name" in spec:
+                    user = self._users.pop(spec["name"], None)
+                    if user is not None:
+                        user.set_result(None)
+            since_save += 1
+            if since_save >= self.checkpoint_interval:
+                since_save = 0
+                self.checkpoint.save()
+            async with window_changed:
+                window_changed.notify_all()
+
+        def has_room(index: int) -> bool:
+            return (
+                index - self.checkpoint.watermark < self.window
+                and len(tasks) < self.concurrency * 2
+            )
+
+        try:
+            for index, spec in enumerate(specs):
+                if self.checkpoint.is_finished(index):
+                    result.skipped += 1
+                    continue
+                async with window_changed:
+                    await window_changed.wait_for(partial(has_room, index))
+                if spec.get("kind") == "user" and "name" in spec:
+                    self._users.setdefault(
+                        spec["name"], asyncio.get_running_loop().create_future()
+                    )
+                task = asyncio.create_task(process(index, spec))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            # Records interrupted (e.g., on cancellation) are retried on resume.
+            for task in tasks:
+                task.cancel()
+            self.checkpoint.save()
+        result.failed = dict(self.checkpoint.failed)
+        return result
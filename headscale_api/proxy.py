@@ -0,0 +1,247 @@
+"""Caching gRPC proxy of the Headscale API.
+
+Serves the whole `HeadscaleService` on top of `Headscale` clients, so that many local
+services can share one endpoint (and one set of upstream connections and cached
+responses) instead of each talking to the server on its own, e.g.:
+
+```
+proxy = HeadscaleProxy(Headscale(base_url, api_key), cache_ttl=10)
+server = grpclib.server.Server([proxy])
+async with proxy.session:
+    await server.start(path="/run/headscale-proxy.sock")
+    await server.wait_closed()
+```
+
+The service is served with the lean backend messages, since only they can be decoded
+from the wire format. With the (default) pydantic backend the requests and responses
+are converted for the clients.
+
+Reads are cached for `cache_ttl` seconds and identical concurrent reads are coalesced
+into a single upstream call. Any write invalidates the whole cache. All the callers use
+the API key of the proxy clients, so the proxy should be reachable only by trusted
+services (e.g., over a unix socket).
+"""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import asyncio
+import contextlib
+import json
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import grpclib
+import grpclib.const
+from betterproto import Message
+from betterproto.casing import snake_case
+
+from .backend import convert, to_lean
+from .backend import v1 as model
+from .breaker import CircuitOpenError
+from .endpoints import ENDPOINTS, Endpoint
+from .headscale import Headscale, ResponseError, UnauthorizedError
+from .schema.lean.headscale import v1 as lean
+
+_HTTP_TO_GRPC_STATUS = {
+    400: grpclib.const.Status.INVALID_ARGUMENT,
+    401: grpclib.const.Status.UNAUTHENTICATED,
+    403: grpclib.const.Status.PERMISSION_DENIED,
+    404: grpclib.const.Status.NOT_FOUND,
+    409: grpclib.const.Status.ALREADY_EXISTS,
+    429: grpclib.const.Status.RESOURCE_EXHAUSTED,
+    499: grpclib.const.Status.CANCELLED,
+    501: grpclib.const.Status.UNIMPLEMENTED,
+    503: grpclib.const.Status.UNAVAILABLE,
+    504: grpclib.const.Status.DEADLINE_EXCEEDED,
+}
+"""HTTP code to gRPC status mapping for errors without a gRPC code."""
+
+CacheKey = Tuple[str, str]
+"""Cache key: route and canonical JSON of the request."""
+
+
+def _grpc_error(http_code: int, code: Optional[int], message: str) -> grpclib.GRPCError:
+    """Convert error response to gRPC error."""
+    try:
+        status = grpclib.const.Status(code)
+    except ValueError:
+        status = _HTTP_TO_GRPC_STATUS.get(http_code, grpclib.const.Status.UNKNOWN)
+    if status == grpclib.const.Status.OK:
+        status = _HTTP_TO_GRPC_STATUS.get(http_code, grpclib.const.Status.UNKNOWN)
+    return grpclib.GRPCError(status, message)
+
+
+class HeadscaleProxy(lean.HeadscaleServiceBase):
+    """gRPC `HeadscaleService` forwarding calls to Headscale API clients."""
+
+    def __init__(
+        self,
+        clients: Union[Headscale, Sequence[Headscale]],
+        cache_ttl: float = 5,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize proxy.
+
+        Arguments:
+            clients -- upstream client or a small pool of clients (e.g., with
+                separate gRPC channels). Calls go to the least busy client.
+
+        Keyword Arguments:
+            cache_ttl -- time in seconds for which read responses are cached. Set to
+                0 to only coalesce concurrent reads (default: {5})
+            max_entries -- maximum number of cached responses (default: {1024})
+            clock -- monotonic time source (default: {time.monotonic})
+
+        Raises:
+            ValueError: if no client is given.
+        """
+        self.clients: List[Headscale] = (
+            [clients] if isinstance(clients, Headscale) else list(clients)
+        )
+        if not self.clients:
+            raise ValueError("At least one client is required.")
+        self.cache_ttl = cache_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        """Number of reads served from the cache."""
+        self.coalesced = 0
+        """Number of reads served by a concurrent identical read."""
+        self._cache: "OrderedDict[CacheKey, Tuple[float, Message]]" = OrderedDict()
+        self._reads: Dict[CacheKey, "asyncio.Future[Message]"] = {}
+        self._generation = 0
+        self._busy = [0] * len(self.clients)
+
+    @property
+    def session(self):
+        """Get session context (async) of all the clients."""
+        return self._session()
+
+    @contextlib.asynccontextmanager
+    async def _session(self) -> AsyncIterator[None]:
+        async with contextlib.AsyncExitStack() as stack:
+            for client in self.clients:
+                await stack.enter_async_context(client.session)
+            yield
+
+    def invalidate(self):
+        """Drop all the cached responses.
+
+        Reads, which are in progress, are not cached and new reads don't join them.
+        """
+        self._cache.clear()
+        self._reads.clear()
+        self._generation += 1
+
+    async def forward(self, route: str, request: Message) -> Message:
+        """Forward a call to the upstream server.
+
+        Raises:
+            grpclib.GRPCError: on error.
+        """
+        endpoint = ENDPOINTS[route]
+        assert isinstance(endpoint, Endpoint)
+        if endpoint.request_type != "GET":
+            try:
+                return await self._upstream(route, request)
+            finally:
+                # Even a failed write might have been applied.
+                self.invalidate()
+
+        key = (
+            route,
+            json.dumps(
+                request.to_dict(include_default_values=True),  # type: ignore
+                sort_keys=True,
+            ),
+        )
+        entry = self._cache.get(key)
+        if entry is not None:
+            if entry[0] > self.clock():
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._cache[key]
+
+        read = self._reads.get(key)
+        if read is not None:
+            self.coalesced += 1
+            return await asyncio.shield(read)
+
+        generation = self._generation
+        read = self._reads[key] = asyncio.ensure_future(self._upstream(route, request))
+        try:
+            # Shielded, so that a cancelled caller doesn't cancel the others.
+            response = await asyncio.shield(read)
+        finally:
+            if self._reads.get(key) is read:
+                del self._reads[key]
+        if self.cache_ttl > 0 and generation == self._generation:
+            self._cache[key] = (self.clock() + self.cache_ttl, response)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return response
+
+    async def _upstream(self, route: str, request: Message) -> Message:
+        """Send call to the least busy client."""
+        # pylint: disable=import-outside-toplevel
+        import aiohttp
+
+        index = min(range(len(self.clients)), key=self._busy.__getitem__)
+        self._busy[index] += 1
+        try:
+            response = await getattr(
+                self.clients[index], snake_case(route.rsplit("/", 1)[1])
+            )(convert(request, getattr(model, type(request).__name__)))
+        except UnauthorizedError as error:
+            raise grpclib.GRPCError(
+                grpclib.const.Status.UNAUTHENTICATED, "Unauthorized"
+            ) from error
+        except ResponseError as error:
+            raise _grpc_error(error.http_code, error.code, error.message) from error
+        except (CircuitOpenError, aiohttp.ClientError) as error:
+            raise grpclib.GRPCError(
+                grpclib.const.Status.UNAVAILABLE, str(error)
+            ) from error
+        except asyncio.TimeoutError as error:
+            raise grpclib.GRPCError(
+                grpclib.const.Status.DEADLINE_EXCEEDED, "Upstream timeout"
+            ) from error
+        finally:
+            self._busy[index] -= 1
+        if isinstance(response, tuple):
+            # Error response (raise_exception_on_error is disabled).
+            response_error = ResponseError.from_response(response)
+            raise _grpc_error(
+                response_error.http_code, response_error.code, response_error.message
+            )
+        return to_lean(response)
+
+
+def _forwarding_method(route: str) -> Callable[..., Any]:
+    """Make service method forwarding calls of a route."""
+
+    async def method(self: HeadscaleProxy, request: Message) -> Message:
+        return await self.forward(route, request)
+
+    method.__name__ = snake_case(route.rsplit("/", 1)[1])
+    method.__doc__ = f"Forward {route} call."
+    return method
+
+
+for _route in ENDPOINTS:
+    _method = _forwarding_method(_route)
+    setattr(HeadscaleProxy, _method.__name__, _method)
+del _route, _method
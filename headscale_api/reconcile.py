@@ -0,0 +1,396 @@
+"""Declarative desired-state reconciliation.
+
+Compares a desired state with a live snapshot of the server and plans only the calls
+needed to get there, e.g.:
+
+```
+desired = DesiredState(
+    users={"alice", "bob"},
+    machines={"laptop": DesiredMachine(user="alice", tags=["tag:dev"])},
+)
+reconciler = Reconciler(headscale)
+plan = await reconciler.plan(desired)
+print(plan)  # dry run
+result = await reconciler.apply(plan)
+```
+"""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from betterproto import Message
+
+from .backend import v1 as model
+from .headscale import Headscale, ResponseError
+
+
+@dataclass
+class DesiredMachine:
+    """Desired state of a machine. Fields set to None are not managed."""
+
+    name: Optional[str] = None
+    """Given name of the machine."""
+
+    user: Optional[str] = None
+    """Owner of the machine."""
+
+    tags: Optional[List[str]] = None
+    """Forced ACL tags of the machine."""
+
+    routes: Optional[List[str]] = None
+    """Enabled route prefixes. Other routes advertised by the machine are disabled."""
+
+
+@dataclass
+class DesiredState:
+    """Desired state of the server."""
+
+    users: Optional[Set[str]] = None
+    """Users which should exist. Not managed if None."""
+
+    machines: Dict[str, DesiredMachine] = field(default_factory=dict)
+    """Desired machine states by hostname (`Machine.name`)."""
+
+    prune_users: bool = False
+    """Delete users, which are not in `users`."""
+
+    prune_machines: bool = False
+    """Delete machines, which are not in `machines`."""
+
+
+@dataclass
+class Snapshot:
+    """Live state of the server."""
+
+    users: List[model.User]
+    """All the users."""
+
+    machines: List[model.Machine]
+    """All the machines."""
+
+    routes: List[model.Route]
+    """All the routes."""
+
+    @classmethod
+    async def capture(cls, headscale: Headscale) -> "Snapshot":
+        """Take a snapshot of the server (the lists are requested concurrently).
+
+        Raises:
+            ResponseError: on error response.
+        """
+        responses = await asyncio.gather(
+            headscale.list_users(model.ListUsersRequest()),
+            headscale.list_machines(model.ListMachinesRequest("")),
+            headscale.get_routes(model.GetRoutesRequest()),
+        )
+        for response in responses:
+            if isinstance(response, tuple):
+                # Error response (raise_exception_on_error is disabled).
+                raise ResponseError.from_response(response)
+        users, machines, routes = responses
+        return cls(users.users, machines.machines, routes.routes)
+
+
+@dataclass
+class Action:
+    """Single planned API call."""
+
+    method: str
+    """Name of the `Headscale` method to call (e.g., `set_tags`)."""
+
+    request: Message
+    """Request to send."""
+
+    description: str
+    """Human-readable description of the call."""
+
+    depends_on: List[int] = field(default_factory=list)
+    """Indexes of actions in the plan, which have to succeed first."""
+
+    def __str__(self) -> str:  # noqa
+        return self.description
+
+
+@dataclass
+class Plan:
+    """Planned API calls."""
+
+    actions: List[Action] = field(default_factory=list)
+    """Actions in a valid sequential order."""
+
+    warnings: List[str] = field(default_factory=list)
+    """Parts of the desired state, which can't be reached."""
+
+    def add(self, action: Action) -> int:
+        """Add action to the plan and return its index."""
+        self.actions.append(action)
+        return len(self.actions) - 1
+
+    def __bool__(self) -> bool:  # noqa
+        return bool(self.actions)
+
+    def __str__(self) -> str:  # noqa
+        lines = [
+            f"{index}. {action}"
+            + (
+                f" (after {', '.join(map(str, action.depends_on))})"
+                if action.depends_on
+                else ""
+            )
+            for index, action in enumerate(self.actions)
+        ]
+        lines.extend(f"Warning: {warning}" for warning in self.warnings)
+        return "\n".join(lines) if lines else "Nothing to do."
+
+
+@dataclass
+class ApplyResult:
+    """Result of plan execution."""
+
+    succeeded: List[int] = field(default_factory=list)
+    """Indexes of the actions, which succeeded."""
+
+    failed: Dict[int, BaseException] = field(default_factory=dict)
+    """Errors of the failed actions by their index."""
+
+    skipped: List[int] = field(default_factory=list)
+    """Indexes of the actions, which were skipped due to a failed dependency."""
+
+
+class Reconciler:
+    """Desired state reconciler."""
+
+    def __init__(self, headscale: Headscale, concurrency: int = 8):
+        """Initialize reconciler.
+
+        Arguments:
+            headscale -- Headscale API to reconcile.
+
+        Keyword Arguments:
+            concurrency -- maximum number of concurrent calls (default: {8})
+        """
+        self.headscale = headscale
+        self.concurrency = concurrency
+
+    async def plan(
+        self, desired: DesiredState, snapshot: Optional[Snapshot] = None
+    ) -> Plan:
+        """Plan the calls reconciling the server with a desired state.
+
+        Keyword Arguments:
+            snapshot -- live state to compare with. Captured if None (default: {None})
+        """
+        if snapshot is None:
+            snapshot = await Snapshot.capture(self.headscale)
+        return make_plan(desired, snapshot)
+
+    async def apply(self, plan: Plan) -> ApplyResult:
+        """Execute plan concurrently respecting the action dependencies."""
+        result = ApplyResult()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        done: List["asyncio.Future[bool]"] = [
+            asyncio.get_running_loop().create_future() for _ in plan.actions
+        ]
+
+        async def run(index: int, action: Action):
+            dependencies = [done[dependency] for dependency in action.depends_on]
+            if not all(await asyncio.gather(*dependencies)):
+                result.skipped.append(index)
+                done[index].set_result(False)
+                return
+            try:
+                async with semaphore:
+                    response = await getattr(self.headscale, action.method)(
+                        action.request
+                    )
+                if isinstance(response, tuple):
+                    # Error response (raise_exception_on_error is disabled).
+                    raise ResponseError.from_response(response)
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                self.headscale.logger.error("Failed to %s: %s", action, error)
+                result.failed[index] = error
+                done[index].set_result(False)
+            else:
+                result.succeeded.append(index)
+                done[index].set_result(True)
+
+        await asyncio.gather(
+            *(run(index, action) for index, action in enumerate(plan.actions))
+        )
+        return result
+
+    async def reconcile(
+        self, desired: DesiredState, dry_run: bool = False
+    ) -> Tuple[Plan, Optional[ApplyResult]]:
+        """Plan and (unless dry run) apply the calls reconciling a desired state.
+
+        Returns:
+            The plan and the result of its execution (None on dry run).
+        """
+        plan = await self.plan(desired)
+        self.headscale.logger.info("Reconciliation plan:\n%s", plan)
+        if dry_run:
+            return plan, None
+        return plan, await self.apply(plan)
+
+
+def make_plan(  # pylint: disable=too-many-locals,too-many-branches
+    desired: DesiredState, snapshot: Snapshot
+) -> Plan:
+    """Compute minimal set of calls reconciling a snapshot with a desired state.
+
+    Dependencies: users are created before machines are moved to them, and machines
+    are moved or deleted before their previous owners are deleted. Desired machines
+    with a hostname shared by several registered machines are not managed (it's
+    reported in the plan warnings).
+    """
+    plan = Plan()
+    existing_users = {user.name for user in snapshot.users}
+    machines_by_name: Dict[str, List[model.Machine]] = {}
+    for machine in snapshot.machines:
+        machines_by_name.setdefault(machine.name, []).append(machine)
+    routes_by_machine: Dict[int, List[model.Route]] = {}
+    for route in snapshot.routes:
+        routes_by_machine.setdefault(route.machine.id, []).append(route)
+
+    created_users: Dict[str, int] = {}
+    if desired.users is not None:
+        for name in sorted(desired.users - existing_users):
+            created_users[name] = plan.add(
+                Action(
+                    "create_user",
+                    model.CreateUserRequest(name=name),
+                    f'create user "{name}"',
+                )
+            )
+
+    # Actions releasing machines of a user, which have to finish before its deletion.
+    releases: Dict[str, List[int]] = {}
+    for hostname, target in sorted(desired.machines.items()):
+        candidates = machines_by_name.get(hostname, [])
+        if not candidates:
+            plan.warnings.append(f'machine "{hostname}" is not registered')
+            continue
+        if len(candidates) > 1:
+            ids = ", ".join(str(machine.id) for machine in candidates)
+            plan.warnings.append(f'hostname "{hostname}" is ambiguous (machines {ids})')
+            continue
+        machine = candidates[0]
+
+        if target.user is not None and target.user != machine.user.name:
+            if target.user not in existing_users and target.user not in created_users:
+                plan.warnings.append(
+                    f'owner "{target.user}" of machine "{hostname}" doesn\'t exist'
+                )
+            else:
+                releases.setdefault(machine.user.name, []).append(
+                    plan.add(
+                        Action(
+                            "move_machine",
+                            model.MoveMachineRequest(
+                                machine_id=machine.id, user=target.user
+                            ),
+                            f'move machine "{hostname}" from "{machine.user.name}" '
+                            f'to "{target.user}"',
+                            [created_users[target.user]]
+                            if target.user in created_users
+                            else [],
+                        )
+                    )
+                )
+
+        if target.name is not None and target.name != machine.given_name:
+            plan.add(
+                Action(
+                    "rename_machine",
+                    model.RenameMachineRequest(
+                        machine_id=machine.id, new_name=target.name
+                    ),
+                    f'rename machine "{hostname}" to "{target.name}"',
+                )
+            )
+
+        if target.tags is not None and set(target.tags) != set(machine.forced_tags):
+            plan.add(
+                Action(
+                    "set_tags",
+                    model.SetTagsRequest(
+                        machine_id=machine.id, tags=sorted(set(target.tags))
+                    ),
+                    f'set tags of machine "{hostname}" to {sorted(set(target.tags))}',
+                )
+            )
+
+        if target.routes is not None:
+            _plan_routes(
+                plan,
+                hostname,
+                set(target.routes),
+                routes_by_machine.get(machine.id, []),
+            )
+
+    if desired.prune_machines:
+        for machine in sorted(snapshot.machines, key=lambda machine: machine.id):
+            if machine.name not in desired.machines:
+                label = f'"{machine.name}"'
+                if len(machines_by_name[machine.name]) > 1:
+                    label += f" (ID {machine.id})"
+                releases.setdefault(machine.user.name, []).append(
+                    plan.add(
+                        Action(
+                            "delete_machine",
+                            model.DeleteMachineRequest(machine_id=machine.id),
+                            f"delete machine {label}",
+                        )
+                    )
+                )
+
+    if desired.prune_users and desired.users is not None:
+        for name in sorted(existing_users - desired.users):
+            owned = sum(1 for machine in snapshot.machines if machine.user.name == name)
+            if len(releases.get(name, [])) < owned:
+                plan.warnings.append(
+                    f'user "{name}" still owns machines and can\'t be deleted'
+                )
+                continue
+            plan.add(
+                Action(
+                    "delete_user",
+                    model.DeleteUserRequest(name=name),
+                    f'delete user "{name}"',
+                    releases.get(name, []),
+                )
+            )
+    return plan
+
+
+def _plan_routes(
+    plan: Plan, hostname: str, enabled: Set[str], routes: Iterable[model.Route]
+):
+    """Plan enabling and disabling of machine routes."""
+    advertised = set()
+    for route in sorted(routes, key=lambda route: route.id):
+        advertised.add(route.prefix)
+        if route.enabled and route.prefix not in enabled:
+            plan.add(
+                Action(
+                    "disable_route",
+                    model.DisableRouteRequest(route_id=route.id),
+                    f'disable route {route.prefix} of machine "{hostname}"',
+                )
+            )
+        elif not route.enabled and route.prefix in enabled:
+            plan.add(
+                Action(
+                    "enable_route",
+                    model.EnableRouteRequest(route_id=route.id),
+                    f'enable route {route.prefix} of machine "{hostname}"',
+                )
+            )
+    for prefix in sorted(enabled - advertised):
+        plan.warnings.append(
+            f'route {prefix} is not advertised by machine "{hostname}"'
+        )
@@ -0,0 +1,257 @@
+"""Background API key renewal.
+
+Renews the API key of a `Headscale` client shortly before it expires. Processes on
+the same host share the key through a key file and coordinate with a file lock, so
+only one of them rotates the key and the others pick up the new one.
+"""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import asyncio
+import contextlib
+import fcntl
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from os import PathLike
+from pathlib import Path
+from typing import AsyncIterator, Optional, Set, Union
+
+from .backend import v1 as model
+from .headscale import Headscale
+
+
+class ApiKeyRenewer:  # pylint: disable=too-many-instance-attributes
+    """Background API key renewal task.
+
+    Started in the running event loop and stopped before the loop closes, e.g.:
+
+    ```
+    renewer = ApiKeyRenewer(headscale, "/var/lib/myapp/headscale.key")
+    renewer.start()
+    ...
+    await renewer.stop()
+    ```
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        headscale: Headscale,
+        key_file: Union[str, "PathLike[str]"],
+        renewal_threshold: timedelta = timedelta(days=5),
+        new_expiration: timedelta = timedelta(days=90),
+        jitter: timedelta = timedelta(hours=1),
+        poll_interval: timedelta = timedelta(seconds=30),
+        retry_interval: timedelta = timedelta(minutes=5),
+        previous_key_grace: Optional[timedelta] = None,
+    ):
+        """Initialize API key renewer.
+
+        Arguments:
+            headscale -- Headscale API with the key to renew.
+            key_file -- file shared by processes on the host to store the current
+                key in. The lock file is created next to it (`<key_file>.lock`).
+
+        Keyword Arguments:
+            renewal_threshold -- how much time before expiration should the key be
+                renewed (default: {timedelta(days=5)})
+            new_expiration -- how long should the new key be valid
+                (default: {timedelta(days=90)})
+            jitter -- maximum random advance of the scheduled renewal, which spreads
+                the renewal attempts of processes in time
+                (default: {timedelta(hours=1)})
+            poll_interval -- how often to check the key file for a key renewed by
+                another process (default: {timedelta(seconds=30)})
+            retry_interval -- delay before retrying a failed renewal
+                (default: {timedelta(minutes=5)})
+            previous_key_grace -- delay before the previous key is expired after
+                rotation, so that the other processes pick up the new key first. Twice
+                the `poll_interval` if None (default: {None})
+        """
+        self.headscale = headscale
+        self.key_file = Path(key_file)
+        self.lock_file = self.key_file.with_name(self.key_file.name + ".lock")
+        self.renewal_threshold = renewal_threshold
+        self.new_expiration = new_expiration
+        self.jitter = jitter
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self.previous_key_grace = (
+            2 * poll_interval if previous_key_grace is None else previous_key_grace
+        )
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._expirations: Set["asyncio.Task[None]"] = set()
+        self._key_file_mtime: Optional[int] = None
+
+    def start(self) -> "asyncio.Task[None]":
+        """Start the background renewal task in the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        """Stop the background renewal task.
+
+        Pending expirations of previous keys are cancelled, so such keys stay valid
+        until they expire on their own.
+        """
+        tasks = list(self._expirations)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        if self._expirations:
+            self.headscale.logger.warning(
+                "Previous API key won't be expired before its expiration date."
+            )
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def run(self):
+        """Renew the key periodically (runs until cancelled)."""
+        while True:
+            self.adopt_shared_key()
+            try:
+                key_info = await self.headscale.get_api_key_info()
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                self.headscale.logger.error("Failed to get API key info: %s", error)
+                key_info = None
+
+            # Drawn once per cycle, so that the renewal happens at the advanced time.
+            advance = random.uniform(0, 1) * self.jitter
+            if key_info is None:
+                delay = self.retry_interval
+            else:
+                delay = (
+                    key_info.expiration
+                    - self.renewal_threshold
+                    - advance
+                    - datetime.now(timezone.utc)
+                )
+            self.headscale.logger.debug("Next API key renewal check in %s.", delay)
+
+            if await self._wait_for_shared_key(delay):
+                continue
+            try:
+                renewed = await self.renew_once(advance)
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                self.headscale.logger.error("Failed to renew API key: %s", error)
+                renewed = None
+            if renewed is None:
+                await asyncio.sleep(self.retry_interval.total_seconds())
+
+    async def _wait_for_shared_key(self, delay: timedelta) -> bool:
+        """Wait for the delay while watching the key file.
+
+        Returns:
+            True if a key renewed by another process has been adopted meanwhile.
+        """
+        deadline = asyncio.get_running_loop().time() + delay.total_seconds()
+        while (remaining := deadline - asyncio.get_running_loop().time()) > 0:
+            await asyncio.sleep(min(remaining, self.poll_interval.total_seconds()))
+            if self.adopt_shared_key():
+                return True
+        return False
+
+    def read_shared_key(self) -> Optional[str]:
+        """Read the key stored in the key file by any of the processes."""
+        try:
+            return self.key_file.read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def adopt_shared_key(self) -> bool:
+        """Switch to the key from the key file if it has changed.
+
+        Returns:
+            True if the key has been switched.
+        """
+        try:
+            mtime = self.key_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._key_file_mtime:
+            return False
+        self._key_file_mtime = mtime
+        shared_key = self.read_shared_key()
+        if shared_key is None or shared_key == self.headscale.api_key:
+            return False
+        self.headscale.logger.info(
+            "Using API key with prefix %s renewed by another process.", shared_key[:10]
+        )
+        self.headscale.api_key = shared_key
+        return True
+
+    async def renew_once(self, advance: timedelta = timedelta()) -> Optional[str]:
+        """Renew the key if needed, coordinating with other processes on the host.
+
+        Keyword Arguments:
+            advance -- time by which the renewal is advanced (added to the
+                `renewal_threshold`) (default: {timedelta()})
+
+        Returns:
+            The current valid key or None if renewal has failed.
+        """
+        async with self._file_lock():
+            shared_key = self.read_shared_key()
+            if shared_key is not None and shared_key != self.headscale.api_key:
+                # Another process might have rotated the key already.
+                shared_info = await self.headscale.get_api_key_info(shared_key)
+                if shared_info is not None and (
+                    shared_info.expiration - datetime.now(timezone.utc)
+                    > self.renewal_threshold
+                ):
+                    self.headscale.api_key = shared_key
+                    return shared_key
+
+            previous_key = self.headscale.api_key
+            result = await self.headscale.renew_api_key(
+                renewal_threshold=self.renewal_threshold + advance,
+                new_expiration=self.new_expiration,
+                expire_previous_key=False,
+            )
+            if result is None:
+                return None
+            if isinstance(result, str):
+                self._write_shared_key(result)
+                if previous_key is not None:
+                    task = asyncio.create_task(self._expire_later(previous_key[:10]))
+                    self._expirations.add(task)
+                    task.add_done_callback(self._expirations.discard)
+            return self.headscale.api_key
+
+    async def _expire_later(self, prefix: str):
+        """Expire the previous key after the grace period."""
+        await asyncio.sleep(self.previous_key_grace.total_seconds())
+        self.headscale.logger.debug("Expiring the previous key.")
+        try:
+            await self.headscale.expire_api_key(model.ExpireApiKeyRequest(prefix))
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self.headscale.logger.error("Failed to expire the previous key: %s", error)
+
+    def _write_shared_key(self, key: str):
+        """Atomically replace the key file."""
+        temporary = self.key_file.with_name(f".{self.key_file.name}.{os.getpid()}")
+        with os.fdopen(
+            os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w"
+        ) as file:
+            file.write(key)
+        os.replace(temporary, self.key_file)
+        self._key_file_mtime = self.key_file.stat().st_mtime_ns
+
+    @contextlib.asynccontextmanager
+    async def _file_lock(self) -> AsyncIterator[None]:
+        """Hold an exclusive lock on the lock file (waits in a thread)."""
+        file_descriptor = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, fcntl.flock, file_descriptor, fcntl.LOCK_EX
+            )
+            try:
+                yield
+            finally:
+                fcntl.flock(file_descriptor, fcntl.LOCK_UN)
+        finally:
+            os.close(file_descriptor)
@@ -0,0 +1,93 @@
+"""Base URL replicas of a single logical Headscale server."""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import random
+from typing import Callable, Iterable, List, Optional
+
+from .breaker import CircuitBreaker
+
+
+class Replica:
+    """Single base URL with its circuit breaker and observed latency."""
+
+    LATENCY_SMOOTHING = 0.3
+    """Weight of the newest latency sample in the moving average."""
+
+    def __init__(self, url: str, breaker: CircuitBreaker):
+        """Initialize replica.
+
+        Arguments:
+            url -- base URL (without `/api/v1`).
+            breaker -- circuit breaker of the URL.
+        """
+        self.url = url.rstrip("/")
+        self.breaker = breaker
+        self.latency: Optional[float] = None
+        """Exponential moving average of response latency in seconds."""
+
+    def __repr__(self) -> str:  # noqa
+        return (
+            f"Replica({self.url!r}, state={self.breaker.state.value}, "
+            f"latency={self.latency})"
+        )
+
+    def record_success(self, latency: float):
+        """Record a successful response and its latency."""
+        self.breaker.record_success()
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.LATENCY_SMOOTHING * (latency - self.latency)
+
+    def record_failure(self):
+        """Record a failed request."""
+        self.breaker.record_failure()
+
+
+class ReplicaSet:
+    """Set of base URLs with latency-based balancing and failover order."""
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        breaker_factory: Callable[[], CircuitBreaker] = CircuitBreaker,
+    ):
+        """Initialize replica set.
+
+        Arguments:
+            urls -- base URLs in order of preference (e.g., active first).
+
+        Keyword Arguments:
+            breaker_factory -- function creating circuit breaker for each URL
+                (default: {CircuitBreaker})
+        """
+        self.replicas = [Replica(url, breaker_factory()) for url in urls]
+        if not self.replicas:
+            raise ValueError("At least one base URL is required.")
+
+    def candidates(self, balance: bool) -> List[Replica]:
+        """Get replicas to try in order.
+
+        Replicas with an open circuit are skipped.
+
+        Arguments:
+            balance -- pick the first replica by latency (power of two random
+                choices, so that the load is spread). Otherwise, keep the order of
+                preference (e.g., for writes to an active/standby pair).
+        """
+        available = [replica for replica in self.replicas if replica.breaker.available]
+        if not balance or len(available) < 2:
+            return available
+
+        def latency(replica: Replica) -> float:
+            # Replicas without a sample are tried first to get one.
+            return replica.latency or 0.0
+
+        first = min(random.sample(available, 2), key=latency)
+        available.remove(first)
+        return [first] + sorted(available, key=latency)
+
+    def retry_after(self) -> float:
+        """Get time in seconds until any of the replicas lets a request through."""
+        return min(replica.breaker.retry_after for replica in self.replicas)
@@ -0,0 +1,224 @@
+"""Longest-prefix-match index of subnet routes."""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import ipaddress
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .backend import v1 as model
+
+IPAddress = Union[str, int, ipaddress.IPv4Address, ipaddress.IPv6Address]
+IPNetwork = Union[str, ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+class _Node:  # pylint: disable=too-few-public-methods
+    """Binary trie node."""
+
+    __slots__ = ("children", "routes")
+
+    def __init__(self) -> None:
+        self.children: List[Optional["_Node"]] = [None, None]
+        self.routes: Dict[int, model.Route] = {}
+
+
+def _route_key(route: model.Route) -> Tuple[str, bool, bool, int]:
+    """Get route properties relevant to the index."""
+    return route.prefix, route.enabled, route.is_primary, route.machine.id
+
+
+class RouteIndex:
+    """Prefix trie of routes per address family.
+
+    Answers longest-prefix-match and overlap queries in time proportional to the
+    prefix length instead of the number of routes, e.g.:
+
+    ```
+    index = RouteIndex.from_response(await headscale.get_routes(GetRoutesRequest()))
+    machines = index.machines_for("10.1.2.3")
+    ...
+    index.update((await headscale.get_routes(GetRoutesRequest())).routes)
+    ```
+    """
+
+    def __init__(self, routes: Iterable[model.Route] = ()):
+        """Initialize route index.
+
+        Keyword Arguments:
+            routes -- initial routes (default: {()})
+        """
+        self._roots = {4: _Node(), 6: _Node()}
+        self._routes: Dict[int, model.Route] = {}
+        for route in routes:
+            self.add(route)
+
+    @classmethod
+    def from_response(cls, response: model.GetRoutesResponse) -> "RouteIndex":
+        """Build index from `get_routes()` response."""
+        return cls(response.routes)
+
+    def __len__(self) -> int:
+        """Get number of indexed routes."""
+        return len(self._routes)
+
+    def __iter__(self) -> Iterator[model.Route]:
+        """Iterate over indexed routes."""
+        return iter(self._routes.values())
+
+    @staticmethod
+    def _bits(network: Union[ipaddress.IPv4Network, ipaddress.IPv6Network]):
+        """Iterate over prefix bits of a network."""
+        prefix = int(network.network_address) >> (
+            network.max_prefixlen - network.prefixlen
+        )
+        for position in range(network.prefixlen - 1, -1, -1):
+            yield (prefix >> position) & 1
+
+    def _path(
+        self, network: Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+    ) -> Iterator[_Node]:
+        """Iterate over existing nodes from the root towards a network's node."""
+        node: Optional[_Node] = self._roots[network.version]
+        assert node is not None
+        yield node
+        for bit in self._bits(network):
+            node = node.children[bit]
+            if node is None:
+                return
+            yield node
+
+    def add(self, route: model.Route):
+        """Add or replace a route (by its ID)."""
+        if route.id in self._routes:
+            self.remove(route.id)
+        network = ipaddress.ip_network(route.prefix, strict=False)
+        node = self._roots[network.version]
+        for bit in self._bits(network):
+            child = node.children[bit]
+            if child is None:
+                child = node.children[bit] = _Node()
+            node = child
+        node.routes[route.id] = route
+        self._routes[route.id] = route
+
+    def remove(self, route_id: int) -> Optional[model.Route]:
+        """Remove a route by its ID.
+
+        Returns:
+            The removed route or None if it wasn't indexed.
+        """
+        route = self._routes.pop(route_id, None)
+        if route is None:
+            return None
+        network = ipaddress.ip_network(route.prefix, strict=False)
+        path = list(self._path(network))
+        path[-1].routes.pop(route_id, None)
+        # Prune the branch which doesn't lead to any route anymore.
+        for parent, node, bit in zip(
+            reversed(path[:-1]), reversed(path[1:]), reversed(list(self._bits(network)))
+        ):
+            if node.routes or node.children != [None, None]:
+                break
+            parent.children[bit] = None
+        return route
+
+    def update(self, routes: Iterable[model.Route]):
+        """Synchronize index with a full list of current routes.
+
+        Only the added, removed and changed routes are re-indexed.
+        """
+        current = {route.id: route for route in routes}
+        for route_id in self._routes.keys() - current.keys():
+            self.remove(route_id)
+        for route_id, route in current.items():
+            indexed = self._routes.get(route_id)
+            if indexed is None or _route_key(indexed) != _route_key(route):
+                self.add(route)
+            else:
+                # Keep the latest machine state without re-indexing.
+                self._routes[route_id] = route
+                self._node_of(route).routes[route_id] = route
+
+    def _node_of(self, route: model.Route) -> _Node:
+        return list(self._path(ipaddress.ip_network(route.prefix, strict=False)))[-1]
+
+    @staticmethod
+    def _filter(
+        routes: Iterable[model.Route], enabled_only: bool, primary_only: bool
+    ) -> List[model.Route]:
+        return [
+            route
+            for route in routes
+            if (route.enabled or not enabled_only)
+            and (route.is_primary or not primary_only)
+        ]
+
+    def lookup(
+        self, address: IPAddress, enabled_only: bool = True, primary_only: bool = False
+    ) -> List[model.Route]:
+        """Find the most specific routes containing an address.
+
+        Arguments:
+            address -- IP address.
+
+        Keyword Arguments:
+            enabled_only -- consider only enabled routes (default: {True})
+            primary_only -- consider only primary routes (default: {False})
+
+        Returns:
+            Routes with the longest matching prefix (primary first) or an empty list.
+        """
+        address = ipaddress.ip_address(address)
+        network = ipaddress.ip_network(address)
+        best: List[model.Route] = []
+        for node in self._path(network):
+            routes = self._filter(node.routes.values(), enabled_only, primary_only)
+            if routes:
+                best = routes
+        return sorted(best, key=lambda route: not route.is_primary)
+
+    def machines_for(
+        self, address: IPAddress, primary_only: bool = False
+    ) -> List[model.Machine]:
+        """Find machines serving an address through an enabled subnet route.
+
+        Keyword Arguments:
+            primary_only -- consider only primary routes (default: {False})
+
+        Returns:
+            Machines (primary first) or an empty list.
+        """
+        return [
+            route.machine
+            for route in self.lookup(
+                address, enabled_only=True, primary_only=primary_only
+            )
+        ]
+
+    def overlapping(
+        self, network: IPNetwork, enabled_only: bool = False
+    ) -> List[model.Route]:
+        """Find routes overlapping a network (containing it or contained in it).
+
+        Keyword Arguments:
+            enabled_only -- consider only enabled routes (default: {False})
+
+        Returns:
+            Routes ordered from the least to the most specific.
+        """
+        network = ipaddress.ip_network(network, strict=False)
+        path = list(self._path(network))
+        routes: List[model.Route] = []
+        for node in path[:-1]:
+            routes.extend(node.routes.values())
+        if len(path) == network.prefixlen + 1:
+            # The whole subtree under the network's node (breadth-first, so that
+            # less specific routes come first).
+            queue = deque([path[-1]])
+            while queue:
+                node = queue.popleft()
+                routes.extend(node.routes.values())
+                queue.extend(child for child in node.children if child is not None)
+        else:
+            routes.extend(path[-1].routes.values())
+        return self._filter(routes, enabled_only, False)
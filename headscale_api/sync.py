@@ -0,0 +1,145 @@
+"""Synchronous (blocking) Headscale API facade.
+
+Intended for WSGI applications (e.g., Flask), which can't await the `Headscale`
+coroutines directly. All the calls are executed on a single background event loop
+thread sharing one `aiohttp.ClientSession` (and thus one connection pool).
+"""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+import asyncio
+import functools
+import inspect
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Coroutine, List, Optional, TypeVar
+
+from .headscale import Headscale
+
+ResultT = TypeVar("ResultT")
+
+
+class SyncHeadscale:
+    """Blocking Headscale API abstraction.
+
+    Has the same method set as `HeadscaleServiceStub` (plus the `Headscale` helper
+    methods), but the methods block until the result is available. It's safe to use
+    a single instance from many threads, e.g.:
+
+    ```
+    headscale = SyncHeadscale(Headscale("https://headscale.example.com", api_key))
+
+    @app.route("/users")
+    def users():
+        return headscale.list_users(ListUsersRequest()).to_dict()
+    ```
+    """
+
+    def __init__(self, headscale: Headscale, call_timeout: Optional[float] = None):
+        """Initialize blocking Headscale API.
+
+        Arguments:
+            headscale -- asynchronous Headscale API to run calls on.
+
+        Keyword Arguments:
+            call_timeout -- maximum time to wait for a call result in seconds. The
+                request timeout of `headscale` still applies (default: {None})
+        """
+        self.headscale = headscale
+        self.call_timeout = call_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def __enter__(self) -> "SyncHeadscale":
+        """Start the background event loop."""
+        self.start()
+        return self
+
+    def __exit__(self, *err: Any):
+        """Stop the background event loop."""
+        self.close()
+
+    def start(self):
+        """Start the background event loop thread and open the HTTP session.
+
+        Called implicitly on the first API call.
+        """
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=loop.run_forever, name="headscale-api-loop", daemon=True
+            )
+            self._thread.start()
+            self._loop = loop
+            # Keep the session open for the whole lifetime of the loop.
+            self._submit(self.headscale.session.__aenter__()).result()
+
+    def close(self):
+        """Close the HTTP session and stop the background event loop thread."""
+        with self._start_lock:
+            loop, thread = self._loop, self._thread
+            if loop is None or thread is None:
+                return
+            self._submit(self.headscale.session.__aexit__(None, None, None)).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+            self._loop = None
+            self._thread = None
+
+    def _submit(self, coroutine: Coroutine[Any, Any, ResultT]) -> "Future[ResultT]":
+        assert self._loop is not None
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def run(self, coroutine: Coroutine[Any, Any, ResultT]) -> ResultT:
+        """Run a coroutine on the background event loop and wait for the result.
+
+        Raises:
+            RuntimeError: if called from the background event loop thread, which
+                would deadlock.
+            concurrent.futures.TimeoutError: if the result isn't available within
+                `call_timeout`. The call is cancelled.
+        """
+        if self._loop is None:
+            self.start()
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError("Blocking call from the Headscale API loop thread.")
+        future = self._submit(coroutine)
+        try:
+            return future.result(self.call_timeout)
+        except FutureTimeoutError:
+            # Don't leave the call running after the caller has given up.
+            future.cancel()
+            raise
+
+
+def _blocking(name: str, function: Callable[..., Any]) -> Callable[..., Any]:
+    """Make a blocking method out of a `Headscale` coroutine method."""
+
+    @functools.wraps(function)
+    def method(self: SyncHeadscale, *args: Any, **kwargs: Any) -> Any:
+        return self.run(getattr(self.headscale, name)(*args, **kwargs))
+
+    return method
+
+
+def wrapped_methods() -> List[str]:
+    """Get names of the `Headscale` coroutine methods exposed by `SyncHeadscale`.
+
+    Includes all the `HeadscaleServiceStub` methods. Their signatures are declared in
+    the `sync.pyi` stub (see `generate_sync_stub.py`).
+    """
+    return [
+        name
+        for name, _ in inspect.getmembers(Headscale, inspect.iscoroutinefunction)
+        if not name.startswith("_")
+    ]
+
+
+for _name in wrapped_methods():
+    setattr(SyncHeadscale, _name, _blocking(_name, getattr(Headscale, _name)))
@@ -0,0 +1,245 @@
+"""Blocking Headscale API facade (generated by generate_sync_stub.py)."""
+
+# pylint: skip-file
+# flake8: noqa
+
+import datetime
+from typing import Any, Coroutine, List, Optional, TypeVar
+
+import betterproto
+from betterproto.grpc.grpclib_client import MetadataLike
+from grpclib.metadata import Deadline
+
+from .headscale import Headscale, RawResponse
+from .schema.headscale import v1 as model
+
+ResultT = TypeVar("ResultT")
+
+def wrapped_methods() -> List[str]: ...
+
+class SyncHeadscale:
+    headscale: Headscale
+    call_timeout: Optional[float]
+    def __init__(
+        self, headscale: Headscale, call_timeout: Optional[float] = ...
+    ) -> None: ...
+    def __enter__(self) -> SyncHeadscale: ...
+    def __exit__(self, *err: Any) -> None: ...
+    def start(self) -> None: ...
+    def close(self) -> None: ...
+    def run(self, coroutine: Coroutine[Any, Any, ResultT]) -> ResultT: ...
+    def create_api_key(
+        self,
+        create_api_key_request: model.CreateApiKeyRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.CreateApiKeyResponse: ...
+    def create_pre_auth_key(
+        self,
+        create_pre_auth_key_request: model.CreatePreAuthKeyRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.CreatePreAuthKeyResponse: ...
+    def create_user(
+        self,
+        create_user_request: model.CreateUserRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.CreateUserResponse: ...
+    def debug_create_machine(
+        self,
+        debug_create_machine_request: model.DebugCreateMachineRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.DebugCreateMachineResponse: ...
+    def delete_machine(
+        self,
+        delete_machine_request: model.DeleteMachineRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.DeleteMachineResponse: ...
+    def delete_route(
+        self,
+        delete_route_request: model.DeleteRouteRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.DeleteRouteResponse: ...
+    def delete_user(
+        self,
+        delete_user_request: model.DeleteUserRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.DeleteUserResponse: ...
+    def disable_route(
+        self,
+        disable_route_request: model.DisableRouteRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.DisableRouteResponse: ...
+    def enable_route(
+        self,
+        enable_route_request: model.EnableRouteRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.EnableRouteResponse: ...
+    def expire_api_key(
+        self,
+        expire_api_key_request: model.ExpireApiKeyRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.ExpireApiKeyResponse: ...
+    def expire_machine(
+        self,
+        expire_machine_request: model.ExpireMachineRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.ExpireMachineResponse: ...
+    def expire_pre_auth_key(
+        self,
+        expire_pre_auth_key_request: model.ExpirePreAuthKeyRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.ExpirePreAuthKeyResponse: ...
+    def get_api_key_info(self, api_key: str | None = ...) -> model.ApiKey | None: ...
+    def get_machine(
+        self,
+        get_machine_request: model.GetMachineRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.GetMachineResponse: ...
+    def get_machine_routes(
+        self,
+        get_machine_routes_request: model.GetMachineRoutesRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.GetMachineRoutesResponse: ...
+    def get_routes(
+        self,
+        get_routes_request: model.GetRoutesRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.GetRoutesResponse: ...
+    def get_user(
+        self,
+        get_user_request: model.GetUserRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.GetUserResponse: ...
+    def health_check(self) -> bool: ...
+    def list_api_keys(
+        self,
+        list_api_keys_request: model.ListApiKeysRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.ListApiKeysResponse: ...
+    def list_machines(
+        self,
+        list_machines_request: model.ListMachinesRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.ListMachinesResponse: ...
+    def list_pre_auth_keys(
+        self,
+        list_pre_auth_keys_request: model.ListPreAuthKeysRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.ListPreAuthKeysResponse: ...
+    def list_users(
+        self,
+        list_users_request: model.ListUsersRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.ListUsersResponse: ...
+    def move_machine(
+        self,
+        move_machine_request: model.MoveMachineRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.MoveMachineResponse: ...
+    def raw(
+        self, method: str, request: betterproto.Message, timeout: Optional[float] = ...
+    ) -> RawResponse: ...
+    def refresh_api_key(self) -> Optional[str]: ...
+    def register_machine(
+        self,
+        register_machine_request: model.RegisterMachineRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.RegisterMachineResponse: ...
+    def rename_machine(
+        self,
+        rename_machine_request: model.RenameMachineRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.RenameMachineResponse: ...
+    def rename_user(
+        self,
+        rename_user_request: model.RenameUserRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.RenameUserResponse: ...
+    def renew_api_key(
+        self,
+        key_to_renew: str | None = ...,
+        renewal_threshold: datetime.timedelta = ...,
+        new_expiration: datetime.timedelta = ...,
+        expire_previous_key: bool = ...,
+    ) -> model.ApiKey | str | None: ...
+    def set_tags(
+        self,
+        set_tags_request: model.SetTagsRequest,
+        *,
+        timeout: Optional[float] = ...,
+        deadline: Optional[Deadline] = ...,
+        metadata: Optional[MetadataLike] = ...
+    ) -> model.SetTagsResponse: ...
+    def test_api_key(self, new_api_key: Optional[str] = ...) -> bool: ...
+    def warmup(self, connections: int = ...) -> bool: ...
@@ -0,0 +1,186 @@
+"""Tag and user membership index with bitset set algebra."""
+
+__authors__ = ["Marek Pikuła <marek@serenitycode.dev>"]
+
+from typing import Dict, Iterable, Iterator, List
+
+from .backend import v1 as model
+
+
+class MachineSet:
+    """Set of indexed machines stored as a bitset over machine ordinals.
+
+    Supports set algebra with `&`, `|`, `-`, `^` and `~` (complement within all the
+    indexed machines). Counting with `len()` doesn't materialize the machines.
+    """
+
+    __slots__ = ("_index", "bits")
+
+    def __init__(self, index: "TagIndex", bits: int = 0):
+        """Initialize machine set.
+
+        Arguments:
+            index -- index the ordinals refer to.
+
+        Keyword Arguments:
+            bits -- bitset of machine ordinals (default: {0})
+        """
+        self._index = index
+        self.bits = bits
+
+    def _check(self, other: "MachineSet"):
+        if other._index is not self._index:  # pylint: disable=protected-access
+            raise ValueError("Machine sets come from different indexes.")
+
+    def __and__(self, other: "MachineSet") -> "MachineSet":  # noqa
+        self._check(other)
+        return MachineSet(self._index, self.bits & other.bits)
+
+    def __or__(self, other: "MachineSet") -> "MachineSet":  # noqa
+        self._check(other)
+        return MachineSet(self._index, self.bits | other.bits)
+
+    def __sub__(self, other: "MachineSet") -> "MachineSet":  # noqa
+        self._check(other)
+        return MachineSet(self._index, self.bits & ~other.bits)
+
+    def __xor__(self, other: "MachineSet") -> "MachineSet":  # noqa
+        self._check(other)
+        return MachineSet(self._index, self.bits ^ other.bits)
+
+    def __invert__(self) -> "MachineSet":  # noqa
+        return MachineSet(self._index, self._index.all.bits & ~self.bits)
+
+    def __eq__(self, other: object) -> bool:  # noqa
+        return (
+            isinstance(other, MachineSet)
+            and other._index is self._index  # pylint: disable=protected-access
+            and other.bits == self.bits
+        )
+
+    def __hash__(self) -> int:  # noqa
+        return hash(self.bits)
+
+    def __len__(self) -> int:  # noqa
+        return self.bits.bit_count()
+
+    def __bool__(self) -> bool:  # noqa
+        return self.bits != 0
+
+    def __contains__(self, machine: model.Machine) -> bool:  # noqa
+        ordinal = self._index.ordinals.get(machine.id)
+        return ordinal is not None and bool(self.bits >> ordinal & 1)
+
+    def __iter__(self) -> Iterator[model.Machine]:  # noqa
+        machines = self._index.machines
+        for ordinal in self.ordinals():
+            yield machines[ordinal]
+
+    def __repr__(self) -> str:  # noqa
+        return f"MachineSet(ids={self.ids()})"
+
+    def ordinals(self) -> Iterator[int]:
+        """Iterate over machine ordinals in the set."""
+        bits = self.bits
+        while bits:
+            lowest = bits & -bits
+            yield lowest.bit_length() - 1
+            bits ^= lowest
+
+    def ids(self) -> List[int]:
+        """Get IDs of the machines in the set."""
+        machines = self._index.machines
+        return [machines[ordinal].id for ordinal in self.ordinals()]
+
+
+class TagIndex:
+    """Index of machines by ACL tags and users.
+
+    Queries return machine sets, which can be combined with set operators, e.g.:
+
+    ```
+    index = TagIndex(
+        (await headscale.list_machines(ListMachinesRequest(""))).machines
+    )
+    audited = index.tag("tag:prod") - index.tag("tag:legacy") & index.user("alice")
+    print(len(audited), audited.ids())
+    ```
+    """
+
+    def __init__(self, machines: Iterable[model.Machine] = ()):
+        """Build tag index.
+
+        Keyword Arguments:
+            machines -- machines to index (default: {()})
+        """
+        self.machines: List[model.Machine] = []
+        self.ordinals: Dict[int, int] = {}
+        self._forced: Dict[str, int] = {}
+        self._valid: Dict[str, int] = {}
+        self._invalid: Dict[str, int] = {}
+        self._users: Dict[str, int] = {}
+        self._all = 0
+        for machine in machines:
+            self.add(machine)
+
+    @classmethod
+    def from_response(cls, response: model.ListMachinesResponse) -> "TagIndex":
+        """Build index from `list_machines()` response."""
+        return cls(response.machines)
+
+    def add(self, machine: model.Machine):
+        """Add a machine to the index.
+
+        Raises:
+            ValueError: if the machine is indexed already.
+        """
+        if machine.id in self.ordinals:
+            raise ValueError(f"Machine {machine.id} is indexed already.")
+        bit = 1 << len(self.machines)
+        self.ordinals[machine.id] = len(self.machines)
+        self.machines.append(machine)
+        self._all |= bit
+        for bitsets, tags in (
+            (self._forced, machine.forced_tags),
+            (self._valid, machine.valid_tags),
+            (self._invalid, machine.invalid_tags),
+        ):
+            for tag in tags:
+                bitsets[tag] = bitsets.get(tag, 0) | bit
+        self._users[machine.user.name] = self._users.get(machine.user.name, 0) | bit
+
+    @property
+    def all(self) -> MachineSet:
+        """Get set of all the indexed machines."""
+        return MachineSet(self, self._all)
+
+    @property
+    def tags(self) -> List[str]:
+        """Get all the effective (forced or valid) tags."""
+        return sorted(self._forced.keys() | self._valid.keys())
+
+    def tag(self, tag: str) -> MachineSet:
+        """Get machines with an effective (forced or valid) tag."""
+        return MachineSet(self, self._forced.get(tag, 0) | self._valid.get(tag, 0))
+
+    def forced_tag(self, tag: str) -> MachineSet:
+        """Get machines with a forced tag."""
+        return MachineSet(self, self._forced.get(tag, 0))
+
+    def valid_tag(self, tag: str) -> MachineSet:
+        """Get machines with a valid (advertised and allowed) tag."""
+        return MachineSet(self, self._valid.get(tag, 0))
+
+    def invalid_tag(self, tag: str) -> MachineSet:
+        """Get machines with an invalid (advertised, but not allowed) tag."""
+        return MachineSet(self, self._invalid.get(tag, 0))
+
+    def user(self, user: str) -> MachineSet:
+        """Get machines owned by a user."""
+        return MachineSet(self, self._users.get(user, 0))
+
+    def count_by_tag(self, within: MachineSet) -> Dict[str, int]:
+        """Count machines of a set by effective tag."""
+        return {
+            tag: (self.tag(tag).bits & within.bits).bit_count() for tag in self.tags
+        }
@@ -0,0 +1,51 @@
+"""Machine address index tests."""
+
+import pytest
+
+from headscale_api.address_index import MachineIPIndex
+from headscale_api.schema.headscale import v1 as model
+
+from .conftest import machine_dict
+
+
+def test_machine_ip_index():
+    """Test single and batch address lookups."""
+    machines = [
+        model.Machine.from_dict(
+            machine_dict(1, "alice", ["100.64.0.1", "fd7a:115c:a1e0::1"])
+        ),
+        model.Machine.from_dict(machine_dict(2, "bob", ["100.64.0.2", "fd7a::"])),
+    ]
+    for use_numpy in (True, False):
+        index = MachineIPIndex(machines, use_numpy)
+        assert index.lookup("100.64.0.2").id == 2
+        assert index.lookup(0x64400001).id == 1
+        assert index.lookup("fd7a:115c:a1e0::1").id == 1
+        assert index.lookup("100.64.0.3") is None
+
+        addresses = [
+            "100.64.0.1",
+            "fd7a::",
+            "10.0.0.1",
+            "invalid",
+            "fd7a:115c:a1e0::1",
+            "100.64.0.2",
+        ]
+        assert list(index.machine_ids(addresses)) == [1, 2, 0, 0, 1, 2]
+        assert index.users(addresses) == ["alice", "bob", None, None, "alice", "bob"]
+
+
+def test_machine_ip_index_integer_array():
+    """Test vectorized lookup of IPv4 addresses given as integer array."""
+    numpy = pytest.importorskip("numpy")
+    index = MachineIPIndex([model.Machine.from_dict(machine_dict(7))])
+    addresses = numpy.array([0x64400007, 0x0A000001], dtype=numpy.uint32)
+    assert index.machine_ids(addresses).tolist() == [7, 0]
+
+    addresses = numpy.array(
+        [0x64400007, -(2**32) + 0x64400007, 2**32 + 0x64400007, -1],
+        dtype=numpy.int64,
+    )
+    assert index.machine_ids(addresses).tolist() == [7, 0, 0, 0]
+    addresses = numpy.array([0x64400007, 2**32 + 0x64400007], dtype=numpy.uint64)
+    assert index.machine_ids(addresses).tolist() == [7, 0]
@@ -0,0 +1,76 @@
+"""Generated schema backend parity tests."""
+
+import subprocess
+import sys
+
+from betterproto import Enum, Message, ServiceStub
+from betterproto.grpc.grpclib_server import ServiceBase
+
+from headscale_api.schema.headscale import v1 as pydantic_model
+from headscale_api.schema.lean.headscale import v1 as lean_model
+
+from .conftest import api_key_dict, machine_dict, route_dict, user_dict
+
+PAYLOADS = {
+    "ListMachinesResponse": {
+        "machines": [machine_dict(1), machine_dict(2, tags=["tag:prod"])]
+    },
+    "GetRoutesResponse": {"routes": [route_dict(1), route_dict(2, "10.1.0.0/16")]},
+    "ListUsersResponse": {"users": [user_dict("a", "1"), user_dict("b", "2")]},
+    "ListApiKeysResponse": {"apiKeys": [api_key_dict()]},
+}
+
+
+def test_backend_message_set():
+    """Test if both backends define the same messages."""
+
+    def classes(module):
+        return {
+            name
+            for name, value in vars(module).items()
+            if isinstance(value, type)
+            and issubclass(value, (Message, Enum, ServiceStub, ServiceBase))
+        }
+
+    assert classes(pydantic_model) == classes(lean_model)
+
+
+def test_backend_parity():
+    """Test if both backends decode and encode responses the same way."""
+    for name, payload in PAYLOADS.items():
+        pydantic_message = getattr(pydantic_model, name).from_dict(payload)
+        lean_message = getattr(lean_model, name).from_dict(payload)
+        assert pydantic_message.to_dict() == lean_message.to_dict(), name
+        assert (
+            getattr(lean_model, name).from_dict(pydantic_message.to_dict())
+            == lean_message
+        ), name
+
+
+def test_backend_request_parity():
+    """Test if both backends serialize requests the same way."""
+    for name, args in {
+        "GetUserRequest": ("marek",),
+        "SetTagsRequest": (1, ["tag:a", "tag:b"]),
+        "RenameMachineRequest": (3, "new"),
+        "ListApiKeysRequest": (),
+    }.items():
+        assert getattr(pydantic_model, name)(*args).to_dict(
+            include_default_values=True
+        ) == getattr(lean_model, name)(*args).to_dict(include_default_values=True)
+
+
+def test_backend_selection():
+    """Test selecting the lean backend with an environment variable."""
+    script = (
+        "import headscale_api.headscale as h\n"
+        "print(h.model.__name__, h.Headscale.__mro__[1].__module__)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={"HEADSCALE_API_BACKEND": "lean", "PATH": ""},
+    ).stdout.split()
+    assert output == ["headscale_api.schema.lean.headscale.v1"] * 2
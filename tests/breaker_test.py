@@ -0,0 +1,42 @@
+"""Circuit breaker tests."""
+
+from headscale_api.breaker import CircuitBreaker, CircuitState
+
+
+class Clock:  # pylint: disable=too-few-public-methods
+    """Manually advanced clock."""
+
+    now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_circuit_breaker():
+    """Test opening, half-open trial and closing of circuit."""
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=3, window=10, cool_down=5, clock=clock)
+    for success in (False, True, False, False, True):
+        if success:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    # Error rate 4/6 with at least half of the window filled.
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_after == 5
+
+    clock.now = 5
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+
+    clock.now = 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow()
@@ -0,0 +1,52 @@
+"""Protobuf wire-format cache tests."""
+
+import pytest
+
+from headscale_api import cache
+from headscale_api.schema.headscale import v1 as model
+from headscale_api.schema.lean.headscale import v1 as lean
+
+from .conftest import machine_dict
+
+
+def make_response(schema=model) -> model.ListMachinesResponse:
+    """Make list machines response of a backend."""
+    return schema.ListMachinesResponse.from_dict(
+        {"machines": [machine_dict(1), machine_dict(2, "alice", tags=["tag:a"])]}
+    )
+
+
+@pytest.mark.parametrize("compression", [None, "zlib", "lzma"])
+@pytest.mark.parametrize("schema", [model, lean])
+def test_round_trip(tmp_path, compression, schema):
+    """Test restoring snapshots from files with each compression and backend."""
+    response = make_response(schema)
+    path = tmp_path / "machines.bin"
+    cache.dump(response, path, compression)
+    assert cache.load(schema.ListMachinesResponse, path) == response
+    data = cache.dumps(response, compression)
+    assert cache.loads(schema.ListMachinesResponse, data) == response
+
+
+def test_cross_backend():
+    """Test loading a snapshot saved with the other backend."""
+    data = cache.dumps(make_response(model))
+    assert cache.dumps(make_response(lean)) == data
+    assert cache.loads(lean.ListMachinesResponse, data) == make_response(lean)
+    assert cache.loads(model.ListMachinesResponse, data) == make_response(model)
+
+
+def test_schema_check():
+    """Test rejecting different message types, format versions and corrupted data."""
+    data = cache.dumps(make_response())
+    with pytest.raises(cache.CacheFormatError, match="schema"):
+        cache.loads(model.ListUsersResponse, data)
+    with pytest.raises(cache.CacheFormatError, match="version"):
+        cache.loads(model.ListMachinesResponse, data[:4] + b"\x09\x00" + data[6:])
+    with pytest.raises(cache.CacheFormatError, match="Not a cache"):
+        cache.loads(model.ListMachinesResponse, b"JSON" + data[4:])
+    with pytest.raises(cache.CacheFormatError, match="truncated"):
+        cache.loads(model.ListMachinesResponse, data[:-1])
+    assert cache.schema_fingerprint(
+        model.ListMachinesResponse
+    ) != cache.schema_fingerprint(model.GetMachineResponse)
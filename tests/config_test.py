@@ -1,8 +1,94 @@
 """Config abstraction test."""
 
-from headscale_api.config import HeadscaleConfig
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+from headscale_api.config import ConfigChange, HeadscaleConfig, HeadscaleConfigWatcher
 
 
 def test_config_load():
     """Test default headscale config loading to generated model."""
     HeadscaleConfig.parse_file("external/headscale/config-example.yaml")
+
+
+def test_config_load_cached(tmp_path):
+    """Test cached config loading."""
+    path = tmp_path / "config.yaml"
+    path.write_bytes(Path("external/config-example.yaml").read_bytes())
+
+    config = HeadscaleConfig.load(path)
+    assert config == HeadscaleConfig.parse_file(path)
+    assert HeadscaleConfig.load(path) is config
+    with pytest.raises(TypeError):
+        config.server_url = "https://example.com"
+
+    # Same content with new modification time is served from the cache.
+    os.utime(path, ns=(0, 0))
+    assert HeadscaleConfig.load(path) is config
+
+    path.write_text(
+        path.read_text().replace("server_url: http://127.0.0.1:8080", "server_url: x")
+    )
+    changed = HeadscaleConfig.load(path)
+    assert changed is not config
+    assert changed.server_url == "x"
+
+
+def test_config_watcher(tmp_path):
+    """Test config watcher change detection."""
+    path = tmp_path / "config.yaml"
+    text = Path("external/config-example.yaml").read_text()
+    path.write_text(text)
+
+    watcher = HeadscaleConfigWatcher(path)
+    assert not watcher.poll()
+
+    path.write_text(
+        text.replace(
+            "server_url: http://127.0.0.1:8080", "server_url: http://new"
+        ).replace("    - 1.1.1.1", "    - 9.9.9.9")
+    )
+    changes = {change.field: change for change in watcher.poll()}
+    assert set(changes) == {"server_url", "dns_config.nameservers"}
+    assert changes["server_url"] == ConfigChange(
+        "server_url", "http://127.0.0.1:8080", "http://new"
+    )
+    assert watcher.config.server_url == "http://new"
+    assert not watcher.poll()
+
+
+def test_config_watcher_invalid_file(tmp_path):
+    """Test if the watcher keeps the last valid config while the file is broken."""
+    path = tmp_path / "config.yaml"
+    text = Path("external/config-example.yaml").read_text()
+    path.write_text(text)
+
+    async def main():
+        watcher = HeadscaleConfigWatcher(path)
+        stop = asyncio.Event()
+        changes = []
+
+        async def watch():
+            async for change in watcher.watch(0.01, stop):
+                changes.append(change)
+
+        task = asyncio.create_task(watch())
+        for broken in ("server_url: [unterminated", "server_url: {}"):
+            path.write_text(broken)
+            await asyncio.sleep(0.05)
+            assert watcher.config.server_url == "http://127.0.0.1:8080"
+        path.write_text(
+            text.replace("server_url: http://127.0.0.1:8080", "server_url: http://new")
+        )
+        await asyncio.sleep(0.05)
+        stop.set()
+        await task
+        assert [[change.field for change in batch] for batch in changes] == [
+            ["server_url"]
+        ]
+        assert watcher.config.server_url == "http://new"
+
+    asyncio.run(main())
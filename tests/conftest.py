@@ -0,0 +1,157 @@
+"""Shared test fixtures."""
+
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pytest
+from aiohttp import web
+
+TIMESTAMP = "2023-04-13T20:47:48Z"
+"""Timestamp used in test payloads."""
+
+Handler = Callable[[web.Request], Any]
+
+
+def user_dict(name: str = "marek", user_id: str = "1") -> Dict[str, Any]:
+    """Make a complete user payload."""
+    return {"id": user_id, "name": name, "createdAt": TIMESTAMP}
+
+
+def machine_dict(
+    machine_id: int = 1,
+    user: str = "marek",
+    ip_addresses: Optional[List[str]] = None,
+    tags: Optional[List[str]] = None,
+    name: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Make a complete machine payload."""
+    return {
+        "id": str(machine_id),
+        "machineKey": f"mkey:{machine_id}",
+        "nodeKey": f"nodekey:{machine_id}",
+        "discoKey": f"discokey:{machine_id}",
+        "ipAddresses": ip_addresses or [f"100.64.0.{machine_id}"],
+        "name": name or f"machine{machine_id}",
+        "user": user_dict(user),
+        "lastSeen": TIMESTAMP,
+        "lastSuccessfulUpdate": TIMESTAMP,
+        "expiry": TIMESTAMP,
+        "createdAt": TIMESTAMP,
+        "registerMethod": "REGISTER_METHOD_CLI",
+        "forcedTags": list(tags or []),
+        "invalidTags": [],
+        "validTags": [],
+        "givenName": name or f"machine{machine_id}",
+        "online": True,
+    }
+
+
+def route_dict(
+    route_id: int = 1,
+    prefix: str = "10.0.0.0/24",
+    machine: Optional[Dict[str, Any]] = None,
+    enabled: bool = True,
+    is_primary: bool = True,
+) -> Dict[str, Any]:
+    """Make a complete route payload."""
+    return {
+        "id": str(route_id),
+        "machine": machine or machine_dict(),
+        "prefix": prefix,
+        "advertised": True,
+        "enabled": enabled,
+        "isPrimary": is_primary,
+        "createdAt": TIMESTAMP,
+        "updatedAt": TIMESTAMP,
+    }
+
+
+def api_key_dict(
+    prefix: str = "abcdefghij", expiration: str = "2100-01-01T00:00:00Z", key_id=1
+) -> Dict[str, Any]:
+    """Make a complete API key payload."""
+    return {
+        "id": str(key_id),
+        "prefix": prefix,
+        "expiration": expiration,
+        "createdAt": TIMESTAMP,
+        "lastSeen": TIMESTAMP,
+    }
+
+
+class FakeServer:
+    """Fake Headscale REST API server running in a background thread."""
+
+    def __init__(self) -> None:
+        self.handlers: Dict[Tuple[str, str], Handler] = {}
+        self.requests: List[Tuple[str, str, Dict[str, str]]] = []
+        self.base_url = ""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._runner: Optional[web.AppRunner] = None
+
+    def route(
+        self,
+        method: str,
+        path: str,
+        payload: Any = None,
+        status: int = 200,
+        handler: Optional[Handler] = None,
+    ):
+        """Register a response (or a custom handler) for a request."""
+
+        def default_handler(_: web.Request):
+            if isinstance(payload, str):
+                return web.Response(text=payload, status=status)
+            return web.json_response(payload, status=status)
+
+        self.handlers[(method, path)] = handler or default_handler
+
+    async def _dispatch(self, request: web.Request) -> web.StreamResponse:
+        self.requests.append(
+            (request.method, request.path, dict(request.headers))  # type: ignore
+        )
+        handler = self.handlers.get((request.method, request.path))
+        if handler is None:
+            return web.Response(text="Not Found", status=404)
+        response = handler(request)
+        if asyncio.iscoroutine(response):
+            response = await response
+        if not isinstance(response, web.StreamResponse):
+            response = web.json_response(response)
+        return response
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self._dispatch)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    def start(self):
+        """Start the server."""
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        self.route("GET", "/health", {})
+
+    def stop(self):
+        """Stop the server."""
+        if self._runner is not None:
+            asyncio.run_coroutine_threadsafe(
+                self._runner.cleanup(), self._loop
+            ).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+@pytest.fixture
+def server() -> Iterator[FakeServer]:
+    """Run a fake Headscale REST API server."""
+    fake = FakeServer()
+    fake.start()
+    yield fake
+    fake.stop()
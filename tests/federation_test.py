@@ -0,0 +1,77 @@
+"""Federated Headscale API tests."""
+
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from headscale_api.federation import FederatedHeadscale
+from headscale_api.headscale import Headscale, ResponseError
+
+from .conftest import FakeServer, user_dict
+
+
+def test_federated_read(server: FakeServer):
+    """Test concurrent reads with a partial failure."""
+    slow = FakeServer()
+    slow.start()
+    try:
+        server.route("GET", "/api/v1/user", {"users": [user_dict("a"), user_dict("b")]})
+
+        async def slow_users(_: web.Request):
+            await asyncio.sleep(1)
+            return {"users": [user_dict("c")]}
+
+        slow.route("GET", "/api/v1/user", handler=slow_users)
+
+        async def main():
+            federation = FederatedHeadscale(
+                {
+                    "eu": Headscale(server.base_url, "key"),
+                    "us": Headscale(slow.base_url, "key"),
+                },
+                timeout=0.2,
+                owner_resolver=lambda owner: owner.rsplit("@", 1)[-1],
+            )
+            async with federation.session:
+                result = await federation.list_users()
+            assert [(item.source, item.item.name) for item in result.items] == [
+                ("eu", "a"),
+                ("eu", "b"),
+            ]
+            assert not result.complete
+            assert isinstance(result.errors["us"], asyncio.TimeoutError)
+
+            assert federation.for_owner("marek@us") is federation.instances["us"]
+            with pytest.raises(KeyError):
+                federation.for_owner("marek@asia")
+
+        asyncio.run(main())
+    finally:
+        slow.stop()
+
+
+def test_federated_error_response(server: FakeServer):
+    """Test error responses with `raise_exception_on_error` disabled."""
+    server.route(
+        "GET",
+        "/api/v1/user",
+        {"code": 13, "message": "database error", "details": []},
+        status=500,
+    )
+
+    async def main():
+        federation = FederatedHeadscale(
+            {"eu": Headscale(server.base_url, "key", raise_exception_on_error=False)}
+        )
+        async with federation.session:
+            result = await federation.list_users()
+        error = result.errors["eu"]
+        assert isinstance(error, ResponseError)
+        assert (error.http_code, error.code, error.message) == (
+            500,
+            13,
+            "database error",
+        )
+
+    asyncio.run(main())
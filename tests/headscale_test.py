@@ -0,0 +1,441 @@
+"""Headscale API abstraction tests."""
+
+import asyncio
+import json
+import socket
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+from aiohttp import web
+
+from headscale_api import backend
+from headscale_api.breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from headscale_api.config import HeadscaleConfig
+from headscale_api.headscale import Headscale, ResponseError, UnauthorizedError
+from headscale_api.schema.headscale import v1 as model
+
+from .conftest import FakeServer, api_key_dict, machine_dict, user_dict
+
+
+def test_decode_offload(server: FakeServer):
+    """Test decoding of large responses in an executor."""
+    server.route(
+        "GET",
+        "/api/v1/machine",
+        {"machines": [machine_dict(index) for index in range(1, 50)]},
+    )
+
+    async def main():
+        with ThreadPoolExecutor(1) as executor:
+            headscale = Headscale(
+                server.base_url,
+                "key",
+                decode_executor=executor,
+                decode_offload_threshold=1024,
+            )
+            async with headscale.session:
+                response = await headscale.list_machines(model.ListMachinesRequest(""))
+        assert len(response.machines) == 49
+        assert response.machines[0].user.name == "marek"
+
+    asyncio.run(main())
+
+    with ProcessPoolExecutor(1) as executor, pytest.raises(ValueError):
+        Headscale(server.base_url, "key", decode_executor=executor)
+
+
+def test_base_url_change(server: FakeServer):
+    """Test switching base URL within a persistent session."""
+    other = FakeServer()
+    other.start()
+    try:
+
+        async def main():
+            headscale = Headscale(server.base_url, "key")
+            async with headscale.session:
+                assert await headscale.health_check()
+                headscale.base_url = other.base_url
+                assert await headscale.health_check()
+
+        asyncio.run(main())
+        assert len(server.requests) == 1
+        assert len(other.requests) == 1
+    finally:
+        other.stop()
+
+
+def test_from_config_transport(tmp_path):
+    """Test transport selection from Headscale config."""
+    socket_path = str(tmp_path / "headscale.sock")
+
+    async def main():
+        with socket.socket() as grpc_listener:
+            grpc_listener.bind(("127.0.0.1", 0))
+            grpc_listener.listen()
+            port = grpc_listener.getsockname()[1]
+            config = HeadscaleConfig(
+                server_url="http://localhost:8080",
+                grpc_listen_addr=f"0.0.0.0:{port}",
+                unix_socket=socket_path,
+            )
+
+            # Unix socket is not reachable, so gRPC over TCP is used.
+            headscale = Headscale.from_config(config, "key")
+            assert headscale.channel is not None
+            assert (headscale.channel._host, headscale.channel._port) == (  # noqa
+                "localhost",
+                port,
+            )
+            headscale.close()
+
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+                listener.bind(socket_path)
+                listener.listen()
+                headscale = Headscale.from_config(config)
+                assert headscale.channel is not None
+                assert headscale.channel._path == socket_path  # noqa
+                headscale.close()
+
+            headscale = Headscale.from_config(config, "key", transports=("rest",))
+            assert headscale.channel is None
+            assert headscale.base_url == "http://localhost:8080"
+
+        # gRPC port is not reachable, so REST is used.
+        headscale = Headscale.from_config(config, "key")
+        assert headscale.channel is None
+        assert headscale.base_url == "http://localhost:8080"
+
+    asyncio.run(main())
+
+
+def test_grpc_transport(tmp_path):
+    """Test service calls over gRPC unix socket channel."""
+    # pylint: disable=import-outside-toplevel
+    from grpclib.server import Server
+
+    from headscale_api.schema.lean.headscale import v1 as lean_model
+
+    socket_path = str(tmp_path / "headscale.sock")
+
+    class Service(lean_model.HeadscaleServiceBase):
+        """Test gRPC service."""
+
+        async def list_users(self, list_users_request):
+            return lean_model.ListUsersResponse([lean_model.User("1", "marek")])
+
+    async def main():
+        server = Server([Service()])
+        await server.start(path=socket_path)
+        try:
+            headscale = Headscale.from_config(HeadscaleConfig(unix_socket=socket_path))
+            # Messages of the default backend are converted to the wire format.
+            response = await headscale.list_users(model.ListUsersRequest())
+            assert isinstance(response, backend.v1.ListUsersResponse)
+            assert response.users[0].name == "marek"
+
+            with pytest.raises(ResponseError) as error:
+                await headscale.get_user(model.GetUserRequest("marek"))
+            assert error.value.http_code == 501
+            response = await headscale.raw("get_user", model.GetUserRequest("marek"))
+            assert response.status == 501
+            assert json.loads(response.body)["code"] == 12
+            headscale.close()
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(main())
+
+
+def test_api_key_info_cache(server: FakeServer):
+    """Test API key lookups served from the prefix index."""
+    server.route(
+        "GET",
+        "/api/v1/apikey",
+        {"apiKeys": [api_key_dict("abcdefghij"), api_key_dict("klmnopqrst", key_id=2)]},
+    )
+    server.route("POST", "/api/v1/apikey/expire", {})
+
+    def list_requests():
+        return sum(
+            1 for request in server.requests if request[:2] == ("GET", "/api/v1/apikey")
+        )
+
+    async def main():
+        headscale = Headscale(server.base_url, "abcdefghij.secret")
+        async with headscale.session:
+            infos = await asyncio.gather(
+                *(headscale.get_api_key_info() for _ in range(10))
+            )
+            assert all(info.id == 1 for info in infos)
+            assert list_requests() == 1
+
+            assert (await headscale.get_api_key_info("klmnopqrst.x")).id == 2
+            assert await headscale.get_api_key_info("zzzzzzzzzz.x") is None
+            assert list_requests() == 1
+
+            await headscale.expire_api_key(model.ExpireApiKeyRequest("klmnopqrst"))
+            assert (await headscale.get_api_key_info()).id == 1
+            assert list_requests() == 2
+
+    asyncio.run(main())
+
+
+def test_reauthentication(server: FakeServer):
+    """Test if concurrent unauthorized requests refresh the API key only once."""
+
+    def list_users(request: web.Request):
+        if request.headers["Authorization"] != "Bearer new":
+            return web.Response(text="Unauthorized", status=401)
+        return {"users": [user_dict()]}
+
+    server.route("GET", "/api/v1/user", handler=list_users)
+
+    class RefreshingHeadscale(Headscale):
+        """Headscale API with API key provider."""
+
+        refreshes = 0
+
+        async def refresh_api_key(self):
+            self.refreshes += 1
+            await asyncio.sleep(0.05)
+            return "new"
+
+    async def main():
+        headscale = RefreshingHeadscale(server.base_url, "old")
+        async with headscale.session:
+            responses = await asyncio.gather(
+                *(headscale.list_users(model.ListUsersRequest()) for _ in range(10))
+            )
+        assert all(response.users[0].name == "marek" for response in responses)
+        assert headscale.refreshes == 1
+
+        with pytest.raises(UnauthorizedError):
+            await Headscale(server.base_url, "old").list_users(model.ListUsersRequest())
+
+    asyncio.run(main())
+
+
+def test_failover(server: FakeServer):
+    """Test failover from a dead base URL and its circuit breaker."""
+    server.route("GET", "/api/v1/user", {"users": [user_dict()]})
+    server.route("POST", "/api/v1/user", {"user": user_dict("new")})
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        dead_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+    async def main():
+        headscale = Headscale([dead_url, server.base_url], "key")
+        async with headscale.session:
+            for _ in range(10):
+                response = await headscale.list_users(model.ListUsersRequest())
+                assert response.users[0].name == "marek"
+            response = await headscale.create_user(model.CreateUserRequest("new"))
+            assert response.user.name == "new"
+
+            assert headscale.replicas is not None
+            dead, alive = headscale.replicas.replicas
+            assert dead.breaker.state == CircuitState.OPEN
+            assert alive.breaker.state == CircuitState.CLOSED
+            assert alive.latency is not None
+
+            assert await headscale.health_check()
+            assert dead.breaker.state == CircuitState.OPEN
+
+            headscale.base_url = [dead_url, dead_url + "/"]
+            assert not await headscale.health_check()
+            with pytest.raises(CircuitOpenError):
+                await headscale.list_users(model.ListUsersRequest())
+
+    asyncio.run(main())
+
+
+def test_failover_server_error(server: FakeServer):
+    """Test failover of reads on a server error response."""
+    failing = FakeServer()
+    failing.start()
+    try:
+        error_dict = {"code": 14, "message": "bad gateway", "details": []}
+        failing.route("GET", "/api/v1/user", error_dict, status=502)
+        failing.route("POST", "/api/v1/user", error_dict, status=502)
+        server.route("GET", "/api/v1/user", {"users": [user_dict()]})
+
+        async def main():
+            headscale = Headscale([failing.base_url, server.base_url], "key")
+            async with headscale.session:
+                # Writes are not retried, since they might have been applied.
+                with pytest.raises(ResponseError) as error:
+                    await headscale.create_user(model.CreateUserRequest("new"))
+                assert error.value.http_code == 502
+                for _ in range(5):
+                    response = await headscale.list_users(model.ListUsersRequest())
+                    assert response.users[0].name == "marek"
+
+                headscale.base_url = [failing.base_url, failing.base_url + "/"]
+                with pytest.raises(ResponseError) as error:
+                    await headscale.list_users(model.ListUsersRequest())
+                assert error.value.http_code == 502
+
+        asyncio.run(main())
+        assert len(server.requests) == 5
+        assert [method for method, _, _ in failing.requests].count("POST") == 1
+    finally:
+        failing.stop()
+
+
+def test_route_circuit_breaker(server: FakeServer):
+    """Test fast failing of a broken route."""
+    server.route(
+        "GET",
+        "/api/v1/routes",
+        {"code": 13, "message": "database error", "details": []},
+        status=500,
+    )
+    server.route("GET", "/api/v1/user", {"users": [user_dict()]})
+
+    async def main():
+        headscale = Headscale(
+            server.base_url,
+            "key",
+            route_circuit_breaker_factory=lambda: CircuitBreaker(
+                failure_threshold=2, cool_down=0.2
+            ),
+        )
+        async with headscale.session:
+            for _ in range(2):
+                with pytest.raises(ResponseError):
+                    await headscale.get_routes(model.GetRoutesRequest())
+            with pytest.raises(CircuitOpenError):
+                await headscale.get_routes(model.GetRoutesRequest())
+            assert len(server.requests) == 2
+            await headscale.list_users(model.ListUsersRequest())
+
+            await asyncio.sleep(0.2)
+            with pytest.raises(ResponseError):
+                await headscale.get_routes(model.GetRoutesRequest())
+            breaker = headscale.route_breaker(
+                "/headscale.v1.HeadscaleService/GetRoutes"
+            )
+            assert breaker is not None and breaker.state == CircuitState.OPEN
+
+            headscale.raise_exception_on_error = False
+            assert (await headscale.get_routes(model.GetRoutesRequest()))[1] == 503
+        assert len(server.requests) == 4
+
+    asyncio.run(main())
+
+
+def test_route_circuit_breaker_replicas_down():
+    """Test that base URLs being down don't trip route circuit breakers."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        dead_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+    async def main():
+        headscale = Headscale(
+            [dead_url, dead_url + "/"],
+            "key",
+            route_circuit_breaker_factory=lambda: CircuitBreaker(failure_threshold=2),
+        )
+        async with headscale.session:
+            assert not await headscale.health_check()
+            for _ in range(3):
+                with pytest.raises(CircuitOpenError) as error:
+                    await headscale.list_users(model.ListUsersRequest())
+                assert error.value.name.startswith(dead_url)
+            breaker = headscale.route_breaker(
+                "/headscale.v1.HeadscaleService/ListUsers"
+            )
+            assert breaker is not None and breaker.state == CircuitState.CLOSED
+
+    asyncio.run(main())
+
+
+def test_raw_response(server: FakeServer):
+    """Test passing responses through without decoding."""
+    server.route(
+        "GET",
+        "/api/v1/machine",
+        {"machines": [machine_dict(index) for index in range(1, 4)]},
+    )
+    server.route(
+        "GET",
+        "/api/v1/user/nobody",
+        {"code": 5, "message": "user not found", "details": []},
+        status=404,
+    )
+
+    def list_users(_: web.Request):
+        response = web.json_response({"users": []})
+        response.headers.add("Set-Cookie", "a=1")
+        response.headers.add("Set-Cookie", "b=2")
+        return response
+
+    server.route("GET", "/api/v1/user", handler=list_users)
+
+    async def main():
+        headscale = Headscale(server.base_url, "key")
+        async with headscale.session:
+            response = await headscale.raw(
+                "list_machines", model.ListMachinesRequest("")
+            )
+            body, status, headers = response.to_response()
+            assert status == 200
+            assert dict(headers)["Content-Type"].startswith("application/json")
+            assert "Content-Length" not in dict(headers)
+            assert json.loads(body)["machines"][2]["id"] == "3"
+
+            response = await headscale.raw("get_user", model.GetUserRequest("nobody"))
+            assert response.status == 404
+            assert json.loads(response.body)["message"] == "user not found"
+
+            response = await headscale.raw("list_users", model.ListUsersRequest())
+            cookies = [
+                value for name, value in response.headers if name == "Set-Cookie"
+            ]
+            assert cookies == ["a=1", "b=2"]
+
+            async with headscale.raw_stream(
+                "list_machines", model.ListMachinesRequest(""), chunk_size=100
+            ) as stream:
+                assert stream.status == 200
+                chunks = [chunk async for chunk in stream.chunks]
+            assert len(chunks) > 1
+            assert b"".join(chunks) == body
+
+    asyncio.run(main())
+
+
+def test_warmup(server: FakeServer):
+    """Test pre-opening of pooled connections."""
+    peers = set()
+
+    async def health(request: web.Request):
+        peers.add(request.transport.get_extra_info("peername"))
+        await asyncio.sleep(0.05)
+        return {}
+
+    server.route("GET", "/health", handler=health)
+
+    async def main():
+        headscale = Headscale(server.base_url, "key")
+        async with headscale.session:
+            assert await headscale.warmup(connections=4)
+            assert len(peers) == 4
+            assert headscale.ssl_context is None
+
+        peers.clear()
+        headscale = Headscale(server.base_url, "key", connection_limit=0)
+        async with headscale.session:
+            assert await headscale.warmup(connections=3)
+            assert len(peers) == 3
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            dead_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+        assert not await Headscale(dead_url).warmup()
+
+        https = Headscale("https://headscale.example.com")
+        assert https.ssl_context is not None and https.ssl_context is https.ssl_context
+
+    asyncio.run(main())
@@ -0,0 +1,24 @@
+"""Package import tests."""
+
+import subprocess
+import sys
+
+
+def test_lazy_import():
+    """Test if importing the package doesn't import its heavy dependencies."""
+    script = (
+        "import sys, headscale_api\n"
+        "print(' '.join(sorted(sys.modules)))\n"
+        "headscale_api.Headscale\n"
+        "print(' '.join(sorted(sys.modules)))\n"
+    )
+    before, after = (
+        set(line.split())
+        for line in subprocess.run(
+            [sys.executable, "-c", script], check=True, capture_output=True, text=True
+        ).stdout.splitlines()
+    )
+    for module in ("headscale_api.config", "pydantic_yaml", "betterproto", "aiohttp"):
+        assert module not in before, f"{module} imported eagerly."
+    assert "headscale_api.headscale" in after
+    assert "headscale_api.config" not in after
@@ -0,0 +1,61 @@
+"""Inventory store tests."""
+
+from datetime import datetime, timezone
+
+from headscale_api.inventory import InventoryStore
+from headscale_api.schema.headscale import v1 as model
+
+from .conftest import machine_dict, route_dict, user_dict
+
+
+def make_machine(machine_id: int, user: str, *tags: str, last_seen=None):
+    """Make machine model."""
+    payload = machine_dict(machine_id, user, tags=list(tags))
+    if last_seen is not None:
+        payload["lastSeen"] = last_seen
+    return model.Machine.from_dict(payload)
+
+
+def test_inventory_store(tmp_path):
+    """Test incremental saving and queries of the inventory."""
+    path = tmp_path / "inventory.db"
+    store = InventoryStore(path)
+    machines = [
+        make_machine(1, "alice", "tag:prod"),
+        make_machine(2, "alice", last_seen="2030-01-01T00:00:00Z"),
+        make_machine(3, "bob", "tag:prod"),
+    ]
+    assert store.save_machines(machines) == 3
+    assert store.save_machines(machines) == 0
+    assert store.save_users([model.User.from_dict(user_dict("alice"))]) == 1
+    assert store.save_routes([model.Route.from_dict(route_dict(1))]) == 1
+    assert store.captured_at("machines") is not None
+    store.close()
+
+    store = InventoryStore(path)
+    assert [machine.id for machine in store.machines(user="alice")] == [1, 2]
+    assert [machine.id for machine in store.machines(tag="tag:prod")] == [1, 3]
+    assert [machine.id for machine in store.machines(user="alice", tag="tag:prod")] == [
+        1
+    ]
+    assert store.machines(address="100.64.0.3")[0].user.name == "bob"
+    since = datetime(2029, 1, 1, tzinfo=timezone.utc)
+    assert [machine.id for machine in store.machines(seen_since=since)] == [2]
+    assert store.users("alice")[0].name == "alice"
+    assert store.routes(machine_id=1)[0].prefix == "10.0.0.0/24"
+
+    # Incremental update of a changed machine.
+    assert store.save_machines([make_machine(3, "bob")], replace=False) == 1
+    assert [machine.id for machine in store.machines(tag="tag:prod")] == [1]
+    assert len(store.machines()) == 3
+    # Full capture removes machines, which don't exist anymore.
+    assert store.save_machines(machines[:1]) == 2
+    assert [machine.id for machine in store.machines()] == [1]
+    assert store.machines(address="100.64.0.3") == []
+
+    # Incremental updates of the other kinds.
+    bob = model.User.from_dict(user_dict("bob", "2"))
+    assert store.save_users([bob], replace=False) == 1
+    assert [user.name for user in store.users()] == ["alice", "bob"]
+    assert store.save_routes([model.Route.from_dict(route_dict(2))], replace=False) == 1
+    assert len(store.routes()) == 2
@@ -0,0 +1,84 @@
+"""Pre-auth key pool tests."""
+
+import asyncio
+import itertools
+
+import pytest
+from aiohttp import web
+
+from headscale_api.headscale import Headscale, ResponseError
+from headscale_api.preauth import PreAuthKeyPool, PreAuthKeySpec
+
+from .conftest import TIMESTAMP, FakeServer
+
+
+def test_pre_auth_key_pool(server: FakeServer):
+    """Test handing out pooled keys and their background refill."""
+    key_ids = itertools.count(1)
+    expired = []
+
+    async def create_pre_auth_key(request: web.Request):
+        body = await request.json()
+        key_id = next(key_ids)
+        return {
+            "preAuthKey": {
+                "user": body["user"],
+                "id": str(key_id),
+                "key": f"key{key_id}",
+                "reusable": body["reusable"],
+                "ephemeral": body["ephemeral"],
+                "used": False,
+                "expiration": body["expiration"],
+                "createdAt": TIMESTAMP,
+                "aclTags": body["aclTags"],
+            }
+        }
+
+    async def expire_pre_auth_key(request: web.Request):
+        expired.append((await request.json())["key"])
+        return {}
+
+    server.route("POST", "/api/v1/preauthkey", handler=create_pre_auth_key)
+    server.route("POST", "/api/v1/preauthkey/expire", handler=expire_pre_auth_key)
+    spec = PreAuthKeySpec("ci", ("tag:ci",))
+
+    async def main():
+        headscale = Headscale(server.base_url, "key")
+        async with headscale.session:
+            pool = PreAuthKeyPool(headscale, size=3, concurrency=2)
+            key = await pool.acquire(spec)
+            assert key.acl_tags == ["tag:ci"] and key.ephemeral
+            await pool.refill(spec)
+            assert pool.available(spec) == 3
+
+            keys = [await pool.acquire(spec) for _ in range(2)]
+            assert [key.key for key in keys] == ["key2", "key3"]
+            await pool.refill(spec)
+            assert pool.available(spec) == 3
+
+            await pool.close()
+        assert sorted(expired) == ["key4", "key5", "key6"]
+
+    asyncio.run(main())
+
+
+def test_pre_auth_key_pool_error_response(server: FakeServer):
+    """Test key creation failure with error responses returned instead of raised."""
+    server.route(
+        "POST",
+        "/api/v1/preauthkey",
+        {"code": 5, "message": "user not found", "details": []},
+        status=404,
+    )
+
+    async def main():
+        headscale = Headscale(server.base_url, "key", raise_exception_on_error=False)
+        async with headscale.session:
+            pool = PreAuthKeyPool(headscale, size=1)
+            with pytest.raises(ResponseError) as error:
+                await pool.acquire(PreAuthKeySpec("nobody"))
+            assert error.value.http_code == 404
+            assert error.value.message == "user not found"
+            await pool.close()
+
+    asyncio.run(main())
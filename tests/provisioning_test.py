@@ -0,0 +1,97 @@
+"""Provisioning pipeline tests."""
+
+import asyncio
+import json
+
+import pytest
+from aiohttp import web
+
+from headscale_api.headscale import Headscale
+from headscale_api.provisioning import Provisioner, read_specs
+
+from .conftest import TIMESTAMP, FakeServer, machine_dict, user_dict
+
+SPECS = """kind,name,user,key,machine_id,tags,acl_tags,reusable,ephemeral,expiration
+user,alice,,,,,,,,
+pre_auth_key,,alice,,,,tag:ci,false,true,2030-01-01T00:00:00Z
+user,bob,,,,,,,,
+pre_auth_key,,bob,,,,,true,,
+set_tags,,,,12,tag:ci tag:eu,,,,
+set_tags,,,,13,tag:eu,,,,
+"""
+
+
+@pytest.mark.parametrize("raise_exception_on_error", [True, False])
+def test_provisioning_resume(
+    server: FakeServer, tmp_path, raise_exception_on_error: bool
+):
+    """Test provisioning with a failure and resuming from checkpoint."""
+    users = set()
+    tagged = []
+    broken = {13}
+
+    async def create_user(request: web.Request):
+        await asyncio.sleep(0.05)
+        name = (await request.json())["name"]
+        users.add(name)
+        return {"user": user_dict(name)}
+
+    async def create_pre_auth_key(request: web.Request):
+        body = await request.json()
+        assert body["user"] in users
+        return {
+            "preAuthKey": {
+                "user": body["user"],
+                "id": "1",
+                "key": "key",
+                "reusable": body["reusable"],
+                "ephemeral": body["ephemeral"],
+                "used": False,
+                "expiration": body["expiration"],
+                "createdAt": TIMESTAMP,
+                "aclTags": body["aclTags"],
+            }
+        }
+
+    def set_tags(machine_id: int):
+        def handler(_: web.Request):
+            if machine_id in broken:
+                return web.json_response(
+                    {"code": 13, "message": "database error", "details": []},
+                    status=500,
+                )
+            tagged.append(machine_id)
+            return {"machine": machine_dict(machine_id)}
+
+        return handler
+
+    server.route("POST", "/api/v1/user", handler=create_user)
+    server.route("POST", "/api/v1/preauthkey", handler=create_pre_auth_key)
+    for machine_id in (12, 13):
+        server.route(
+            "POST", f"/api/v1/machine/{machine_id}/tags", handler=set_tags(machine_id)
+        )
+    specs_path = tmp_path / "specs.csv"
+    specs_path.write_text(SPECS)
+    checkpoint_path = tmp_path / "checkpoint.json"
+
+    async def main():
+        headscale = Headscale(
+            server.base_url, "key", raise_exception_on_error=raise_exception_on_error
+        )
+        async with headscale.session:
+            result = await Provisioner(headscale, checkpoint_path).run(
+                read_specs(specs_path)
+            )
+            assert result.provisioned == 5
+            assert list(result.failed) == [5]
+            assert json.loads(checkpoint_path.read_text())["watermark"] == 6
+
+            broken.clear()
+            result = await Provisioner(headscale, checkpoint_path).run(
+                read_specs(specs_path)
+            )
+            assert (result.provisioned, result.skipped, result.failed) == (1, 5, {})
+        assert sorted(tagged) == [12, 13]
+
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""Caching gRPC proxy tests."""
+
+import asyncio
+
+import grpclib
+import grpclib.const
+import pytest
+from grpclib.client import Channel
+from grpclib.server import Server
+
+from headscale_api import backend
+from headscale_api.headscale import Headscale, ResponseError
+from headscale_api.proxy import HeadscaleProxy
+from headscale_api.schema.headscale import v1 as model
+
+from .conftest import FakeServer, machine_dict, user_dict
+
+
+def test_proxy_cache(server: FakeServer):
+    """Test coalescing and caching of reads and invalidation on writes."""
+
+    async def list_machines(_):
+        await asyncio.sleep(0.05)
+        return {"machines": [machine_dict(1), machine_dict(2)]}
+
+    server.route("GET", "/api/v1/machine", handler=list_machines)
+    server.route("POST", "/api/v1/user", {"user": user_dict("new")})
+    server.route(
+        "GET",
+        "/api/v1/user/nobody",
+        {"code": 5, "message": "user not found", "details": []},
+        status=404,
+    )
+    now = [0.0]
+
+    async def main():
+        proxy = HeadscaleProxy(
+            [Headscale(server.base_url, "key"), Headscale(server.base_url, "key")],
+            cache_ttl=10,
+            clock=lambda: now[0],
+        )
+        async with proxy.session:
+            responses = await asyncio.gather(
+                *(proxy.list_machines(model.ListMachinesRequest("")) for _ in range(10))
+            )
+            assert all(len(response.machines) == 2 for response in responses)
+            assert proxy.coalesced == 9
+            assert len(server.requests) == 1
+
+            await proxy.list_machines(model.ListMachinesRequest(""))
+            assert proxy.hits == 1
+            await proxy.list_machines(model.ListMachinesRequest("marek"))
+            assert len(server.requests) == 2
+
+            now[0] = 11
+            await proxy.list_machines(model.ListMachinesRequest(""))
+            assert len(server.requests) == 3
+
+            response = await proxy.create_user(model.CreateUserRequest("new"))
+            assert response.user.name == "new"
+            await proxy.list_machines(model.ListMachinesRequest(""))
+            assert len(server.requests) == 5
+
+            with pytest.raises(grpclib.GRPCError) as error:
+                await proxy.get_user(model.GetUserRequest("nobody"))
+            assert error.value.status == grpclib.const.Status.NOT_FOUND
+            assert error.value.message == "user not found"
+
+    asyncio.run(main())
+
+
+def test_proxy_server(server: FakeServer, tmp_path):
+    """Test calls through the proxy served over gRPC."""
+    server.route("GET", "/api/v1/machine", {"machines": [machine_dict(1)]})
+    server.route(
+        "GET",
+        "/api/v1/user/nobody",
+        {"code": 5, "message": "user not found", "details": []},
+        status=404,
+    )
+    socket_path = str(tmp_path / "proxy.sock")
+
+    async def main():
+        proxy = HeadscaleProxy(Headscale(server.base_url, "key"))
+        proxy_server = Server([proxy])
+        async with proxy.session:
+            await proxy_server.start(path=socket_path)
+            channel = Channel(path=socket_path)
+            try:
+                # The client uses the default backend over the same socket.
+                client = Headscale("http://localhost", channel=channel)
+                response = await client.list_machines(model.ListMachinesRequest("u"))
+                assert isinstance(response, backend.v1.ListMachinesResponse)
+                assert response.machines[0].id == 1
+
+                with pytest.raises(ResponseError) as error:
+                    await client.get_user(model.GetUserRequest("nobody"))
+                assert error.value.http_code == 404
+                assert error.value.message == "user not found"
+            finally:
+                channel.close()
+                proxy_server.close()
+                await proxy_server.wait_closed()
+
+    asyncio.run(main())
+
+
+def test_proxy_error_response(server: FakeServer):
+    """Test forwarding of error responses with `raise_exception_on_error` disabled."""
+    server.route(
+        "GET",
+        "/api/v1/user/nobody",
+        {"code": 5, "message": "user not found", "details": []},
+        status=404,
+    )
+
+    async def main():
+        proxy = HeadscaleProxy(
+            Headscale(server.base_url, "key", raise_exception_on_error=False)
+        )
+        async with proxy.session:
+            with pytest.raises(grpclib.GRPCError) as error:
+                await proxy.get_user(model.GetUserRequest("nobody"))
+        assert error.value.status == grpclib.const.Status.NOT_FOUND
+        assert error.value.message == "user not found"
+
+    asyncio.run(main())
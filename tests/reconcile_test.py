@@ -0,0 +1,157 @@
+"""Desired state reconciler tests."""
+
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from headscale_api.headscale import Headscale, ResponseError
+from headscale_api.reconcile import (
+    DesiredMachine,
+    DesiredState,
+    Reconciler,
+    Snapshot,
+    make_plan,
+)
+from headscale_api.schema.headscale import v1 as model
+
+from .conftest import FakeServer, machine_dict, route_dict, user_dict
+
+
+def make_snapshot() -> Snapshot:
+    """Make live state snapshot."""
+    laptop = machine_dict(1, "alice", tags=["tag:a"], name="laptop")
+    server = machine_dict(2, "old", name="server")
+    return Snapshot(
+        [model.User.from_dict(user_dict(name)) for name in ("alice", "old")],
+        [
+            model.Machine.from_dict(payload)
+            for payload in (laptop, server, machine_dict(3, "old", name="stale"))
+        ],
+        [
+            model.Route.from_dict(route_dict(1, "10.0.0.0/24", server, enabled=False)),
+            model.Route.from_dict(route_dict(2, "192.168.0.0/24", server)),
+        ],
+    )
+
+
+DESIRED = DesiredState(
+    users={"alice", "bob"},
+    machines={
+        "laptop": DesiredMachine(tags=["tag:a"]),
+        "server": DesiredMachine(
+            user="bob", tags=["tag:srv"], routes=["10.0.0.0/24", "10.1.0.0/24"]
+        ),
+    },
+    prune_users=True,
+    prune_machines=True,
+)
+
+
+def test_make_plan():
+    """Test minimal plan with dependencies."""
+    plan = make_plan(DESIRED, make_snapshot())
+    assert str(plan).splitlines() == [
+        '0. create user "bob"',
+        '1. move machine "server" from "old" to "bob" (after 0)',
+        "2. set tags of machine \"server\" to ['tag:srv']",
+        '3. enable route 10.0.0.0/24 of machine "server"',
+        '4. disable route 192.168.0.0/24 of machine "server"',
+        '5. delete machine "stale"',
+        '6. delete user "old" (after 1, 5)',
+        'Warning: route 10.1.0.0/24 is not advertised by machine "server"',
+    ]
+
+    snapshot = make_snapshot()
+    assert not make_plan(DesiredState(users={"alice", "old"}), snapshot)
+
+
+def test_make_plan_duplicate_hostnames():
+    """Test if machines sharing a hostname are pruned, but not managed by name."""
+    payloads = [
+        machine_dict(1, "alice", name="laptop"),
+        machine_dict(2, "old", name="laptop"),
+        machine_dict(3, "old", name="stale"),
+        machine_dict(4, "old", name="stale"),
+    ]
+    snapshot = Snapshot(
+        [model.User.from_dict(user_dict(name)) for name in ("alice", "old")],
+        [model.Machine.from_dict(payload) for payload in payloads],
+        [],
+    )
+    desired = DesiredState(
+        users={"alice"},
+        machines={"laptop": DesiredMachine(user="alice")},
+        prune_users=True,
+        prune_machines=True,
+    )
+    assert str(make_plan(desired, snapshot)).splitlines() == [
+        '0. delete machine "stale" (ID 3)',
+        '1. delete machine "stale" (ID 4)',
+        'Warning: hostname "laptop" is ambiguous (machines 1, 2)',
+        'Warning: user "old" still owns machines and can\'t be deleted',
+    ]
+
+
+def test_apply_plan(server: FakeServer):
+    """Test concurrent plan execution in dependency order."""
+    calls = []
+
+    def handler(name: str, response, delay: float = 0):
+        async def handle(_: web.Request):
+            await asyncio.sleep(delay)
+            calls.append(name)
+            return response
+
+        return handle
+
+    machine = {"machine": machine_dict(2)}
+    for method, path, name, response, delay in (
+        ("POST", "/api/v1/user", "create", {"user": user_dict("bob")}, 0.1),
+        ("POST", "/api/v1/machine/2/user", "move", machine, 0),
+        ("POST", "/api/v1/machine/2/tags", "tags", machine, 0),
+        ("POST", "/api/v1/routes/1/enable", "enable", {}, 0),
+        ("POST", "/api/v1/routes/2/disable", "disable", {}, 0),
+        ("DELETE", "/api/v1/machine/3", "delete machine", {}, 0),
+        ("DELETE", "/api/v1/user/old", "delete user", {}, 0),
+    ):
+        server.route(method, path, handler=handler(name, response, delay))
+
+    async def main():
+        headscale = Headscale(server.base_url, "key")
+        async with headscale.session:
+            reconciler = Reconciler(headscale)
+            plan = await reconciler.plan(DESIRED, make_snapshot())
+            result = await reconciler.apply(plan)
+        assert sorted(result.succeeded) == list(range(7))
+        assert calls.index("move") > calls.index("create")
+        assert calls[-1] == "delete user"
+
+    asyncio.run(main())
+
+
+def test_error_responses(server: FakeServer):
+    """Test error responses with `raise_exception_on_error` disabled."""
+    error_dict = {"code": 13, "message": "database error", "details": []}
+    server.route("GET", "/api/v1/user", error_dict, status=500)
+    server.route("GET", "/api/v1/machine", {"machines": []})
+    server.route("GET", "/api/v1/routes", {"routes": []})
+    server.route("POST", "/api/v1/user", error_dict, status=500)
+
+    async def main():
+        headscale = Headscale(server.base_url, "key", raise_exception_on_error=False)
+        async with headscale.session:
+            reconciler = Reconciler(headscale)
+            with pytest.raises(ResponseError) as error:
+                await Snapshot.capture(headscale)
+            assert (error.value.code, error.value.message) == (13, "database error")
+
+            plan = await reconciler.plan(
+                DesiredState(users={"bob"}), Snapshot([], [], [])
+            )
+            result = await reconciler.apply(plan)
+        failure = result.failed[0]
+        assert isinstance(failure, ResponseError)
+        assert (failure.http_code, failure.code) == (500, 13)
+
+    asyncio.run(main())
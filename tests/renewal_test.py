@@ -0,0 +1,122 @@
+"""Background API key renewal tests."""
+
+import asyncio
+import random
+import socket
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+from headscale_api.headscale import Headscale
+from headscale_api.renewal import ApiKeyRenewer
+
+from .conftest import FakeServer, api_key_dict
+
+
+def test_renewal_single_rotation(server: FakeServer, tmp_path):
+    """Test if only one of many renewers rotates the key."""
+    soon = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    keys = {"oldkey0000": api_key_dict("oldkey0000", soon)}
+    created = []
+
+    def list_keys(_: web.Request):
+        return {"apiKeys": list(keys.values())}
+
+    async def create_key(_: web.Request):
+        prefix = f"newkey{len(created):04d}"
+        created.append(prefix)
+        keys[prefix] = api_key_dict(prefix, key_id=len(keys) + 1)
+        return {"apiKey": f"{prefix}.secret"}
+
+    async def expire_key(request: web.Request):
+        keys.pop((await request.json())["prefix"])
+        return {}
+
+    server.route("GET", "/api/v1/apikey", handler=list_keys)
+    server.route("POST", "/api/v1/apikey", handler=create_key)
+    server.route("POST", "/api/v1/apikey/expire", handler=expire_key)
+
+    async def main():
+        clients = [Headscale(server.base_url, "oldkey0000.secret") for _ in range(5)]
+        renewers = [
+            ApiKeyRenewer(
+                client, tmp_path / "key", previous_key_grace=timedelta(seconds=0.1)
+            )
+            for client in clients
+        ]
+        results = await asyncio.gather(*(renewer.renew_once() for renewer in renewers))
+        assert created == ["newkey0000"]
+        assert set(results) == {"newkey0000.secret"}
+        assert all(client.api_key == "newkey0000.secret" for client in clients)
+
+        # The previous key is expired only after the grace period.
+        assert "oldkey0000" in keys
+        await asyncio.sleep(0.3)
+        assert "oldkey0000" not in keys
+
+    asyncio.run(main())
+    assert (tmp_path / "key").read_text() == "newkey0000.secret"
+
+
+def test_renewal_survives_errors(tmp_path):
+    """Test if the renewal task keeps retrying when the server is unreachable."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        dead_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+    async def main():
+        headscale = Headscale(dead_url, "oldkey0000.secret")
+        renewer = ApiKeyRenewer(
+            headscale,
+            tmp_path / "key",
+            poll_interval=timedelta(seconds=0.01),
+            retry_interval=timedelta(seconds=0.01),
+        )
+        task = renewer.start()
+        await asyncio.sleep(0.2)
+        assert not task.done()
+        await renewer.stop()
+
+    asyncio.run(main())
+
+
+def test_renewal_jitter(server: FakeServer, tmp_path, monkeypatch):
+    """Test if the key is rotated at the advanced time without spinning."""
+    expiration = datetime.now(timezone.utc) + timedelta(days=5, seconds=30)
+    keys = {"oldkey0000": api_key_dict("oldkey0000", expiration.isoformat())}
+    created = []
+
+    async def create_key(_: web.Request):
+        prefix = f"newkey{len(created):04d}"
+        created.append(prefix)
+        keys[prefix] = api_key_dict(prefix, key_id=len(keys) + 1)
+        return {"apiKey": f"{prefix}.secret"}
+
+    server.route(
+        "GET", "/api/v1/apikey", handler=lambda _: {"apiKeys": list(keys.values())}
+    )
+    server.route("POST", "/api/v1/apikey", handler=create_key)
+    server.route("POST", "/api/v1/apikey/expire", {})
+    monkeypatch.setattr(random, "uniform", lambda low, high: 0.5)
+
+    async def main():
+        renewer = ApiKeyRenewer(
+            Headscale(server.base_url, "oldkey0000.secret"),
+            tmp_path / "key",
+            poll_interval=timedelta(seconds=0.01),
+        )
+        calls = []
+        renew_once = renewer.renew_once
+
+        async def counting_renew_once(*args):
+            calls.append(args)
+            return await renew_once(*args)
+
+        renewer.renew_once = counting_renew_once  # type: ignore
+        renewer.start()
+        await asyncio.sleep(0.3)
+        await renewer.stop()
+        assert created == ["newkey0000"]
+        assert calls == [(timedelta(minutes=30),)]
+
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+"""Route index tests."""
+
+from headscale_api.route_index import RouteIndex
+from headscale_api.schema.headscale import v1 as model
+
+from .conftest import machine_dict, route_dict
+
+
+def make_route(route_id: int, prefix: str, machine_id: int, **kwargs) -> model.Route:
+    """Make route model."""
+    return model.Route.from_dict(
+        route_dict(route_id, prefix, machine_dict(machine_id), **kwargs)
+    )
+
+
+def test_route_index():
+    """Test longest prefix match, overlaps and incremental updates."""
+    routes = [
+        make_route(1, "0.0.0.0/0", 1),
+        make_route(2, "10.0.0.0/8", 2),
+        make_route(3, "10.1.0.0/16", 3),
+        make_route(4, "10.1.0.0/16", 4, is_primary=False),
+        make_route(5, "10.1.2.0/24", 5, enabled=False),
+        make_route(6, "fd00::/64", 6),
+    ]
+    index = RouteIndex(routes)
+    assert [machine.id for machine in index.machines_for("10.1.2.3")] == [3, 4]
+    assert [machine.id for machine in index.machines_for("10.1.2.3", True)] == [3]
+    assert [route.id for route in index.lookup("10.1.2.3", False)] == [5]
+    assert [route.id for route in index.lookup("10.2.0.1")] == [2]
+    assert [route.id for route in index.lookup("192.168.0.1")] == [1]
+    assert [route.id for route in index.lookup("fd00::1")] == [6]
+    assert index.lookup("fe80::1") == []
+
+    assert [route.id for route in index.overlapping("10.1.0.0/20")] == [1, 2, 3, 4, 5]
+    assert [route.id for route in index.overlapping("10.0.0.0/8", True)] == [
+        1,
+        2,
+        3,
+        4,
+    ]
+    assert [route.id for route in index.overlapping("fd00::/48")] == [6]
+
+    index.update(
+        [routes[0], routes[1], make_route(3, "10.1.0.0/16", 3, enabled=False)]
+        + [make_route(7, "10.1.2.0/24", 7)]
+    )
+    assert len(index) == 4
+    assert [machine.id for machine in index.machines_for("10.1.2.3")] == [7]
+    assert [machine.id for machine in index.machines_for("10.1.3.3")] == [2]
+    assert index.lookup("fd00::1") == []
+    index.remove(7)
+    index.remove(2)
+    index.remove(1)
+    assert [route.id for route in index.overlapping("0.0.0.0/0")] == [3]
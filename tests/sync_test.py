@@ -0,0 +1,61 @@
+"""Blocking Headscale API facade tests."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+
+import pytest
+
+from headscale_api.headscale import Headscale
+from headscale_api.schema.headscale import v1 as model
+from headscale_api.sync import SyncHeadscale, wrapped_methods
+
+from .conftest import FakeServer, api_key_dict
+
+
+def test_sync_method_set():
+    """Test if the facade exposes all the service stub methods with type stubs."""
+    for name in ("list_machines", "get_routes", "create_api_key", "health_check"):
+        assert callable(getattr(SyncHeadscale, name))
+    stub = Path("headscale_api/sync.pyi").read_text()
+    missing = [name for name in wrapped_methods() if f"def {name}(" not in stub]
+    assert not missing, "Regenerate the stub with generate_sync_stub.py."
+
+
+def test_sync_call_timeout(server: FakeServer):
+    """Test cancelling of a call, which has timed out."""
+    cancelled = threading.Event()
+
+    async def slow_call():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with SyncHeadscale(Headscale(server.base_url), call_timeout=0.05) as headscale:
+        with pytest.raises(FutureTimeoutError):
+            headscale.run(slow_call())
+        assert cancelled.wait(1)
+
+
+def test_sync_calls_share_session(server: FakeServer):
+    """Test blocking calls from many threads sharing one session."""
+    server.route("GET", "/api/v1/apikey", {"apiKeys": [api_key_dict()]})
+    with SyncHeadscale(Headscale(server.base_url, api_key="key")) as headscale:
+        session = headscale.headscale.session._session  # pylint: disable=W0212
+        assert headscale.health_check()
+        with ThreadPoolExecutor(8) as executor:
+            responses = list(
+                executor.map(
+                    lambda _: headscale.list_api_keys(model.ListApiKeysRequest()),
+                    range(16),
+                )
+            )
+        assert all(
+            response.api_keys[0].prefix == "abcdefghij" for response in responses
+        )
+        assert headscale.headscale.session._session is session  # pylint: disable=W0212
+    assert headscale.headscale.session._session is None  # pylint: disable=W0212
@@ -0,0 +1,45 @@
+"""Tag index tests."""
+
+import pytest
+
+from headscale_api.schema.headscale import v1 as model
+from headscale_api.tag_index import TagIndex
+
+from .conftest import machine_dict
+
+
+def make_machine(machine_id: int, user: str, *tags: str, valid=()) -> model.Machine:
+    """Make machine model with forced and valid tags."""
+    payload = machine_dict(machine_id, user, tags=list(tags))
+    payload["validTags"] = list(valid)
+    return model.Machine.from_dict(payload)
+
+
+def test_tag_index():
+    """Test tag and user set algebra."""
+    machines = [
+        make_machine(1, "alice", "tag:prod"),
+        make_machine(2, "alice", "tag:prod", "tag:legacy"),
+        make_machine(3, "bob", valid=["tag:prod"]),
+        make_machine(4, "alice"),
+    ]
+    index = TagIndex(machines)
+
+    prod = index.tag("tag:prod")
+    assert prod.ids() == [1, 2, 3]
+    assert index.forced_tag("tag:prod").ids() == [1, 2]
+    assert index.valid_tag("tag:prod").ids() == [3]
+    audited = prod - index.tag("tag:legacy") & index.user("alice")
+    assert audited.ids() == [1]
+    assert len(audited) == 1
+    assert machines[0] in audited and machines[1] not in audited
+    assert (~prod).ids() == [4]
+    assert (prod ^ index.user("alice")).ids() == [3, 4]
+    assert not index.tag("tag:unknown")
+    assert index.count_by_tag(index.user("alice")) == {"tag:legacy": 1, "tag:prod": 2}
+
+    index.add(make_machine(5, "carol", "tag:prod"))
+    assert index.tag("tag:prod").ids() == [1, 2, 3, 5]
+    assert (~prod).ids() == [4, 5]
+    with pytest.raises(ValueError):
+        prod & TagIndex(machines).all  # pylint: disable=expression-not-assigned